@@ -53,7 +53,10 @@ EXTRAS_REQUIRE = {
         "pytest-flake8==1.1.0; python_version<'3.11'",
         "pytest-flask",
         "tox",
-    ]
+    ],
+    "arrow": [
+        "pyarrow>=10.0.1",
+    ],
 }
 
 setup(
@@ -25,11 +25,22 @@ def create_app(config_name):
     
     # to avoid a circular import
     from l3s_offshore_2.api import api_bp
+    from l3s_offshore_2.api.process_mining_srv.logic import log_cache
+    from l3s_offshore_2.api.simulation_srv.logic import net_cache
+    from l3s_offshore_2.api.jobs_srv.logic import fail_interrupted_jobs
+    import l3s_offshore_2.models  # noqa: F401, registers the tables for create_all
     
     app.register_blueprint(api_bp)
+    net_cache.resize(app.config["PNML_CACHE_SIZE"])
+    log_cache.resize(app.config["EVENT_LOG_CACHE_SIZE"], app.config["EVENT_LOG_CACHE_BYTES"])
     cors.init_app(app)
     db.init_app(app)
     migrate.init_app(app, db)
+    with app.app_context():
+        # tables of l3s_offshore_2.models, e.g. the alignment cache
+        db.create_all()
+        # jobs of a server process that is gone would never finish
+        fail_interrupted_jobs(app.config["JOB_LEASE_SECONDS"])
     bcrypt.init_app(app)
     
     @app.route('/')
@@ -28,7 +28,9 @@ from l3s_offshore_2.api.model_x_srv.endpoints import ns as model_x_ns
 from l3s_offshore_2.api.simulation_srv.endpoints import ns_sim
 from l3s_offshore_2.api.process_mining_srv.endpoints import ns_pm
 from l3s_offshore_2.api.simulation_petri_nets import simulation_petri_nets_ns
+from l3s_offshore_2.api.jobs_srv.endpoints import ns_jobs
 api.add_namespace(model_x_ns, path="/model-x") # Path prefix for this specific service
 api.add_namespace(ns_sim, path="/simulation-petri-nets")
 api.add_namespace(ns_pm, path="/process-mining")
-api.add_namespace(simulation_petri_nets_ns, path="/simulation-petri-nets")
\ No newline at end of file
+api.add_namespace(simulation_petri_nets_ns, path="/simulation-petri-nets")
+api.add_namespace(ns_jobs, path="/jobs")
\ No newline at end of file
@@ -0,0 +1,18 @@
+from flask_restx import Model, fields
+
+job_model = Model("Job", {
+    "job_id": fields.String(attribute="id", description="Identifier returned when the job was submitted"),
+    "kind": fields.String(description="Request the job runs, e.g. fitness-alignment"),
+    "status": fields.String(enum=["PENDING", "RUNNING", "SUCCESS", "FAILURE"]),
+    "message": fields.String(description="Error message if the job failed"),
+    "result": fields.Raw(description="Response body of the request once the job succeeded"),
+    "created_at": fields.DateTime,
+    "started_at": fields.DateTime,
+    "finished_at": fields.DateTime,
+})
+
+job_submitted_model = Model("JobSubmitted", {
+    "status": fields.String(enum=["PENDING"]),
+    "message": fields.String,
+    "job_id": fields.String,
+})
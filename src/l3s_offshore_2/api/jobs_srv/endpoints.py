@@ -0,0 +1,39 @@
+from http import HTTPStatus
+
+from flask import current_app
+from flask_restx import Namespace, Resource, abort
+
+from l3s_offshore_2.models import Job
+from .logic import fail_interrupted_jobs
+
+## import dto
+from .dto import job_model, job_submitted_model
+
+ns_jobs = Namespace("Jobs", validate=True)
+
+## dto registration
+ns_jobs.models[job_model.name] = job_model
+ns_jobs.models[job_submitted_model.name] = job_submitted_model
+
+
+@ns_jobs.route("/<string:job_id>", endpoint="job")
+@ns_jobs.doc(
+    description=(
+        "Status and result of a background job.\n"
+        "Long-running requests (alignments, inductive miner, simulation) submitted with "
+        "async=true answer 202 with a job_id right away; the job runs in a worker pool "
+        "(JOB_WORKERS threads) and its result is kept in the database. A job whose server "
+        "process stopped is reported as FAILURE after JOB_LEASE_SECONDS.\n"
+    )
+)
+class JobResource(Resource):
+    @ns_jobs.response(int(HTTPStatus.NOT_FOUND), "Unknown job")
+    @ns_jobs.marshal_with(job_model)
+    def get(self, job_id):
+        job = Job.query.get(job_id)
+        if job is None:
+            abort(HTTPStatus.NOT_FOUND, f"No job {job_id}")
+        if not job.finished and fail_interrupted_jobs(current_app.config["JOB_LEASE_SECONDS"]):
+            # the process running it, or another one, is gone
+            job = Job.query.get(job_id)
+        return job, HTTPStatus.OK
@@ -0,0 +1,147 @@
+"""Background jobs: run a function in a thread pool, keep its status and result in the database.
+
+Every server process has an id of its own, stored as the owner of the jobs it
+accepts, and renews their `heartbeat_at` every JOB_HEARTBEAT_SECONDS while
+they are queued or running. A job not renewed for
+JOB_LEASE_SECONDS lost its process and is failed by `fail_interrupted_jobs`,
+whichever process looks; the jobs of live processes are left alone.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import or_
+
+from l3s_offshore_2 import db
+from l3s_offshore_2.models import Job
+from l3s_offshore_2.models.job import FAILURE, PENDING, RUNNING, SUCCESS
+from l3s_offshore_2.utils.datetime_util import utc_now
+
+# id of this server process, the owner of the jobs it accepts
+_boot_id = str(uuid.uuid4())
+_executor = None
+_heartbeat = None
+_executor_lock = threading.Lock()
+
+
+def _after_fork():
+    # a forked server worker is a process of its own, with none of the parent's threads
+    global _boot_id, _executor, _heartbeat, _executor_lock
+    _boot_id = str(uuid.uuid4())
+    _executor = _heartbeat = None
+    _executor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _renew_jobs(app, interval):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                Job.query.filter(Job.owner == _boot_id, Job.status.in_((PENDING, RUNNING))).update(
+                    {Job.heartbeat_at: utc_now()}, synchronize_session=False
+                )
+                db.session.commit()
+            except Exception:
+                app.logger.exception("Renewing the jobs of %s failed", _boot_id)
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+def job_executor():
+    """
+    The process-wide pool, created on first use with JOB_WORKERS threads,
+    along with the thread renewing the jobs of the process.
+    """
+    global _executor, _heartbeat
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config["JOB_WORKERS"], thread_name_prefix="job"
+            )
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(
+                target=_renew_jobs,
+                args=(current_app._get_current_object(), current_app.config["JOB_HEARTBEAT_SECONDS"]),
+                name="job-heartbeat",
+                daemon=True,
+            )
+            _heartbeat.start()
+    return _executor
+
+
+def _run_job(app, job_id, func, args, kwargs):
+    with app.app_context():
+        job = Job.query.get(job_id)
+        job.status, job.started_at, job.heartbeat_at = RUNNING, utc_now(), utc_now()
+        db.session.commit()
+        try:
+            job.result = func(*args, **kwargs)
+            job.status, job.finished_at = SUCCESS, utc_now()
+            # in the try: a result the database does not take fails the job
+            db.session.commit()
+        except Exception as e:
+            app.logger.exception("Job %s (%s) failed", job_id, job.kind)
+            db.session.rollback()
+            job.status, job.message = FAILURE, f"{type(e).__name__}: {e}"
+            job.finished_at = utc_now()
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+
+def submit_job(kind, func, *args, **kwargs) -> Job:
+    """
+    Store a PENDING job and run func(*args, **kwargs) for it in the pool.
+
+    The function runs in an app context of its own, after the request is gone:
+    uploads must be passed as bytes, not as `FileStorage`. Its return value
+    must be JSON serializable; an exception marks the job as FAILURE.
+    """
+    job = Job(id=str(uuid.uuid4()), kind=kind, status=PENDING, owner=_boot_id, heartbeat_at=utc_now())
+    db.session.add(job)
+    db.session.commit()
+    app = current_app._get_current_object()
+    job_executor().submit(_run_job, app, job.id, func, args, kwargs)
+    return job
+
+
+def fail_interrupted_jobs(lease_seconds) -> int:
+    """
+    Mark the PENDING or RUNNING jobs not renewed for `lease_seconds` as FAILURE.
+
+    Jobs only live in the pool of the process that accepted them, so once it is
+    gone they never finish. Called at startup and when an unfinished job is
+    polled; jobs of other live processes keep being renewed and are not touched.
+    Returns the number of jobs marked.
+    """
+    deadline = utc_now() - timedelta(seconds=lease_seconds)
+    count = Job.query.filter(
+        Job.status.in_((PENDING, RUNNING)),
+        or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < deadline),
+    ).update(
+        {
+            Job.status: FAILURE,
+            Job.message: "Interrupted: the server stopped before the job finished, submit it again",
+            Job.finished_at: utc_now(),
+        },
+        synchronize_session=False,
+    )
+    db.session.commit()
+    return count
+
+
+def submitted(job):
+    """Response body of a request accepted as a job."""
+    return {
+        "status": job.status,
+        "message": f"{job.kind} job {job.id} submitted, poll GET /jobs/{job.id} for the result.",
+        "job_id": job.id,
+    }
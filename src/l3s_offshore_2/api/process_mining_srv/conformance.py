@@ -0,0 +1,324 @@
+"""Alignment-based conformance checking on trace variants.
+
+A log is first reduced to its variants (distinct activity sequences) with
+their frequencies. Every variant is aligned once, and the fitness and
+precision figures are weighted by the frequencies. The results are those of
+`pm4py.fitness_alignments` and `pm4py.precision_alignments`, which also align
+each variant only once but rebuild the variants and re-check the net on every
+call; here they are explicit, so callers can share them between metrics.
+
+With the digest of the model, `cached_align_variants` looks the variants up
+in the `AlignmentCache` table first and only aligns (and stores) the unseen
+ones.
+
+With `workers` > 1 the variants (or, for precision, the prefixes) are split
+into shards aligned in a process pool (`utils.pool.map_shared`), which gets
+the net once per worker. The soundness check and the best-worst cost are
+computed once in the calling process, and the per-shard results are merged
+in order, so the figures do not depend on the number of workers.
+"""
+import importlib
+from collections import Counter
+from copy import copy
+
+import numpy as np
+import pandas as pd
+from pm4py.algo.conformance.alignments.petri_net import algorithm as alignments
+from pm4py.algo.evaluation.precision import utils as precision_utils
+from pm4py.algo.evaluation.precision.variants import align_etconformance
+from pm4py.objects.log.obj import Event, Trace
+from pm4py.objects.petri_net.utils import check_soundness
+from pm4py.objects.petri_net.utils.align_utils import get_visible_transitions_eventually_enabled_by_marking
+from pm4py.util import constants, exec_utils
+from pm4py.util.lp import solver
+from sqlalchemy.exc import IntegrityError
+
+from l3s_offshore_2 import db
+from l3s_offshore_2.api.process_mining_srv.ingest import ACTIVITY_KEY, CASE_KEY
+from l3s_offshore_2.models import AlignmentCache
+from l3s_offshore_2.utils.pool import default_workers, map_shared
+
+Parameters = alignments.Parameters
+
+# keys per IN (...) query, below SQLite's limit on bound parameters
+LOOKUP_CHUNK = 500
+
+
+def log_variants(df, case_key=CASE_KEY, activity_key=ACTIVITY_KEY) -> Counter:
+    """
+    Variants of an event log dataframe.
+
+    Same result as counting `pandas_utils.get_traces`, without a list per
+    case: activities and cases are factorized to integer codes, and each case
+    is counted by the bytes of its code sequence, so only one tuple of
+    activity names is built per variant.
+
+    Returns:
+        Counter: activity tuple -> number of cases, in the order in which PM4Py
+                 meets the variants (cases sorted by id).
+    """
+    case_codes, _ = pd.factorize(df[case_key], sort=True)
+    activity_codes, activities = pd.factorize(df[activity_key], use_na_sentinel=False)
+    # cases in id order (groupby drops missing ids), events in log order within a case
+    order = np.argsort(case_codes, kind="stable")
+    order = order[case_codes[order] >= 0]
+    case_codes, activity_codes = case_codes[order], activity_codes[order].astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, case_codes[1:] != case_codes[:-1]]) if len(order) else order
+    ends = np.r_[starts[1:], len(order)]
+
+    counts = Counter(activity_codes[start:end].tobytes() for start, end in zip(starts.tolist(), ends.tolist()))
+    names = np.asarray(activities, dtype=object)
+    return Counter({
+        tuple(names[np.frombuffer(key, dtype=np.int64)].tolist()): count for key, count in counts.items()
+    })
+
+
+def variant_trace(variant, activity_key=ACTIVITY_KEY) -> Trace:
+    return Trace([Event({activity_key: activity}) for activity in variant])
+
+
+def check_easy_sound(net, initial_marking, final_marking):
+    """
+    Raises:
+        ValueError: the net is not easy sound, so it cannot be aligned against.
+    """
+    if not check_soundness.check_easy_soundness_net_in_fin_marking(net, initial_marking, final_marking):
+        raise ValueError("The Petri net is not easy sound, alignments cannot be computed")
+
+
+def _shards(items, workers):
+    """`items` cut into about 4 contiguous shards per worker."""
+    size = -(-len(items) // max(1, min(len(items), 4 * workers)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _map_shards(func, shared, items, workers):
+    """func(shared, items), in shards over `workers` processes if more than one."""
+    items = list(items)
+    workers = workers or default_workers()
+    if workers <= 1 or len(items) < 2:
+        return func(shared, items)
+    results = map_shared(func, shared, _shards(items, workers), max_workers=workers)
+    return [result for shard in results for result in shard]
+
+
+def _align_shard(shared, variants):
+    net, initial_marking, final_marking, parameters, variant = shared
+    if isinstance(variant, str):
+        variant = importlib.import_module(variant)
+    activity_key = exec_utils.get_param_value(Parameters.ACTIVITY_KEY, parameters, ACTIVITY_KEY)
+    return [
+        alignments.apply_trace(variant_trace(v, activity_key), net, initial_marking, final_marking,
+                               parameters=parameters, variant=variant)
+        for v in variants
+    ]
+
+
+def align_variants(variants, net, initial_marking, final_marking, parameters=None,
+                   variant=alignments.DEFAULT_VARIANT, workers=1) -> list:
+    """
+    Align every variant once against the net.
+
+    Args:
+        variants: iterable of activity tuples.
+        net, initial_marking, final_marking: the (easy sound) accepting Petri net.
+        parameters (dict): PM4Py alignment parameters.
+        variant: PM4Py alignment algorithm.
+        workers (int): processes to align in, 0 or None for one per CPU.
+
+    Returns:
+        list: one alignment dict per variant (with 'cost', 'fitness' and 'bwc'),
+              or None where no alignment was found in time.
+    """
+    parameters = copy(parameters) if parameters is not None else {}
+    if solver.DEFAULT_LP_SOLVER_VARIANT is not None:
+        check_easy_sound(net, initial_marking, final_marking)
+    # the same for every trace, computed once instead of per call of apply_trace
+    parameters[Parameters.BEST_WORST_COST_INTERNAL] = exec_utils.get_variant(variant).get_best_worst_cost(
+        net, initial_marking, final_marking, parameters=copy(parameters)
+    )
+    # algorithm modules do not pickle, the workers import them by name
+    algorithm = exec_utils.get_variant(variant)
+    shared = (net, initial_marking, final_marking, parameters, getattr(algorithm, "__name__", algorithm))
+    return _map_shards(_align_shard, shared, variants, workers)
+
+
+def cached_align_variants(variants, net, initial_marking, final_marking, model_digest,
+                          parameters=None, workers=1) -> list:
+    """
+    `align_variants` backed by the `AlignmentCache` table.
+
+    Alignments of `model_digest` found in the table are reused, the others
+    are computed and stored (variants without an alignment are not).
+
+    Args:
+        variants: iterable of activity tuples.
+        model_digest (str): SHA-256 of the PNML document of the net.
+        workers (int): processes to align the unseen variants in, see `align_variants`.
+
+    Returns:
+        list: one alignment dict per variant, or None.
+    """
+    variants = list(variants)
+    keys = [AlignmentCache.variant_key(v) for v in variants]
+    cached = {}
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        rows = AlignmentCache.query.filter(
+            AlignmentCache.model_digest == model_digest,
+            AlignmentCache.variant_digest.in_(keys[start:start + LOOKUP_CHUNK]),
+        )
+        cached.update((row.variant_digest, row.to_alignment()) for row in rows)
+
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    if missing:
+        aligned = align_variants([variants[i] for i in missing], net, initial_marking, final_marking,
+                                 parameters=parameters, workers=workers)
+        for i, ali in zip(missing, aligned):
+            if ali is not None and keys[i] not in cached:
+                cached[keys[i]] = ali
+                db.session.add(AlignmentCache.from_alignment(model_digest, variants[i], ali))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # stored meanwhile by a concurrent request, the results are the same
+            db.session.rollback()
+    return [cached.get(key) for key in keys]
+
+
+def alignment_cache_stats() -> dict:
+    return {
+        "size": AlignmentCache.query.count(),
+        "models": db.session.query(AlignmentCache.model_digest).distinct().count(),
+    }
+
+
+def clear_alignment_cache():
+    AlignmentCache.query.delete()
+    db.session.commit()
+
+
+def weighted_fitness(aligned, counts) -> dict:
+    """
+    `pm4py.fitness_alignments` figures from per-variant alignments.
+
+    Args:
+        aligned (list): alignment per variant, see `align_variants`.
+        counts (list): number of cases of each variant.
+    """
+    no_traces = no_fit_traces = 0
+    sum_fitness = sum_bwc = sum_cost = 0.0
+    for ali, count in zip(aligned, counts):
+        if ali is None:
+            continue
+        no_traces += count
+        if ali["fitness"] == 1.0:
+            no_fit_traces += count
+        sum_fitness += ali["fitness"] * count
+        if "bwc" in ali and "cost" in ali:
+            sum_bwc += ali["bwc"] * count
+            sum_cost += ali["cost"] * count
+
+    perc_fit_traces = average_fitness = log_fitness = 0.0
+    if no_traces > 0:
+        perc_fit_traces = 100.0 * no_fit_traces / no_traces
+        average_fitness = sum_fitness / no_traces
+        log_fitness = 1.0 - (sum_cost / sum_bwc if sum_bwc > 0 else 0)
+    return {
+        "percFitTraces": perc_fit_traces,
+        "averageFitness": average_fitness,
+        "percentage_of_fitting_traces": perc_fit_traces,
+        "average_trace_fitness": average_fitness,
+        "log_fitness": log_fitness,
+    }
+
+
+def fitness_alignments(event_log, net, initial_marking, final_marking, variants=None,
+                       model_digest=None, workers=1) -> dict:
+    """
+    Alignment-based fitness, as `pm4py.fitness_alignments`, with one alignment per variant.
+
+    Args:
+        event_log (pd.DataFrame): normalized event log.
+        variants (Counter): the variants of `event_log`, if already known.
+        model_digest (str): SHA-256 of the PNML of the net; given, the
+                            alignments go through `cached_align_variants`.
+        workers (int): processes to align in, see `align_variants`.
+    """
+    if variants is None:
+        variants = log_variants(event_log)
+    parameters = {Parameters.SHOW_PROGRESS_BAR: False}
+    if model_digest is None:
+        aligned = align_variants(variants, net, initial_marking, final_marking, parameters=parameters,
+                                 workers=workers)
+    else:
+        aligned = cached_align_variants(variants, net, initial_marking, final_marking, model_digest,
+                                        parameters=parameters, workers=workers)
+    return weighted_fitness(aligned, variants.values())
+
+
+def _enabled_labels(net, marking):
+    """Labels of the visible transitions eventually enabled in `marking`."""
+    return {
+        t.label for t in get_visible_transitions_eventually_enabled_by_marking(net, marking)
+        if t.label is not None
+    }
+
+
+def _prefix_shard(shared, prefixes):
+    """For each prefix the labels enabled where its alignment stops, or None if it has none."""
+    net, initial_marking, final_marking, parameters = shared
+    fake_log = precision_utils.form_fake_log(prefixes, activity_key=ACTIVITY_KEY)
+    stop_markings = align_etconformance.align_fake_log_stop_marking(
+        fake_log, net, initial_marking, final_marking, parameters=parameters
+    )
+    all_markings = align_etconformance.transform_markings_from_sync_to_original_net(
+        stop_markings, net, parameters=parameters
+    )
+    return [
+        None if markings is None else set().union(*(_enabled_labels(net, m) for m in markings))
+        for markings in all_markings
+    ]
+
+
+def precision_alignments(event_log, net, initial_marking, final_marking, variants=None,
+                         workers=1) -> float:
+    """
+    Align-ETConformance precision, as `pm4py.precision_alignments`.
+
+    The prefixes and their frequencies are taken from the variants, so every
+    distinct prefix is aligned once, and the start activities and case count
+    need no further pass over the log.
+
+    Args:
+        event_log (pd.DataFrame): normalized event log.
+        variants (Counter): the variants of `event_log`, if already known.
+        workers (int): processes to align the prefixes in, 0 or None for one per CPU.
+    """
+    if variants is None:
+        variants = log_variants(event_log)
+    check_easy_sound(net, initial_marking, final_marking)
+
+    prefixes, prefix_count = {}, Counter()
+    for trace, count in variants.items():
+        for i in range(1, len(trace)):
+            prefix = constants.DEFAULT_VARIANT_SEP.join(trace[:i])
+            prefixes.setdefault(prefix, set()).add(trace[i])
+            prefix_count[prefix] += count
+    prefixes_keys = list(prefixes)
+    shared = (net, initial_marking, final_marking, {Parameters.SHOW_PROGRESS_BAR: False})
+    all_activated = _map_shards(_prefix_shard, shared, prefixes_keys, workers)
+
+    sum_ee = sum_at = 0
+    for prefix, activated in zip(prefixes_keys, all_activated):
+        if activated is None:
+            continue
+        escaping_edges = activated.difference(prefixes[prefix])
+        sum_at += len(activated) * prefix_count[prefix]
+        sum_ee += len(escaping_edges) * prefix_count[prefix]
+
+    start_activities = {trace[0] for trace in variants if trace}
+    enabled_initially = {t.label for t in get_visible_transitions_eventually_enabled_by_marking(net, initial_marking)}
+    n_traces = sum(variants.values())
+    sum_at += n_traces * len(enabled_initially)
+    sum_ee += n_traces * len(enabled_initially.difference(start_activities))
+    return 1 - sum_ee / sum_at if sum_at > 0 else 1.0
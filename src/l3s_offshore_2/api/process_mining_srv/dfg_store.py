@@ -0,0 +1,204 @@
+"""Directly-follows graphs of named event logs, stored in the database.
+
+A log that grows over time (e.g. one batch of events a day) does not have to
+be uploaded again as a whole for discovery: each batch is appended to the
+stored graph of the log (`DfgLog` with its `DfgEdge` and `DfgActivity`
+rows), and the Petri net is mined from the stored graph with the inductive
+miner for DFGs (IMd).
+
+The last activity of every case is kept (`DfgCase`), so a case continued by a
+later batch is linked to its earlier events: the edge between them is
+counted, and the activity no longer ends the case. Batches are expected in
+time order; events of a case older than the ones already stored are counted
+after them. Appending costs a pass over the batch and a lookup of its cases,
+whatever the size of the history.
+
+Appends to the same log are serialized on its `DfgLog` row, which is created
+with an insert-or-ignore and locked for the append; the counts are added in
+SQL (upserts), never read, changed and written back. An append that still
+collides with a concurrent one raises `DfgStoreConflict`.
+"""
+from collections import Counter
+
+import pm4py
+from pm4py.objects.dfg.obj import DFG
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from l3s_offshore_2 import db
+from l3s_offshore_2.models import DfgActivity, DfgCase, DfgEdge, DfgLog
+from . import discovery
+from .conformance import LOOKUP_CHUNK
+
+NAME_LENGTH = DfgLog.name.type.length
+# SQLSTATEs of PostgreSQL transactions aborted by a concurrent one
+_PG_CONFLICTS = ("40001", "40P01")
+
+
+class DfgStoreConflict(Exception):
+    """An append collided with a concurrent one on the same log; it can be sent again."""
+
+
+def _check_name(name):
+    if not name or len(name) > NAME_LENGTH:
+        raise ValueError(f"The log name must have 1 to {NAME_LENGTH} characters")
+
+
+def dfg_log_summary(log: DfgLog) -> dict:
+    return {
+        "name": log.name,
+        "batches": log.batches,
+        "cases": log.cases,
+        "events": log.events,
+        "activities": DfgActivity.query.filter_by(log_name=log.name).count(),
+        "edges": DfgEdge.query.filter_by(log_name=log.name).count(),
+        "created_at": log.created_at,
+        "updated_at": log.updated_at,
+    }
+
+
+def list_dfg_logs() -> list:
+    return [dfg_log_summary(log) for log in DfgLog.query.order_by(DfgLog.name)]
+
+
+def get_dfg_log(name):
+    """Summary of a stored log, None if there is none of that name."""
+    log = DfgLog.query.get(name)
+    return dfg_log_summary(log) if log is not None else None
+
+
+def _last_activities(name, case_ids) -> dict:
+    """Stored last activity of the cases of `case_ids` already in the log."""
+    known = {}
+    for start in range(0, len(case_ids), LOOKUP_CHUNK):
+        rows = db.session.query(DfgCase.case_id, DfgCase.last_activity).filter(
+            DfgCase.log_name == name,
+            DfgCase.case_id.in_(case_ids[start:start + LOOKUP_CHUNK]),
+        )
+        known.update(rows)
+    return known
+
+
+def _upsert(model, rows, add=(), replace=()):
+    """
+    Insert `rows` into the table of `model`; where a row with the same primary key
+    exists, add the values of the `add` columns to it and overwrite the `replace`
+    columns, in SQL. Without either, existing rows are left as they are.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    keys = [column.name for column in table.primary_key]
+    dialect = db.engine.dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        values = {c: table.c[c] + stmt.inserted[c] for c in add}
+        values.update({c: stmt.inserted[c] for c in replace})
+        stmt = stmt.on_duplicate_key_update(values) if values else stmt.prefix_with("IGNORE")
+    else:
+        # SQLite and PostgreSQL share the ON CONFLICT clause
+        stmt = (postgresql if dialect == "postgresql" else sqlite).insert(table)
+        values = {c: table.c[c] + stmt.excluded[c] for c in add}
+        values.update({c: stmt.excluded[c] for c in replace})
+        if values:
+            stmt = stmt.on_conflict_do_update(index_elements=keys, set_=values)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+    db.session.execute(stmt, rows)
+
+
+def _is_conflict(error):
+    if isinstance(error, IntegrityError):
+        return True
+    # SQLite: the lock of a concurrent writer was not released within the busy timeout
+    return "locked" in str(error.orig) or getattr(error.orig, "pgcode", None) in _PG_CONFLICTS
+
+
+def append_batch(name, event_log) -> dict:
+    '''
+    Add a batch of events to the stored directly-follows graph of a log
+
+    input:
+        log name (created by its first batch), event log dataframe of the batch
+
+    output:
+        summary of the stored log
+
+    raises:
+        DfgStoreConflict if a concurrent append to the log got in the way
+    '''
+    _check_name(name)
+    graph, frequencies, case_ids, firsts, lasts = discovery.batch_dfg(event_log)
+    if not case_ids:
+        raise ValueError("The event log has no events")
+    case_ids = [str(case_id) for case_id in case_ids]
+
+    try:
+        # a write first: on SQLite it takes the database's write lock, a concurrent
+        # append waits here; elsewhere the row lock below serializes the appends
+        _upsert(DfgLog, [{"name": name, "batches": 0, "cases": 0, "events": 0}])
+        DfgLog.query.filter_by(name=name).with_for_update().one()
+
+        known = _last_activities(name, case_ids)
+        starts, ends = Counter(), Counter()
+        for case_id, first, last in zip(case_ids, firsts, lasts):
+            previous = known.get(case_id)
+            if previous is None:
+                starts[first] += 1
+            else:
+                # the case goes on: its previous last event is followed by this batch
+                graph[(previous, first)] += 1
+                ends[previous] -= 1
+            ends[last] += 1
+
+        _upsert(DfgEdge, [{"log_name": name, "source": source, "target": target, "frequency": frequency}
+                          for (source, target), frequency in graph.items()], add=("frequency",))
+        _upsert(DfgActivity, [{"log_name": name, "activity": activity, "frequency": frequencies[activity],
+                               "starts": starts[activity], "ends": ends[activity]}
+                              for activity in frequencies.keys() | starts.keys() | ends.keys()],
+                add=("frequency", "starts", "ends"))
+        # executemany on the table, one statement for all the cases of the batch
+        _upsert(DfgCase, [{"log_name": name, "case_id": case_id, "last_activity": last}
+                          for case_id, last in zip(case_ids, lasts)], replace=("last_activity",))
+
+        DfgLog.query.filter_by(name=name).update({
+            DfgLog.batches: DfgLog.batches + 1,
+            DfgLog.cases: DfgLog.cases + sum(case_id not in known for case_id in case_ids),
+            DfgLog.events: DfgLog.events + sum(frequencies.values()),
+        }, synchronize_session=False)
+        db.session.commit()
+    except (IntegrityError, OperationalError) as e:
+        db.session.rollback()
+        if not _is_conflict(e):
+            raise
+        raise DfgStoreConflict(f"A concurrent append to the log {name} got in the way, send the batch again") from e
+    return dfg_log_summary(DfgLog.query.get(name))
+
+
+def stored_dfg(name):
+    """The directly-follows graph of a stored log, None if there is none of that name."""
+    if DfgLog.query.get(name) is None:
+        return None
+    graph = {(edge.source, edge.target): edge.frequency
+             for edge in DfgEdge.query.filter_by(log_name=name) if edge.frequency}
+    activities = DfgActivity.query.filter_by(log_name=name).all()
+    return DFG(graph,
+               {row.activity: row.starts for row in activities if row.starts},
+               {row.activity: row.ends for row in activities if row.ends})
+
+
+def discover_petri_net(name):
+    """(Petri net, initial marking, final marking) mined from a stored log, None if there is none."""
+    dfg = stored_dfg(name)
+    if dfg is None:
+        return None
+    return pm4py.discover_petri_net_inductive(dfg)
+
+
+def delete_dfg_log(name) -> bool:
+    """Drop a stored log and its graph, False if there is none of that name."""
+    for model in (DfgCase, DfgEdge, DfgActivity):
+        model.query.filter_by(log_name=name).delete()
+    deleted = DfgLog.query.filter_by(name=name).delete()
+    db.session.commit()
+    return bool(deleted)
@@ -0,0 +1,186 @@
+"""Inductive miner on a directly-follows graph built from case shards.
+
+`pm4py.discover_petri_net_inductive` on a dataframe projects every case to a
+list of activities before mining. Here the directly-follows graph (DFG) is
+counted instead: cases and activities are factorized to integer codes, the
+events sorted by case (and timestamp, as PM4Py does), and the sorted arrays
+cut at case boundaries into shards. In each shard the activity column is
+shifted by one event and the pairs within a case counted, so a shard is two
+integer arrays and its result three small count arrays, whatever the number
+of events. With `workers` > 1 the shards are counted in a process pool
+(`utils.pool.map_shared`). The merged DFG is mined with the inductive miner
+for DFGs (IMd), which never looks at the cases again.
+
+With `max_variants` only the most frequent trace variants are kept, for a
+quick preview of large logs: the DFG is then counted from the variants,
+weighted by their frequencies, and the log mode mines the variants instead
+of the dataframe.
+"""
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pm4py
+from pm4py.algo.discovery.inductive.dtypes.im_ds import IMDataStructureUVCL
+from pm4py.algo.discovery.inductive.variants.im import IMUVCL
+from pm4py.objects.dfg.obj import DFG
+from pm4py.objects.process_tree.utils.generic import fold, tree_sort
+
+from l3s_offshore_2.api.process_mining_srv.ingest import ACTIVITY_KEY, CASE_KEY, TIMESTAMP_KEY
+from l3s_offshore_2.utils.pool import default_workers, map_shared
+from .conformance import log_variants
+
+# 'log': pm4py's inductive miner (IM) on the cases, 'dfg': IMd on the sharded DFG
+DISCOVERY_MODES = ('log', 'dfg')
+
+
+def _event_codes(df, case_key, activity_key, timestamp_key):
+    """Case and activity codes of the events, sorted by case, then timestamp; and the case ids and activity names."""
+    case_codes, cases = pd.factorize(df[case_key], sort=True)
+    activity_codes, activities = pd.factorize(df[activity_key], use_na_sentinel=False)
+    if timestamp_key in df.columns:
+        timestamps = pd.to_datetime(df[timestamp_key], utc=True).to_numpy(dtype='datetime64[ns]')
+        # stable, events with equal timestamps keep their log order
+        order = np.lexsort((timestamps, case_codes))
+    else:
+        order = np.argsort(case_codes, kind='stable')
+    # events without a case id are dropped, as by PM4Py's groupby
+    order = order[case_codes[order] >= 0]
+    return case_codes[order], activity_codes[order].astype(np.int64), cases, list(activities)
+
+
+def _case_shards(case_codes, shards):
+    """Bounds (start, end) of about `shards` slices of the sorted events, cut between cases."""
+    if not len(case_codes):
+        return []
+    cuts = np.linspace(0, len(case_codes), shards + 1).astype(np.int64)[1:-1]
+    # move each cut forward to the first event of a case
+    cuts = np.searchsorted(case_codes, case_codes[cuts], side='left')
+    bounds = np.unique(np.r_[0, cuts, len(case_codes)])
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def _count(codes):
+    values, counts = np.unique(codes, return_counts=True)
+    return values, counts
+
+
+def _dfg_shard(n_activities, shard):
+    """Directly-follows pairs, start and end activities of a shard of whole cases, as code counts."""
+    case_codes, activity_codes = shard
+    # each event next to the following one, kept when both belong to the same case
+    same_case = case_codes[1:] == case_codes[:-1]
+    pairs = activity_codes[:-1][same_case] * n_activities + activity_codes[1:][same_case]
+    first = np.r_[True, ~same_case]
+    last = np.r_[~same_case, True]
+    return _count(pairs), _count(activity_codes[first]), _count(activity_codes[last])
+
+
+def _merge(counts, names, pair_width=None):
+    """Sum of per-shard (codes, counts) arrays, as a Counter of activities (or pairs of them)."""
+    values = np.concatenate([codes for codes, _ in counts])
+    weights = np.concatenate([n for _, n in counts])
+    values, inverse = np.unique(values, return_inverse=True)
+    totals = np.bincount(inverse, weights=weights).astype(np.int64)
+    if pair_width is None:
+        return Counter({names[value]: total for value, total in zip(values.tolist(), totals.tolist())})
+    return Counter({
+        (names[value // pair_width], names[value % pair_width]): total
+        for value, total in zip(values.tolist(), totals.tolist())
+    })
+
+
+def dfg_from_frame(df, workers=1, case_key=CASE_KEY, activity_key=ACTIVITY_KEY, timestamp_key=TIMESTAMP_KEY) -> DFG:
+    """
+    Directly-follows graph of an event log dataframe, as `pm4py.discover_dfg_typed`.
+
+    The events are sorted once and cut into about 4 shards of whole cases per
+    worker; with `workers` > 1 (0 or None for one per CPU) the shards are
+    counted in a process pool, which only gets integer arrays.
+
+    Returns:
+        DFG: directly-follows, start and end activity frequencies.
+    """
+    case_codes, activity_codes, _, activities = _event_codes(df, case_key, activity_key, timestamp_key)
+    workers = workers or default_workers()
+    shards = [(case_codes[start:end], activity_codes[start:end])
+              for start, end in _case_shards(case_codes, 4 * workers if workers > 1 else 1)]
+    counted = map_shared(_dfg_shard, len(activities), shards, max_workers=workers)
+    if not counted:
+        return DFG()
+    pairs, starts, ends = zip(*counted)
+    return DFG(_merge(pairs, activities, pair_width=len(activities)),
+               _merge(starts, activities), _merge(ends, activities))
+
+
+def batch_dfg(df, case_key=CASE_KEY, activity_key=ACTIVITY_KEY, timestamp_key=TIMESTAMP_KEY):
+    """
+    Directly-follows graph of a batch of events, with the ends of its cases.
+
+    Returns:
+        tuple: (Counter of directly-follows pairs, Counter of events per activity,
+                case ids, first activity and last activity of each case)
+    """
+    case_codes, activity_codes, cases, activities = _event_codes(df, case_key, activity_key, timestamp_key)
+    if not len(case_codes):
+        return Counter(), Counter(), [], [], []
+    (pairs, _, _) = _dfg_shard(len(activities), (case_codes, activity_codes))
+    graph = _merge([pairs], activities, pair_width=len(activities))
+    frequencies = Counter(dict(zip(activities, np.bincount(activity_codes, minlength=len(activities)).tolist())))
+    first = np.flatnonzero(np.r_[True, case_codes[1:] != case_codes[:-1]])
+    last = np.r_[first[1:] - 1, len(case_codes) - 1]
+    names = np.asarray(activities, dtype=object)
+    return (graph, frequencies, np.asarray(cases, dtype=object)[case_codes[first]].tolist(),
+            names[activity_codes[first]].tolist(), names[activity_codes[last]].tolist())
+
+
+def dfg_from_variants(variants) -> DFG:
+    """Directly-follows graph of trace variants (activity tuple -> number of cases)."""
+    graph, start_activities, end_activities = Counter(), Counter(), Counter()
+    for variant, count in variants.items():
+        if not variant:
+            continue
+        start_activities[variant[0]] += count
+        end_activities[variant[-1]] += count
+        for pair in zip(variant, variant[1:]):
+            graph[pair] += count
+    return DFG(graph, start_activities, end_activities)
+
+
+def sample_variants(variants, max_variants) -> Counter:
+    """The `max_variants` most frequent variants, ties in the order the variants were met."""
+    if max_variants < 1:
+        raise ValueError("max_variants must be a positive number")
+    return Counter(dict(variants.most_common(max_variants)))
+
+
+def _im_variants(variants):
+    """pm4py's inductive miner (IM) on trace variants instead of a log."""
+    tree = IMUVCL({}).apply(IMDataStructureUVCL(variants), {})
+    tree = fold(tree)
+    tree_sort(tree)
+    return pm4py.convert_to_petri_net(tree)
+
+
+def discover_petri_net(event_log, mode='log', max_variants=None, workers=1):
+    '''
+    Petri net of an event log dataframe with the inductive miner
+
+    input:
+        event log dataframe, discovery mode (one of DISCOVERY_MODES), number of
+        most frequent variants to keep (None for the whole log), processes to
+        count the DFG in (dfg mode)
+
+    output:
+        (Petri net, initial marking, final marking)
+    '''
+    if mode not in DISCOVERY_MODES:
+        raise ValueError(f"Unknown discovery mode {mode!r}, expected one of {', '.join(DISCOVERY_MODES)}")
+    if max_variants is not None:
+        variants = sample_variants(log_variants(event_log), max_variants)
+        if mode == 'dfg':
+            return pm4py.discover_petri_net_inductive(dfg_from_variants(variants))
+        return _im_variants(variants)
+    if mode == 'dfg':
+        return pm4py.discover_petri_net_inductive(dfg_from_frame(event_log, workers=workers))
+    return pm4py.discover_petri_net_inductive(log=event_log, timestamp_key=TIMESTAMP_KEY)
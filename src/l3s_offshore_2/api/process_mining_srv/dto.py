@@ -8,6 +8,33 @@ random_response_model = Model("RandomResponse", {
     "results": fields.List(fields.String, required=True)
 })
 
+log_cache_stats_model = Model("LogCacheStats", {
+    "size": fields.Integer(description="Number of cached event logs"),
+    "maxsize": fields.Integer(description="Capacity (EVENT_LOG_CACHE_SIZE)"),
+    "nbytes": fields.Integer(description="Memory used by the cached dataframes"),
+    "max_bytes": fields.Integer(description="Memory limit (EVENT_LOG_CACHE_BYTES)"),
+    "hits": fields.Integer,
+    "misses": fields.Integer,
+    "evictions": fields.Integer,
+    "hit_rate": fields.Float,
+})
+
+alignment_cache_stats_model = Model("AlignmentCacheStats", {
+    "size": fields.Integer(description="Number of stored alignments"),
+    "models": fields.Integer(description="Number of distinct Petri nets (PNML digests)"),
+})
+
+
+dfg_log_model = Model("DfgLog", {
+    "name": fields.String(description="Name the batches of the log are appended to"),
+    "batches": fields.Integer(description="Number of appended batches"),
+    "cases": fields.Integer,
+    "events": fields.Integer,
+    "activities": fields.Integer,
+    "edges": fields.Integer(description="Number of directly-follows pairs"),
+    "created_at": fields.DateTime,
+    "updated_at": fields.DateTime,
+})
 
 # miner_request_model = Model("MinerRequestModel", {
 #     'csv': fields.String(required=True, 
@@ -1,11 +1,10 @@
 from http import HTTPStatus
-import os, io, json
+import io, json
 import random
 from dotenv import load_dotenv
 load_dotenv()
 
 import pandas as pd
-import tempfile
 
 # import werkzeug
 from werkzeug.datastructures import FileStorage
@@ -13,23 +12,35 @@ from werkzeug.utils import secure_filename
 
 # import flask
 # from flask import request, url_for
+from flask import Response, current_app, send_file
 
 # import flask-restx
-from flask_restx import Namespace, Resource, abort
+from flask_restx import Namespace, Resource, abort, inputs
 # from flask_restx.reqparse import RequestParser
-import pm4py
 
 ## import dto
-from .dto import (random_request_model, random_response_model)
+from .dto import (random_request_model, random_response_model, log_cache_stats_model,
+                  alignment_cache_stats_model, dfg_log_model)
 
 ## import logic
-from .logic import (allowed_file_extension, inductive_miner, event_log_processer)
+from .logic import (ANALYSES, ENGINES, allowed_file_extension, inductive_miner, inductive_miner_download,
+                    log_cache, convert_event_log,
+                    run_analysis, run_batch_analysis, dataset_files, append_to_dfg_store, dfg_store_miner)
+from l3s_offshore_2.api.jobs_srv.dto import job_submitted_model
+from l3s_offshore_2.api.jobs_srv.logic import submit_job, submitted
+from l3s_offshore_2.utils.upload_io import read_upload
+from . import conformance, dfg_store
+from .discovery import DISCOVERY_MODES
 
 ns_pm = Namespace("Process Mining", validate=True)
 
 ## dto registration
 ns_pm.models[random_request_model.name] = random_request_model
 ns_pm.models[random_response_model.name] = random_response_model
+ns_pm.models[log_cache_stats_model.name] = log_cache_stats_model
+ns_pm.models[alignment_cache_stats_model.name] = alignment_cache_stats_model
+ns_pm.models[job_submitted_model.name] = job_submitted_model
+ns_pm.models[dfg_log_model.name] = dfg_log_model
 # ns_pm.models[miner_request_model.name] = miner_request_model
 # ns_pm.models[miner_response_model.name] = miner_response_model
 
@@ -42,6 +53,39 @@ discovery_upload_parser.add_argument(
     required=True,
     help='CSV file to upload'
 )
+discovery_upload_parser.add_argument(
+    'mode', location='form', type=str, default='log', choices=DISCOVERY_MODES,
+    help='log: inductive miner on the cases; dfg: directly-follows graph counted over case shards, then mined'
+)
+discovery_upload_parser.add_argument(
+    'max_variants', location='form', type=inputs.positive, required=False,
+    help='Mine only the most frequent trace variants, for a quick preview of large logs'
+)
+discovery_upload_parser.add_argument(
+    'download', location='form', type=inputs.boolean, default=False,
+    help='Answer with the PNML file itself, streamed in chunks, instead of embedding it in JSON'
+)
+discovery_upload_parser.add_argument(
+    'async', location='form', type=inputs.boolean, default=False,
+    help='Run in the background: answer 202 with a job_id to poll at GET /jobs/<job_id>'
+)
+
+convert_upload_parser = ns_pm.parser()
+convert_upload_parser.add_argument(
+    'file', location='files', type=FileStorage, required=True,
+    help='CSV or XES event log file'
+)
+convert_upload_parser.add_argument(
+    'format', location='form', type=str, default='parquet',
+    choices=('parquet', 'feather', 'arrow'),
+    help='Target format: parquet, or feather/arrow for Arrow IPC'
+)
+
+dfg_store_upload_parser = ns_pm.parser()
+dfg_store_upload_parser.add_argument(
+    'file', location='files', type=FileStorage, required=True,
+    help='Event log batch in .csv, .xes, .parquet or .feather/.arrow format'
+)
 
 analysis_upload_parser = ns_pm.parser()
 analysis_upload_parser.add_argument(
@@ -52,8 +96,61 @@ analysis_upload_parser.add_argument(
     'pnml_model', location='files', type=FileStorage, required=True,
     help='PNML Petri net file'
 )
+analysis_upload_parser.add_argument(
+    'engine', location='form', type=str, default='pm4py', choices=ENGINES,
+    help='Token replay: pm4py or compiled (incidence matrices, one replay per variant), '
+         'see the analysis descriptions'
+)
+analysis_upload_parser.add_argument(
+    'async', location='form', type=inputs.boolean, default=False,
+    help='Run in the background: answer 202 with a job_id to poll at GET /jobs/<job_id>'
+)
 
 
+batch_upload_parser = ns_pm.parser()
+batch_upload_parser.add_argument(
+    'pnml_model', location='files', type=FileStorage, required=False,
+    help='PNML Petri net file, or give pnml_path'
+)
+batch_upload_parser.add_argument(
+    'pnml_path', location='form', type=str, required=False,
+    help='PNML Petri net, relative to the datasets directory'
+)
+batch_upload_parser.add_argument(
+    'event_logs', location='files', type=FileStorage, action='append', default=[],
+    help='Event log files (csv, xes, parquet, feather or arrow)'
+)
+batch_upload_parser.add_argument(
+    'dataset_paths', location='form', type=str, action='append', default=[],
+    help='Event logs relative to the datasets directory, glob patterns allowed'
+)
+batch_upload_parser.add_argument(
+    'analyses', location='form', type=str, action='append', choices=ANALYSES,
+    default=['fitness-alignment', 'precision-alignment'],
+    help='Analyses to run on every log'
+)
+batch_upload_parser.add_argument(
+    'engine', location='form', type=str, default='pm4py', choices=ENGINES,
+    help='Token replay: pm4py or compiled (incidence matrices, one replay per variant), '
+         'see the analysis descriptions'
+)
+batch_upload_parser.add_argument(
+    'async', location='form', type=inputs.boolean, default=False,
+    help='Run in the background: answer 202 with a job_id to poll at GET /jobs/<job_id>'
+)
+
+
+def analysis_response(analysis, event_log_file, pnml_file, run_async=False, engine='pm4py'):
+    """Run an analysis on the uploads, or with run_async submit it as a job and answer its id."""
+    event_log_suffix = event_log_file.filename.rsplit('.', 1)[-1].lower()
+    # read now, the uploads are gone once the request is answered
+    analysis_args = (analysis, read_upload(event_log_file), event_log_suffix, read_upload(pnml_file),
+                     current_app.config["ALIGNMENT_WORKERS"], engine)
+    if run_async:
+        job = submit_job(analysis, lambda: {"result": run_analysis(*analysis_args)})
+        return submitted(job), HTTPStatus.ACCEPTED
+    return {"result": run_analysis(*analysis_args)}, HTTPStatus.ACCEPTED
+
 
 @ns_pm.route("/inductive-miner", endpoint="inductive-miner")
 @ns_pm.doc(
@@ -70,55 +167,229 @@ analysis_upload_parser.add_argument(
         "Upload an event_log.xes. **Example: https:// ** \n\n"
         
         "Note: A wrapper of PM4PY Inductive Minder.\n\n"
+        "With mode=dfg the directly-follows graph is counted over shards of the cases "
+        "(in DISCOVERY_WORKERS processes) and mined with the inductive miner for DFGs, "
+        "which is much faster on large logs. max_variants keeps only the most frequent "
+        "trace variants, for a quick preview.\n"
+        "With download=true the response is the .pnml file, streamed in chunks, "
+        "instead of a JSON body (ignored with async=true).\n"
     )
 )
 class InductiveMiner(Resource):
     @ns_pm.response(int(HTTPStatus.CREATED), "Success")
+    @ns_pm.response(int(HTTPStatus.OK), "PNML file (download=true)")
+    @ns_pm.response(int(HTTPStatus.ACCEPTED), "Submitted as a job (async=true)", job_submitted_model)
     @ns_pm.response(int(HTTPStatus.BAD_REQUEST), "Type Error")
     @ns_pm.expect(discovery_upload_parser)
     def post(self):
+        # retrive the data, invalid arguments are answered with 400 by the parser
+        args = discovery_upload_parser.parse_args()
         try:
-            # retrive the data
-            args = discovery_upload_parser.parse_args()
             uploaded_file: FileStorage = args['file']
             filename = secure_filename(uploaded_file.filename)
             
             # 1. Extension
             if not allowed_file_extension(filename):
-                raise TypeError("Only .csv or .xes files are allowed.")
+                raise TypeError("Only .csv, .xes, .parquet, .feather or .arrow files are allowed.")
             
             file_type = uploaded_file.filename.rsplit('.', 1)[1].lower()
             
-            pnml_file_path = inductive_miner(uploaded_event_log=uploaded_file)
-
-
-            # Read into memory
-            with open(pnml_file_path, 'r', encoding='utf-8') as f:
-                pnml_data = f.read()
+            event_log_data, event_log_filename = read_upload(uploaded_file), uploaded_file.filename
+            workers = current_app.config["DISCOVERY_WORKERS"]
             
-            # Return as JSON with 201 Created
-            response = {
-                'filename': os.path.basename(pnml_file_path.rsplit('/', 1)[-1].lower()),
-                'results': pnml_data
-            }
+            def discover():
+                pnml_filename, pnml_data = inductive_miner(event_log_data, event_log_filename, mode=args['mode'],
+                                                           max_variants=args['max_variants'], workers=workers)
+                return {
+                    'filename': pnml_filename,
+                    'results': pnml_data
+                }
+            
+            if args['async']:
+                return submitted(submit_job('inductive-miner', discover)), HTTPStatus.ACCEPTED
             
-            # Delete the file immediately
-            os.remove(pnml_file_path)
+            if args['download']:
+                pnml_filename, chunks = inductive_miner_download(
+                    event_log_data, event_log_filename, mode=args['mode'],
+                    max_variants=args['max_variants'], workers=workers)
+                return Response(chunks, mimetype='application/xml', headers={
+                    'Content-Disposition': f'attachment; filename="{secure_filename(pnml_filename)}"'})
             
-            return response, HTTPStatus.CREATED
-        except TypeError as e:
+            # Return as JSON with 201 Created
+            return discover(), HTTPStatus.CREATED
+        except (TypeError, ValueError) as e:
+            return {"message": e.args}, HTTPStatus.BAD_REQUEST
+        except Exception as e:
+            return {"message": e.args}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+
+@ns_pm.route("/convert", endpoint="convert")
+@ns_pm.doc(
+    description=(
+        "Convert an event log to Parquet (default) or Arrow IPC/Feather.\n"
+        "Upload an event log in .csv or .xes format, as for the inductive miner. "
+        "The returned file holds the normalized log and can be uploaded instead of the "
+        "original one to every process-mining endpoint, which then skips parsing.\n"
+        "Parquet and Arrow need the optional pyarrow dependency (l3s_offshore_2[arrow]).\n"
+    )
+)
+class ConvertEventLog(Resource):
+    @ns_pm.response(int(HTTPStatus.OK), "Success")
+    @ns_pm.response(int(HTTPStatus.BAD_REQUEST), "Type Error")
+    @ns_pm.response(int(HTTPStatus.NOT_IMPLEMENTED), "pyarrow is not installed")
+    @ns_pm.expect(convert_upload_parser)
+    def post(self):
+        args = convert_upload_parser.parse_args()
+        uploaded_file: FileStorage = args['file']
+
+        try:
+            filename = secure_filename(uploaded_file.filename)
+
+            if not allowed_file_extension(filename):
+                raise TypeError("Only .csv, .xes, .parquet, .feather or .arrow files are allowed.")
+
+            converted_filename, data = convert_event_log(uploaded_file, args['format'])
+            mimetype = ('application/vnd.apache.parquet' if args['format'] == 'parquet'
+                        else 'application/vnd.apache.arrow.file')
+            return send_file(io.BytesIO(data), mimetype=mimetype, as_attachment=True,
+                             download_name=converted_filename)
+        except (TypeError, ValueError) as e:
+            return {"message": e.args}, HTTPStatus.BAD_REQUEST
+        except ImportError as e:
+            return {"message": e.args}, HTTPStatus.NOT_IMPLEMENTED
+        except Exception as e:
+            return {"message": e.args}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@ns_pm.route("/log-cache", endpoint="log-cache")
+@ns_pm.doc(
+    description=(
+        "Cache of parsed event logs, keyed by the SHA-256 of the upload and shared "
+        "by all process-mining endpoints.\n"
+        "GET: size, memory use and hit/miss/eviction counters. DELETE: drop all cached logs.\n"
+    )
+)
+class EventLogCache(Resource):
+    @ns_pm.marshal_with(log_cache_stats_model)
+    def get(self):
+        return log_cache.stats(), HTTPStatus.OK
+
+    @ns_pm.marshal_with(log_cache_stats_model)
+    def delete(self):
+        log_cache.clear()
+        return log_cache.stats(), HTTPStatus.OK
+
+
+@ns_pm.route("/alignment-cache", endpoint="alignment-cache")
+@ns_pm.doc(
+    description=(
+        "Alignments stored in the database by the fitness-alignment analysis, keyed by the "
+        "SHA-256 of the PNML model and of the trace variant.\n"
+        "GET: number of stored alignments and models. DELETE: drop all stored alignments.\n"
+    )
+)
+class AlignmentCacheResource(Resource):
+    @ns_pm.marshal_with(alignment_cache_stats_model)
+    def get(self):
+        return conformance.alignment_cache_stats(), HTTPStatus.OK
+
+    @ns_pm.marshal_with(alignment_cache_stats_model)
+    def delete(self):
+        conformance.clear_alignment_cache()
+        return conformance.alignment_cache_stats(), HTTPStatus.OK
+
+
+@ns_pm.route("/dfg-store", endpoint="dfg-store")
+@ns_pm.doc(
+    description=(
+        "Event logs stored as directly-follows graphs, to which new batches of events are "
+        "appended instead of uploading the whole history again.\n"
+        "GET: the stored logs.\n"
+    )
+)
+class DfgStore(Resource):
+    @ns_pm.marshal_list_with(dfg_log_model)
+    def get(self):
+        return dfg_store.list_dfg_logs(), HTTPStatus.OK
+
+
+@ns_pm.route("/dfg-store/<string:name>", endpoint="dfg-store-log")
+@ns_pm.doc(
+    description=(
+        "Directly-follows graph of a named event log, kept in the database.\n"
+        "POST: append a batch of events (.csv, .xes, .parquet or .feather/.arrow), the log is "
+        "created by its first batch. Edge, start and end activity counts are updated with the "
+        "batch only; a case continued from an earlier batch is linked to its last activity. "
+        "Batches are expected in time order; appends to the same log run one after the other.\n"
+        "GET: size of the stored log. DELETE: drop it.\n"
+    )
+)
+class DfgStoreLog(Resource):
+    @ns_pm.response(int(HTTPStatus.NOT_FOUND), "Unknown log")
+    @ns_pm.marshal_with(dfg_log_model)
+    def get(self, name):
+        summary = dfg_store.get_dfg_log(name)
+        if summary is None:
+            abort(HTTPStatus.NOT_FOUND, f"No stored log {name}")
+        return summary, HTTPStatus.OK
+
+    @ns_pm.response(int(HTTPStatus.CREATED), "Success", dfg_log_model)
+    @ns_pm.response(int(HTTPStatus.BAD_REQUEST), "Type Error")
+    @ns_pm.response(int(HTTPStatus.CONFLICT), "Concurrent append to the log, send the batch again")
+    @ns_pm.expect(dfg_store_upload_parser)
+    def post(self, name):
+        args = dfg_store_upload_parser.parse_args()
+        uploaded_file: FileStorage = args['file']
+
+        try:
+            summary = append_to_dfg_store(name, read_upload(uploaded_file), secure_filename(uploaded_file.filename))
+            return ns_pm.marshal(summary, dfg_log_model), HTTPStatus.CREATED
+        except (TypeError, ValueError) as e:
             return {"message": e.args}, HTTPStatus.BAD_REQUEST
+        except dfg_store.DfgStoreConflict as e:
+            return {"message": e.args}, HTTPStatus.CONFLICT
         except Exception as e:
             return {"message": e.args}, HTTPStatus.INTERNAL_SERVER_ERROR
 
+    @ns_pm.response(int(HTTPStatus.NO_CONTENT), "Deleted")
+    @ns_pm.response(int(HTTPStatus.NOT_FOUND), "Unknown log")
+    def delete(self, name):
+        if not dfg_store.delete_dfg_log(name):
+            abort(HTTPStatus.NOT_FOUND, f"No stored log {name}")
+        return None, HTTPStatus.NO_CONTENT
+
+
+@ns_pm.route("/dfg-store/<string:name>/inductive-miner", endpoint="dfg-store-inductive-miner")
+@ns_pm.doc(
+    description=(
+        "Petri net of a stored log, mined from its directly-follows graph with the inductive "
+        "miner for DFGs. The cost does not depend on the number of stored events.\n"
+    )
+)
+class DfgStoreInductiveMiner(Resource):
+    @ns_pm.response(int(HTTPStatus.OK), "Success")
+    @ns_pm.response(int(HTTPStatus.NOT_FOUND), "Unknown log")
+    def get(self, name):
+        discovered = dfg_store_miner(name)
+        if discovered is None:
+            abort(HTTPStatus.NOT_FOUND, f"No stored log {name}")
+        pnml_filename, pnml_data = discovered
+        return {
+            'filename': pnml_filename,
+            'results': pnml_data
+        }, HTTPStatus.OK
 
 
 @ns_pm.route("/analysis/fitness-token-play", endpoint="fitness-token-play")
 @ns_pm.doc(
     description=(
         "Fitness analysis based on token-play.\n"
-        "File 1: Upload an event log in .csv or in .xes format.\n"
+        "File 1: Upload an event log in .csv, .xes, .parquet or .feather/.arrow format.\n"
         "File 2: Upload a Petri net in .pnml format.\n"
+        "engine: pm4py (default) runs PM4Py's token replay; compiled replays each trace variant "
+        "once on the incidence matrices and needs no timestamps, but its figures can differ on "
+        "nets with duplicate labels or hidden transitions (see process_mining_srv.token_replay).\n"
     )
 )
 class AnalysisFitnessTokenPlay(Resource):
@@ -136,33 +407,15 @@ class AnalysisFitnessTokenPlay(Resource):
             pnml_filename = secure_filename(pnml_file.filename)
             
             if not allowed_file_extension(event_log_filename):
-                raise TypeError("Invalid format of event log. Allowed: csv or xes")
-            
-            
-            event_log = event_log_processer(uploaded_event_log=event_log_file)
+                raise TypeError("Invalid format of event log. Allowed: csv, xes, parquet, feather or arrow")
             
             pnml_file_extension = pnml_filename.rsplit('.', 1)[-1].lower()
             if not pnml_file_extension == 'pnml':
                 raise TypeError("Not a pnml file.")
             
-            # create a temp file on disk
-            temp_pnml = tempfile.NamedTemporaryFile(delete=False, suffix='.pnml')
-            temp_pnml_path = temp_pnml.name
-            temp_pnml.close()
-            
-            # write the uploaded data into the temp file
-            pnml_file.save(temp_pnml_path)
-            
-            
-            pn, im, fm = pm4py.read_pnml(file_path=temp_pnml_path)
-            
-            
-            results = pm4py.fitness_token_based_replay(log=event_log, petri_net=pn, initial_marking=im, final_marking=fm)
-            
-            print(results)
-            
-            return {"result": results}, HTTPStatus.ACCEPTED
-        except TypeError as e:
+            return analysis_response('fitness-token-play', event_log_file, pnml_file, run_async=args['async'],
+                                     engine=args['engine'])
+        except (TypeError, ValueError) as e:
             return {"message": e.args}, HTTPStatus.BAD_REQUEST
     
 
@@ -170,7 +423,7 @@ class AnalysisFitnessTokenPlay(Resource):
 @ns_pm.doc(
     description=(
         "Fitness analysis based on alignment.\n"
-        "File 1: Upload an event log in .csv or in .xes format.\n"
+        "File 1: Upload an event log in .csv, .xes, .parquet or .feather/.arrow format.\n"
         "File 2: Upload a Petri net in .pnml format.\n"
     )
 )
@@ -189,33 +442,72 @@ class AnalysisFitnessAlignment(Resource):
             pnml_filename = secure_filename(pnml_file.filename)
             
             if not allowed_file_extension(event_log_filename):
-                raise TypeError("Invalid format of event log. Allowed: csv or xes")
-            
-            
-            event_log = event_log_processer(uploaded_event_log=event_log_file)
+                raise TypeError("Invalid format of event log. Allowed: csv, xes, parquet, feather or arrow")
             
             pnml_file_extension = pnml_filename.rsplit('.', 1)[-1].lower()
             if not pnml_file_extension == 'pnml':
                 raise TypeError("Not a .pnml file.")
             
-            # create a temp file on disk
-            temp_pnml = tempfile.NamedTemporaryFile(delete=False, suffix='.pnml')
-            temp_pnml_path = temp_pnml.name
-            temp_pnml.close()
-            
-            # write the uploaded data into the temp file
-            pnml_file.save(temp_pnml_path)
-            
-            
-            pn, im, fm = pm4py.read_pnml(file_path=temp_pnml_path)
-            
-            
-            results = pm4py.fitness_alignments(log=event_log, petri_net=pn, initial_marking=im, final_marking=fm)
-            
-            print(results)
-            
-            return {"result": results}, HTTPStatus.ACCEPTED
-        except TypeError as e:
+            return analysis_response('fitness-alignment', event_log_file, pnml_file, run_async=args['async'],
+                                     engine=args['engine'])
+        except (TypeError, ValueError) as e:
+            return {"message": e.args}, HTTPStatus.BAD_REQUEST
+    
+
+
+@ns_pm.route("/analysis/batch", endpoint="analysis-batch")
+@ns_pm.doc(
+    description=(
+        "Conformance of many event logs against one Petri net.\n"
+        "Model: upload pnml_model, or give pnml_path relative to the datasets directory.\n"
+        "Logs: upload event_logs and/or give dataset_paths relative to the datasets directory, "
+        "e.g. `Process Discovery Contest 2023_1_all/Base Logs/*.xes`.\n"
+        "analyses: any of fitness-token-play, fitness-alignment, precision-token-play, "
+        "precision-alignment (default: the two alignment ones).\n"
+        "The model is parsed once and the logs are analysed in ALIGNMENT_WORKERS processes. "
+        "The result has one row per log, with an error message instead of results for a "
+        "log that failed.\n"
+    )
+)
+class AnalysisBatch(Resource):
+    @ns_pm.response(int(HTTPStatus.CREATED), "Success")
+    @ns_pm.response(int(HTTPStatus.ACCEPTED), "Submitted as a job (async=true)", job_submitted_model)
+    @ns_pm.response(int(HTTPStatus.BAD_REQUEST), "Type Error")
+    @ns_pm.expect(batch_upload_parser)
+    def post(self):
+        
+        args = batch_upload_parser.parse_args()
+        
+        try:
+            if args['pnml_model'] is not None:
+                pnml_file: FileStorage = args['pnml_model']
+                if not secure_filename(pnml_file.filename).rsplit('.', 1)[-1].lower() == 'pnml':
+                    raise TypeError("Not a .pnml file.")
+                pnml_data = read_upload(pnml_file)
+            elif args['pnml_path']:
+                pnml_files = dataset_files(args['pnml_path'])
+                if len(pnml_files) != 1 or not pnml_files[0][0].lower().endswith('.pnml'):
+                    raise ValueError("pnml_path must match one .pnml file")
+                with open(pnml_files[0][1], 'rb') as f:
+                    pnml_data = f.read()
+            else:
+                raise TypeError("Upload pnml_model or give pnml_path.")
+            
+            # read now, the uploads are gone once the request is answered
+            event_logs = [(secure_filename(f.filename), read_upload(f)) for f in args['event_logs']]
+            for pattern in args['dataset_paths']:
+                for name, path in dataset_files(pattern):
+                    with open(path, 'rb') as f:
+                        event_logs.append((name, f.read()))
+            
+            batch_args = (pnml_data, event_logs, args['analyses'], current_app.config["ALIGNMENT_WORKERS"],
+                          args['engine'])
+            if args['async']:
+                job = submit_job('analysis-batch', lambda: {"result": run_batch_analysis(*batch_args)})
+                return submitted(job), HTTPStatus.ACCEPTED
+            
+            return {"result": run_batch_analysis(*batch_args)}, HTTPStatus.CREATED
+        except (TypeError, ValueError) as e:
             return {"message": e.args}, HTTPStatus.BAD_REQUEST
     
 
@@ -278,8 +570,11 @@ class AnalysisFitnessAlignment(Resource):
 @ns_pm.doc(
     description=(
         "Precision analysis based on token-play.\n"
-        "File 1: Upload an event log in .csv or in .xes format.\n"
+        "File 1: Upload an event log in .csv, .xes, .parquet or .feather/.arrow format.\n"
         "File 2: Upload a Petri net in .pnml format.\n"
+        "engine: pm4py (default) runs PM4Py's token replay; compiled replays each trace variant "
+        "once on the incidence matrices and needs no timestamps, but its figures can differ on "
+        "nets with duplicate labels or hidden transitions (see process_mining_srv.token_replay).\n"
     )
 )
 class AnalysisPrecisionTokenPlay(Resource):
@@ -297,37 +592,15 @@ class AnalysisPrecisionTokenPlay(Resource):
             pnml_filename = secure_filename(pnml_file.filename)
             
             if not allowed_file_extension(event_log_filename):
-                raise TypeError("Invalid format of event log. Allowed: csv or xes")
-            
-            
-            event_log = event_log_processer(uploaded_event_log=event_log_file)
+                raise TypeError("Invalid format of event log. Allowed: csv, xes, parquet, feather or arrow")
             
             pnml_file_extension = pnml_filename.rsplit('.', 1)[-1].lower()
             if not pnml_file_extension == 'pnml':
                 raise TypeError()
             
-            # create a temp file on disk
-            temp_pnml = tempfile.NamedTemporaryFile(delete=False, suffix='.pnml')
-            temp_pnml_path = temp_pnml.name
-            temp_pnml.close()
-            
-            # write the uploaded data into the temp file
-            pnml_file.save(temp_pnml_path)
-            
-            
-            
-            pn, im, fm = pm4py.read_pnml(file_path=temp_pnml_path)
-            
-            
-            results = pm4py.precision_token_based_replay(log=event_log, 
-                                                       petri_net=pn, 
-                                                       initial_marking=im, 
-                                                       final_marking=fm)
-            
-            print(results)
-            
-            return {"result": results}, HTTPStatus.ACCEPTED
-        except TypeError as e:
+            return analysis_response('precision-token-play', event_log_file, pnml_file, run_async=args['async'],
+                                     engine=args['engine'])
+        except (TypeError, ValueError) as e:
             return {"message": e.args}, HTTPStatus.BAD_REQUEST
         
         
@@ -336,7 +609,7 @@ class AnalysisPrecisionTokenPlay(Resource):
     description=(
         "Precision analysis based on alignment.\n"
         
-        "File 1: Upload an event log in .csv or in .xes format.\n"
+        "File 1: Upload an event log in .csv, .xes, .parquet or .feather/.arrow format.\n"
         "File 2: Upload a Petri net in .pnml format.\n"
         
     )
@@ -356,35 +629,15 @@ class AnalysisPrecisionAlignment(Resource):
             pnml_filename = secure_filename(pnml_file.filename)
             
             if not allowed_file_extension(event_log_filename):
-                raise TypeError("Invalid format of event log. Allowed: csv or xes")
-            
-            
-            event_log = event_log_processer(uploaded_event_log=event_log_file)
+                raise TypeError("Invalid format of event log. Allowed: csv, xes, parquet, feather or arrow")
             
             pnml_file_extension = pnml_filename.rsplit('.', 1)[-1].lower()
             if not pnml_file_extension == 'pnml':
                 raise TypeError()
             
-            # create a temp file on disk
-            temp_pnml = tempfile.NamedTemporaryFile(delete=False, suffix='.pnml')
-            temp_pnml_path = temp_pnml.name
-            temp_pnml.close()
-            
-            # write the uploaded data into the temp file
-            pnml_file.save(temp_pnml_path)
-            
-            
-            pn, im, fm = pm4py.read_pnml(file_path=temp_pnml_path)
-            
-            
-            results = pm4py.precision_alignments(log=event_log,
-                                                petri_net=pn,
-                                                initial_marking=im,
-                                                final_marking=fm)
-            
-            
-            return {"result": results}, HTTPStatus.ACCEPTED
-        except TypeError as e:
+            return analysis_response('precision-alignment', event_log_file, pnml_file, run_async=args['async'],
+                                     engine=args['engine'])
+        except (TypeError, ValueError) as e:
             return {"message": e.args}, HTTPStatus.BAD_REQUEST
         
 
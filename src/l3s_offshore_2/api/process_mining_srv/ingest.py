@@ -0,0 +1,387 @@
+"""Fast ingestion of event logs into normalized PM4Py dataframes.
+
+`read_csv_log` builds the same dataframe as `pd.read_csv` followed by
+`pm4py.format_dataframe`, but
+    - uses the pyarrow CSV engine (multi-threaded, parses the timestamps
+      itself) when pyarrow is installed,
+    - otherwise parses the timestamps in one vectorized `pd.to_datetime` call
+      and reads the case id, activity and resource columns as categoricals,
+      so repeated values are parsed and stored once,
+    - renames the key columns to the PM4Py keys instead of copying them.
+PM4Py only accepts string columns for the case id and activity, so those two
+end up in the (pyarrow-backed, if available) pandas string dtype; the
+resource stays categorical.
+
+`read_xes_log` streams an XES document trace by trace into column lists, so
+the memory used grows with the resulting dataframe and not with the XML tree.
+
+Parquet and Arrow IPC (Feather) logs are read with pyarrow (the `arrow`
+extra), memory-mapped when read from a path and zero-copy from upload bytes.
+`write_columnar_log` stores a normalized log in these formats; reading it
+back needs no parsing or normalization at all.
+"""
+import io
+import importlib.util
+import os
+
+import pandas as pd
+import pm4py
+from lxml.etree import XMLSyntaxError, iterparse
+from pm4py.util import constants, pandas_utils, xes_constants
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+CASE_KEY = constants.CASE_CONCEPT_NAME
+ACTIVITY_KEY = xes_constants.DEFAULT_NAME_KEY
+TIMESTAMP_KEY = xes_constants.DEFAULT_TIMESTAMP_KEY
+RESOURCE_KEY = xes_constants.DEFAULT_RESOURCE_KEY
+
+
+def parse_timestamps(values, timest_format=None):
+    """
+    Vectorized conversion to tz-aware UTC timestamps. Values that do not match
+    `timest_format` are parsed with per-element format inference instead.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.tz_localize("UTC") if values.dt.tz is None else values.dt.tz_convert("UTC")
+    try:
+        return pd.to_datetime(values, format=timest_format, utc=True)
+    except (ValueError, TypeError):
+        return pd.to_datetime(values, format="mixed", utc=True)
+
+
+def as_categorical(values):
+    """String categorical with lexically sorted categories, so sorting matches the string column."""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+    categories = values.cat.categories
+    if not pd.api.types.is_string_dtype(categories.dtype) or categories.dtype == object:
+        values = values.cat.rename_categories(categories.astype(str))
+    return values.cat.reorder_categories(sorted(values.cat.categories))
+
+
+def normalize_log(df, case_id="case_id", activity_key="activity", timestamp_key="timestamp",
+                  resource_key="resource", timest_format=None):
+    """
+    Turn a raw event table into a PM4Py event log dataframe, in place where possible.
+
+    The key columns are renamed to the PM4Py names (case:concept:name,
+    concept:name, time:timestamp, org:resource), rows missing one of the first
+    three are dropped, and the events are sorted by case and timestamp, with
+    the @@index/@@case_index columns and attrs set as by `pm4py.format_dataframe`.
+    Unlike there, the original key columns are not kept next to the PM4Py ones.
+
+    Raises:
+        ValueError: a key column is missing.
+    """
+    for key in (case_id, activity_key, timestamp_key):
+        if key not in df.columns:
+            raise ValueError(f"{key} column is not in the event log")
+    renames = {case_id: CASE_KEY, activity_key: ACTIVITY_KEY, timestamp_key: TIMESTAMP_KEY}
+    if resource_key in df.columns:
+        renames[resource_key] = RESOURCE_KEY
+    # PM4Py keys that would clash with the renamed columns
+    df = df.drop(columns=[c for c in renames.values() if c in df.columns and c not in renames])
+    df = df.rename(columns=renames)
+
+    df[TIMESTAMP_KEY] = parse_timestamps(df[TIMESTAMP_KEY], timest_format)
+    df = df.dropna(subset=[CASE_KEY, ACTIVITY_KEY, TIMESTAMP_KEY], how="any")
+    df[CASE_KEY] = df[CASE_KEY].astype("string")
+    df[ACTIVITY_KEY] = df[ACTIVITY_KEY].astype("string")
+    if RESOURCE_KEY in df.columns:
+        df[RESOURCE_KEY] = as_categorical(df[RESOURCE_KEY])
+
+    df = pandas_utils.insert_index(df, constants.DEFAULT_INDEX_KEY, copy_dataframe=False)
+    df = df.sort_values([CASE_KEY, TIMESTAMP_KEY, constants.DEFAULT_INDEX_KEY])
+    df = pandas_utils.insert_index(df, constants.DEFAULT_INDEX_KEY, copy_dataframe=False)
+    df = pandas_utils.insert_case_index(df, constants.DEFAULT_CASE_INDEX_KEY, copy_dataframe=False)
+    df.attrs.update({
+        constants.PARAMETER_CONSTANT_ACTIVITY_KEY: ACTIVITY_KEY,
+        constants.PARAMETER_CONSTANT_TIMESTAMP_KEY: TIMESTAMP_KEY,
+        constants.PARAMETER_CONSTANT_GROUP_KEY: xes_constants.DEFAULT_GROUP_KEY,
+        constants.PARAMETER_CONSTANT_TRANSITION_KEY: xes_constants.DEFAULT_TRANSITION_KEY,
+        constants.PARAMETER_CONSTANT_RESOURCE_KEY: RESOURCE_KEY,
+        constants.PARAMETER_CONSTANT_CASEID_KEY: CASE_KEY,
+    })
+    return df
+
+
+def read_csv_log(source, sep=";", case_id="case_id", activity_key="activity",
+                 timestamp_key="timestamp", resource_key="resource",
+                 timest_format="%Y-%m-%d %H:%M:%S%z", engine=None):
+    """
+    Read a CSV event log into a normalized PM4Py dataframe.
+
+    Args:
+        source: path, bytes or binary file object of the CSV.
+        sep (str): column separator.
+        case_id, activity_key, timestamp_key, resource_key (str): CSV column names.
+        timest_format (str): expected timestamp format, see `parse_timestamps`.
+        engine (str): pandas CSV engine, "pyarrow" if installed and "c" otherwise.
+
+    Returns:
+        pd.DataFrame: the event log, see `normalize_log`.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    if engine is None:
+        engine = "pyarrow" if HAS_PYARROW else "c"
+    if engine == "pyarrow":
+        # arrow-backed strings, and the timestamps are already parsed by the reader
+        dtype = None
+    else:
+        # categories straight from the reader; the timestamps stay text for parse_timestamps
+        dtype = {key: "category" for key in (case_id, activity_key, resource_key)}
+        dtype[timestamp_key] = str
+    df = pd.read_csv(source, sep=sep, engine=engine, dtype=dtype)
+    return normalize_log(df, case_id, activity_key, timestamp_key, resource_key, timest_format)
+
+
+XES_TYPES = ("string", "id", "date", "int", "float", "boolean", "list")
+
+
+def _local(tag):
+    """Tag without its namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _xes_value(tag, value):
+    """Python value of an XES attribute as the PM4Py importer reads it; dates are kept as text."""
+    if tag == "int":
+        return int(value)
+    if tag == "float":
+        return float(value)
+    if tag == "boolean":
+        return str(value).lower() == "true"
+    if tag == "list":
+        return None
+    return value
+
+
+def _nested(elem, tag, value):
+    """
+    Attribute with children, as PM4Py stores it: {"value": ..., "children": ...},
+    the children being a list of (key, value) pairs for <list> and a dict otherwise.
+    """
+    children = list(elem)
+    if _local(children[0].tag) == "values":
+        children = list(children[0])
+        store = []
+    else:
+        store = {}
+    for child in children:
+        child_tag = _local(child.tag)
+        if child_tag not in XES_TYPES:
+            continue
+        try:
+            child_value = _xes_value(child_tag, child.get("value"))
+        except (TypeError, ValueError):
+            continue
+        if child_tag == "date":
+            child_value = pd.Timestamp(child_value)
+        if len(child):
+            child_value = _nested(child, child_tag, child_value)
+        if isinstance(store, list):
+            store.append((child.get("key"), child_value))
+        else:
+            store[child.get("key")] = child_value
+    return {xes_constants.KEY_VALUE: value, xes_constants.KEY_CHILDREN: store}
+
+
+class _Columns:
+    """Event table filled row by row into one list per attribute; missing values are None."""
+
+    def __init__(self):
+        self.data = {}
+        self.dates = set()
+        self.rows = 0
+        # one str object per distinct value, activities and resources repeat a lot
+        self._strings = {}
+
+    def _column(self, key, start):
+        """Column `key`, cut or padded with None to `start` rows."""
+        column = self.data.setdefault(key, [])
+        if len(column) > start:
+            del column[start:]
+        elif len(column) < start:
+            column.extend([None] * (start - len(column)))
+        return column
+
+    def read(self, elem):
+        """(key, value, tag) of the attribute elements directly below `elem`."""
+        for child in elem:
+            tag = _local(child.tag)
+            if tag not in XES_TYPES:
+                continue
+            try:
+                value = _xes_value(tag, child.get("value"))
+            except (TypeError, ValueError):
+                # skipped, as the PM4Py importer does
+                continue
+            if isinstance(value, str):
+                value = self._strings.setdefault(value, value)
+            if len(child):
+                value = _nested(child, tag, value)
+            yield child.get("key"), value, tag
+
+    def add_event(self, elem):
+        row = self.rows
+        for key, value, tag in self.read(elem):
+            self._column(key, row).append(value)
+            if tag == "date":
+                self.dates.add(key)
+        self.rows += 1
+
+    def add_trace(self, elem, start):
+        """Copy the trace attributes to the events from row `start` on, as case:<key>."""
+        for key, value, tag in self.read(elem):
+            key = constants.CASE_ATTRIBUTE_PREFIX + key
+            self._column(key, start).extend([value] * (self.rows - start))
+            if tag == "date":
+                self.dates.add(key)
+
+    def to_frame(self):
+        columns = {}
+        for key in list(self.data):
+            # popped one by one, so the lists are freed while the frame is built
+            column = self._column(key, self.rows)
+            del self.data[key]
+            series = pd.Series(column)
+            del column
+            if key in self.dates:
+                series = parse_timestamps(series, "ISO8601")
+            columns[key] = series
+        self._strings.clear()
+        return pd.DataFrame(columns, index=pd.RangeIndex(self.rows))
+
+
+def read_xes_log(source):
+    """
+    Stream an XES event log into a dataframe, as `pm4py.read_xes` would return it.
+
+    Only <event> and <trace> elements are reported by the parser. An event
+    becomes a row when it ends and is cleared right away; the trace attributes
+    (with the case: prefix) are copied to its events when the trace ends, and
+    the trace and the traces before it are dropped from the tree.
+
+    Args:
+        source: path, bytes or binary file object of the XES document.
+
+    Returns:
+        pd.DataFrame: one row per event, in document order.
+
+    Raises:
+        ValueError: the document is not well-formed XML.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif isinstance(source, os.PathLike):
+        source = os.fspath(source)
+
+    table = _Columns()
+    trace_start = 0
+    try:
+        for _, elem in iterparse(source, events=("end",), tag=("{*}event", "{*}trace"),
+                                 remove_comments=True):
+            if _local(elem.tag) == "event":
+                parent = elem.getparent()
+                if parent is not None and _local(parent.tag) == "trace":
+                    table.add_event(elem)
+                # the emptied element stays until its trace ends, its siblings include the trace attributes
+                elem.clear()
+                continue
+            table.add_trace(elem, trace_start)
+            trace_start = table.rows
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    except XMLSyntaxError as e:
+        raise ValueError(f"Invalid XES document: {e}") from e
+
+    df = table.to_frame()
+    df.attrs = {
+        constants.PARAMETER_CONSTANT_ACTIVITY_KEY: ACTIVITY_KEY,
+        constants.PARAMETER_CONSTANT_ATTRIBUTE_KEY: ACTIVITY_KEY,
+        constants.PARAMETER_CONSTANT_TIMESTAMP_KEY: TIMESTAMP_KEY,
+        constants.PARAMETER_CONSTANT_RESOURCE_KEY: RESOURCE_KEY,
+        constants.PARAMETER_CONSTANT_TRANSITION_KEY: xes_constants.DEFAULT_TRANSITION_KEY,
+        constants.PARAMETER_CONSTANT_GROUP_KEY: xes_constants.DEFAULT_GROUP_KEY,
+    }
+    if constants.DEFAULT_XES_FORMAT_DATAFRAME:
+        df = pm4py.format_dataframe(df)
+    return df
+
+
+COLUMNAR_FORMATS = ("parquet", "feather", "arrow")
+
+
+def _require_pyarrow():
+    if not HAS_PYARROW:
+        raise ImportError(
+            "Parquet and Arrow event logs need pyarrow, install l3s_offshore_2[arrow]"
+        )
+
+
+def read_columnar_log(source, fmt="parquet"):
+    """
+    Read a Parquet or Arrow IPC/Feather event log into a PM4Py dataframe.
+
+    A log with the PM4Py key columns (e.g. written by `write_columnar_log`) is
+    returned as stored, with its attrs; otherwise the columns are expected to
+    be named as in the CSV uploads and the log goes through `normalize_log`.
+
+    Args:
+        source: path (memory-mapped), bytes or binary file object of the log.
+        fmt (str): "parquet", or "feather"/"arrow" for Arrow IPC files.
+
+    Returns:
+        pd.DataFrame: the event log.
+
+    Raises:
+        ImportError: pyarrow is not installed.
+        ValueError: unknown format or unreadable file.
+    """
+    _require_pyarrow()
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unsupported columnar format: {fmt}")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        # reads the upload buffer in place
+        source = pa.BufferReader(source)
+    elif isinstance(source, (str, os.PathLike)):
+        source = pa.memory_map(os.fspath(source))
+    try:
+        table = pq.read_table(source) if fmt == "parquet" else feather.read_table(source)
+    except pa.ArrowException as e:
+        raise ValueError(f"Invalid {fmt} event log: {e}") from e
+    df = table.to_pandas()
+    del table
+    if {CASE_KEY, ACTIVITY_KEY} <= set(df.columns):
+        return df
+    return normalize_log(df)
+
+
+def write_columnar_log(df, fmt="parquet") -> bytes:
+    """
+    Serialize an event log dataframe to Parquet or Arrow IPC/Feather.
+
+    The dtypes (string, categorical, tz-aware timestamps) and `df.attrs` are
+    kept. Feather is written uncompressed, so it can be memory-mapped without
+    decoding.
+
+    Raises:
+        ImportError: pyarrow is not installed.
+        ValueError: unknown format.
+    """
+    _require_pyarrow()
+    buffer = io.BytesIO()
+    if fmt == "parquet":
+        df.to_parquet(buffer, index=False)
+    elif fmt in ("feather", "arrow"):
+        df.reset_index(drop=True).to_feather(buffer, compression="uncompressed")
+    else:
+        raise ValueError(f"Unsupported columnar format: {fmt}")
+    return buffer.getvalue()
@@ -1,13 +1,26 @@
 import pm4py
+import glob
 import os, pathlib, io
 from datetime import datetime
-import pandas as pd
-from l3s_offshore_2.utils.constants import TEMP_DIR
 from werkzeug.datastructures import FileStorage
 
-from pm4py.objects.petri_net.exporter import exporter as pnml_exporter
+from l3s_offshore_2.api.process_mining_srv.ingest import (COLUMNAR_FORMATS, read_columnar_log, read_csv_log,
+                                                          read_xes_log, write_columnar_log)
+from l3s_offshore_2.utils.cache import LRUCache, content_digest
+from l3s_offshore_2.utils.pool import default_workers, map_shared
+from l3s_offshore_2.utils.upload_io import iter_pnml, pnml_to_string, read_pnml, read_upload
+from . import conformance, dfg_store, discovery, token_replay
 
-ALLOWED_EXTENSIONS = {'csv', 'xes'}
+ALLOWED_EXTENSIONS = {'csv', 'xes', 'parquet', 'feather', 'arrow'}
+
+
+def _frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+# normalized event logs by (format, SHA-256 of the upload), shared by all
+# process-mining endpoints; bounds set from EVENT_LOG_CACHE_* in create_app
+log_cache = LRUCache(maxsize=16, max_bytes=512 * 2**20, sizeof=_frame_nbytes)
 
 def allowed_file_extension(filename:str):
     return (
@@ -16,44 +29,296 @@ def allowed_file_extension(filename:str):
     )
     
     
-def event_log_processer(uploaded_event_log):
-    event_log_suffix = uploaded_event_log.filename.rsplit('.', 1)[-1]
+def parse_event_log(data, event_log_suffix):
+    """Parse the raw bytes of a .csv, .xes, .parquet or .feather/.arrow event log into a dataframe."""
     if event_log_suffix == 'csv':
-        raw_data = pd.read_csv(uploaded_event_log, sep=";")
-        event_log = pm4py.format_dataframe(raw_data, 
-                                           case_id='case_id', 
-                                           activity_key='activity', 
-                                           timestamp_key='timestamp', 
-                                           timest_format='%Y-%m-%d %H:%M:%S%z')
+        # pyarrow engine and vectorized timestamps, same frame as pm4py.format_dataframe
+        event_log = read_csv_log(data,
+                                 case_id='case_id',
+                                 activity_key='activity',
+                                 timestamp_key='timestamp',
+                                 timest_format='%Y-%m-%d %H:%M:%S%z')
     
     if event_log_suffix == 'xes':
-        event_log = pm4py.read_xes(uploaded_event_log)
+        # streamed trace by trace, no XML tree or EventLog objects are kept
+        event_log = read_xes_log(data)
+    
+    if event_log_suffix in COLUMNAR_FORMATS:
+        # stored by /process-mining/convert, or with the CSV column names
+        event_log = read_columnar_log(data, event_log_suffix)
     
     return event_log
 
 
-def inductive_miner(uploaded_event_log):
+def load_event_log(data, event_log_suffix):
+    """
+    The normalized dataframe of an event log given as bytes. A log that was
+    loaded before (same content and format) is served from `log_cache`.
+    """
+    event_log = log_cache.get_or_create(
+        (event_log_suffix, content_digest(data)),
+        lambda: parse_event_log(data, event_log_suffix),
+    )
+    # shallow copy, callers may add or replace columns without touching the cached frame
+    return event_log.copy(deep=False)
+
+
+def event_log_processer(uploaded_event_log):
+    """The normalized dataframe of an uploaded event log, see `load_event_log`."""
+    event_log_suffix = uploaded_event_log.filename.rsplit('.', 1)[-1].lower()
+    return load_event_log(read_upload(uploaded_event_log), event_log_suffix)
+
+
+def discover_net(event_log_data, event_log_filename, mode='log', max_variants=None, workers=1):
     '''
     A wrapper of pm4py.discover_petri_net_inductive
     
     input:
-        event_log
+        event log content as bytes, its file name, discovery mode (one of
+        discovery.DISCOVERY_MODES), number of most frequent variants to mine
+        (None for the whole log), processes to count the DFG in
     
     output:
-        Petri net in .pnml file
+        (PNML file name, (Petri net, initial marking, final marking))
     '''
     
-    event_log = event_log_processer(uploaded_event_log)
-    pn, im, fm = pm4py.discover_petri_net_inductive(log=event_log, timestamp_key="time:timestamp")
+    event_log_suffix = event_log_filename.rsplit('.', 1)[-1].lower()
+    event_log = load_event_log(event_log_data, event_log_suffix)
+    discovered = discovery.discover_petri_net(event_log, mode=mode, max_variants=max_variants, workers=workers)
     
-    uploaded_file_id = uploaded_event_log.filename.rsplit('.', 1)[0].lower()
+    uploaded_file_id = event_log_filename.rsplit('.', 1)[0].lower()
     
     time_id = datetime.now().strftime("%Y%m%d%H%M%S")
-    pnml_file_path = f'{TEMP_DIR}/{uploaded_file_id}_{time_id}.pnml'
-    
-    pm4py.write_pnml(petri_net=pn, initial_marking=im, final_marking=fm, file_path=pnml_file_path)
-    
-    return pnml_file_path
+    return f'{uploaded_file_id}_{time_id}.pnml', discovered
+
+
+def inductive_miner(event_log_data, event_log_filename, mode='log', max_variants=None, workers=1):
+    '''
+    `discover_net` with the Petri net serialized
+
+    output:
+        (file name, Petri net as a PNML string)
+    '''
+    pnml_filename, discovered = discover_net(event_log_data, event_log_filename, mode=mode,
+                                             max_variants=max_variants, workers=workers)
+    # serialized in memory, nothing is written to disk
+    return pnml_filename, pnml_to_string(*discovered)
+
+
+def inductive_miner_download(event_log_data, event_log_filename, mode='log', max_variants=None, workers=1):
+    '''
+    `discover_net` with the Petri net as a PNML download
+
+    output:
+        (file name, iterator over the PNML document in chunks of bytes)
+    '''
+    pnml_filename, discovered = discover_net(event_log_data, event_log_filename, mode=mode,
+                                             max_variants=max_variants, workers=workers)
+    return pnml_filename, iter_pnml(*discovered)
+
+
+def append_to_dfg_store(name, event_log_data, event_log_filename):
+    '''
+    Append an event log batch to the stored directly-follows graph of a named log
+
+    input:
+        log name, content of the batch as bytes, its file name
+
+    output:
+        summary of the stored log
+    '''
+    if not allowed_file_extension(event_log_filename):
+        raise TypeError("Only .csv, .xes, .parquet, .feather or .arrow files are allowed.")
+    event_log_suffix = event_log_filename.rsplit('.', 1)[-1].lower()
+    # not kept in the log cache, a batch is only read once
+    return dfg_store.append_batch(name, parse_event_log(event_log_data, event_log_suffix))
+
+
+def dfg_store_miner(name):
+    '''
+    Inductive miner on the stored directly-follows graph of a named log
+
+    output:
+        (file name, Petri net as a PNML string), None if there is no log of that name
+    '''
+    discovered = dfg_store.discover_petri_net(name)
+    if discovered is None:
+        return None
+    time_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    return f'{name.lower()}_{time_id}.pnml', pnml_to_string(*discovered)
+
+
+ANALYSES = ('fitness-token-play', 'fitness-alignment', 'precision-token-play', 'precision-alignment')
+# implementations of the token-play analyses: PM4Py's, or token_replay on the compiled net
+# (opt-in, its figures can differ from PM4Py's, see the token_replay module)
+ENGINES = ('pm4py', 'compiled')
+
+
+def analyse(analysis, event_log, pn, im, fm, variants=None, model_digest=None, workers=1, engine='pm4py'):
+    '''
+    One of ANALYSES on a parsed event log and Petri net
+
+    input:
+        analysis, event log dataframe, Petri net with initial and final marking,
+        the trace variants if already known, SHA-256 of the PNML to look the
+        alignments up in the database (None to skip it), processes for the alignments,
+        token replay engine (one of ENGINES)
+
+    output:
+        a dict for fitness, a float for precision
+    '''
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {', '.join(ENGINES)}")
+    if analysis == 'fitness-token-play':
+        if engine == 'compiled':
+            # one replay per variant on the incidence matrices, no timestamps needed
+            return token_replay.fitness_token_replay(event_log, pn, im, fm, variants=variants)
+        return pm4py.fitness_token_based_replay(log=event_log, petri_net=pn, initial_marking=im, final_marking=fm)
+    if analysis == 'precision-token-play':
+        if engine == 'compiled':
+            return token_replay.precision_token_replay(event_log, pn, im, fm, variants=variants)
+        return pm4py.precision_token_based_replay(log=event_log, petri_net=pn, initial_marking=im, final_marking=fm)
+    if analysis == 'fitness-alignment':
+        # one alignment per trace variant, weighted by its frequency; variants
+        # aligned against the same PNML before are read from the database
+        return conformance.fitness_alignments(event_log, pn, im, fm, variants=variants,
+                                              model_digest=model_digest, workers=workers)
+    if analysis == 'precision-alignment':
+        # prefixes and their frequencies taken from the trace variants
+        return conformance.precision_alignments(event_log, pn, im, fm, variants=variants, workers=workers)
+    raise ValueError(f"Unknown analysis {analysis!r}, expected one of {', '.join(ANALYSES)}")
+
+
+def run_analysis(analysis, event_log_data, event_log_suffix, pnml_data, workers=1, engine='pm4py'):
+    '''
+    Run one of the conformance analyses of /process-mining/analysis
+
+    input:
+        analysis (one of ANALYSES), event log and PNML content as bytes,
+        event log format, processes for the alignments, token replay engine
+
+    output:
+        the result: a dict for fitness, a float for precision
+    '''
+    if analysis not in ANALYSES:
+        raise ValueError(f"Unknown analysis {analysis!r}, expected one of {', '.join(ANALYSES)}")
+    event_log = load_event_log(event_log_data, event_log_suffix)
+    # parsed from memory, no temp file on disk
+    pn, im, fm = read_pnml(pnml_data)
+    return analyse(analysis, event_log, pn, im, fm, model_digest=content_digest(pnml_data), workers=workers,
+                   engine=engine)
+
+
+def dataset_files(pattern):
+    '''
+    Files of the datasets directory (BASE_DATASETS_PATH) matching a relative path or glob pattern
+
+    input:
+        pattern, e.g. 'Process Discovery Contest 2023_1_all/Base Logs/pdc2023_1*.xes'
+
+    output:
+        sorted list of (file name, absolute path)
+    '''
+    base = os.path.realpath(os.getenv('BASE_DATASETS_PATH', 'datasets'))
+    paths = sorted(glob.glob(os.path.join(glob.escape(base), pattern)))
+    files = []
+    for path in paths:
+        path = os.path.realpath(path)
+        # no '..' or symlink out of the datasets directory
+        if os.path.commonpath([base, path]) == base and os.path.isfile(path):
+            files.append((os.path.basename(path), path))
+    if not files:
+        raise ValueError(f"No dataset file matches {pattern!r}")
+    return files
+
+
+def _batch_row(shared, event_log, name):
+    pn, im, fm, analyses, engine, model_digest = shared
+    row = {'event_log': name}
+    variants = None
+    if engine == 'compiled' or any(analysis.endswith('-alignment') for analysis in analyses):
+        # shared by the analyses, only PM4Py's token replay builds its own
+        variants = conformance.log_variants(event_log)
+        row['cases'], row['variants'] = sum(variants.values()), len(variants)
+    for analysis in analyses:
+        try:
+            row[analysis] = analyse(analysis, event_log, pn, im, fm, variants=variants, model_digest=model_digest,
+                                    engine=engine)
+        except Exception as e:
+            # e.g. token replay needs timestamps, the other analyses of the log still count
+            row[analysis] = None
+            row.setdefault('errors', {})[analysis] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def _batch_worker(shared, item):
+    """One row of `run_batch_analysis`, in a worker process: no log cache, no database."""
+    name, data, suffix = item
+    try:
+        return _batch_row(shared[:-1] + (None,), parse_event_log(data, suffix), name)
+    except Exception as e:
+        return {'event_log': name, 'error': f"{type(e).__name__}: {e}"}
+
+
+def run_batch_analysis(pnml_data, event_logs, analyses=ANALYSES, workers=1, engine='pm4py'):
+    '''
+    Run conformance analyses of many event logs against one Petri net
+
+    The PNML is parsed once. With workers > 1 the logs are parsed and analysed
+    in a process pool (one log per task, alignments inside it sequential);
+    otherwise they go through the log cache and the stored alignments.
+    A log that cannot be read gets an 'error' instead of results, an analysis
+    that fails a None result and its message in the 'errors' of the row.
+
+    input:
+        PNML content as bytes, list of (file name, content as bytes),
+        analyses to run (from ANALYSES), processes, 0 or None for one per CPU,
+        token replay engine (one of ENGINES)
+
+    output:
+        {'analyses': [...], 'rows': [{'event_log', 'cases', 'variants', <analysis>: result, 'errors'} or
+                                     {'event_log', 'error'}, in the order of event_logs]}
+    '''
+    analyses = list(dict.fromkeys(analyses))
+    unknown = [analysis for analysis in analyses if analysis not in ANALYSES]
+    if unknown or not analyses:
+        raise ValueError(f"Unknown analyses {unknown}, expected some of {', '.join(ANALYSES)}")
+    if not event_logs:
+        raise ValueError("No event log given")
+    for name, _ in event_logs:
+        if not allowed_file_extension(name):
+            raise TypeError(f"Invalid format of event log {name}. Allowed: csv, xes, parquet, feather or arrow")
+
+    pn, im, fm = read_pnml(pnml_data)
+    shared = (pn, im, fm, analyses, engine, content_digest(pnml_data))
+    items = [(name, data, name.rsplit('.', 1)[-1].lower()) for name, data in event_logs]
+
+    workers = min(workers or default_workers(), len(items))
+    if workers > 1:
+        rows = map_shared(_batch_worker, shared, items, max_workers=workers)
+    else:
+        rows = []
+        for name, data, suffix in items:
+            try:
+                rows.append(_batch_row(shared, load_event_log(data, suffix), name))
+            except Exception as e:
+                rows.append({'event_log': name, 'error': f"{type(e).__name__}: {e}"})
+    return {'analyses': analyses, 'rows': rows}
+
+
+def convert_event_log(uploaded_event_log, target_format='parquet'):
+    '''
+    Convert an uploaded event log to Parquet or Arrow IPC/Feather
+
+    input:
+        uploaded_event_log, target_format ('parquet', 'feather' or 'arrow')
+
+    output:
+        (file name, file content as bytes)
+    '''
+    event_log = event_log_processer(uploaded_event_log)
+    uploaded_file_id = uploaded_event_log.filename.rsplit('.', 1)[0].lower()
+    return f'{uploaded_file_id}.{target_format}', write_columnar_log(event_log, target_format)
 
 
 
@@ -4,6 +4,15 @@ test_model = Model("test", {
     "message": fields.String(required=True, default="success")
 })
 
+cache_stats_model = Model("CacheStats", {
+    "size": fields.Integer(description="Number of cached nets"),
+    "maxsize": fields.Integer(description="Capacity (PNML_CACHE_SIZE)"),
+    "hits": fields.Integer,
+    "misses": fields.Integer,
+    "evictions": fields.Integer,
+    "hit_rate": fields.Float,
+})
+
 # test_response_model = Model("test", {
 #     "message": fields.String(required=True)
 # })
\ No newline at end of file
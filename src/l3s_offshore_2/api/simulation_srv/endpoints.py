@@ -2,30 +2,77 @@ from http import HTTPStatus
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
-import pm4py
-import tempfile
 # import flask
-from flask import request, url_for
+from flask import Response, current_app, request, url_for
 
 # import flask-restx
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, inputs
 from flask_restx.reqparse import RequestParser
 
-from .logic import simple_sim_run
+from .logic import export_replications, net_cache, simple_sim_run, simple_sim_stream
+from l3s_offshore_2.api.jobs_srv.dto import job_submitted_model
+from l3s_offshore_2.api.jobs_srv.logic import submit_job, submitted
+from l3s_offshore_2.utils.upload_io import read_upload
 
 ## import dto
-from .dto import test_model
+from .dto import cache_stats_model, test_model
 
 ns_sim = Namespace("Simulation", validate=True)
 
 ## dto registration
 ns_sim.models[test_model.name] = test_model
+ns_sim.models[cache_stats_model.name] = cache_stats_model
+ns_sim.models[job_submitted_model.name] = job_submitted_model
 
 sim_upload_parser = ns_sim.parser()
 sim_upload_parser.add_argument(
     'pnml_model', location='files', type=FileStorage, required=True,
     help='PNML Petri net file'
 )
+sim_upload_parser.add_argument(
+    'async', location='form', type=inputs.boolean, default=False,
+    help='Run in the background: answer 202 with a job_id to poll at GET /jobs/<job_id>'
+)
+
+sim_stream_parser = ns_sim.parser()
+sim_stream_parser.add_argument(
+    'pnml_model', location='files', type=FileStorage, required=True,
+    help='PNML Petri net file'
+)
+sim_stream_parser.add_argument(
+    'until', location='form', type=inputs.positive, required=False,
+    help='Stop at this simulation time (one firing per time unit); runs until no transition is enabled if not given'
+)
+sim_stream_parser.add_argument(
+    'enabled', location='form', type=inputs.boolean, default=False,
+    help='Also stream the transitions enabled after each firing'
+)
+
+sim_export_parser = ns_sim.parser()
+sim_export_parser.add_argument(
+    'pnml_model', location='files', type=FileStorage, required=True,
+    help='PNML Petri net file'
+)
+sim_export_parser.add_argument(
+    'replications', location='form', type=inputs.positive, default=100,
+    help='Number of simulation runs, one case each'
+)
+sim_export_parser.add_argument(
+    'format', location='form', type=str, default='xes', choices=('xes', 'parquet'),
+    help='Event log format: xes, or parquet (needs pyarrow)'
+)
+sim_export_parser.add_argument(
+    'seed', location='form', type=int, required=False,
+    help='Root seed; the same seed gives the same log'
+)
+sim_export_parser.add_argument(
+    'until', location='form', type=inputs.positive, required=False,
+    help='Simulation time limit per replication, for nets that never stop'
+)
+sim_export_parser.add_argument(
+    'include_silent', location='form', type=inputs.boolean, default=False,
+    help='Keep the firings of transitions without a label, named by their id'
+)
 
 
 @ns_sim.route("/simple-sim", endpoint="simple-sim")
@@ -37,6 +84,7 @@ sim_upload_parser.add_argument(
 )
 class SimpleSimulation(Resource):
     @ns_sim.response(int(HTTPStatus.CREATED), "Success")
+    @ns_sim.response(int(HTTPStatus.ACCEPTED), "Submitted as a job (async=true)", job_submitted_model)
     @ns_sim.response(int(HTTPStatus.BAD_REQUEST), "Type Error")
     @ns_sim.expect(sim_upload_parser)
     def post(self):
@@ -48,21 +96,104 @@ class SimpleSimulation(Resource):
             if not pnml_file_extension == 'pnml':
                 raise TypeError("Not a pnml file.")
             
-            # create a temp file on disk
-            temp_pnml = tempfile.NamedTemporaryFile(delete=False, suffix='.pnml')
-            temp_pnml_path = temp_pnml.name
-            temp_pnml.close()
-            # write the uploaded data into the temp file
-            pnml_file.save(temp_pnml_path)
-            
-            sim_results = simple_sim_run(pnml_path=temp_pnml_path)
+            # parse the upload in memory, no temp file on disk
+            pnml_data = read_upload(pnml_file)
+            if args['async']:
+                job = submit_job('simple-sim', lambda: {"results": simple_sim_run(pnml=pnml_data)})
+                return submitted(job), HTTPStatus.ACCEPTED
             
+            sim_results = simple_sim_run(pnml=pnml_data)
             
             return {"results": sim_results}, HTTPStatus.CREATED
             
-        except TypeError as e:
+        except (TypeError, ValueError) as e:
             return {"message": e.args}, HTTPStatus.BAD_REQUEST
 
+
+@ns_sim.route("/simple-sim/stream", endpoint="simple-sim-stream")
+@ns_sim.doc(
+    description=(
+        "Simulation of Convential Petri Nets, streamed as NDJSON while it runs.\n"
+        "File: Upload a Petri net in .pnml format.\n"
+        "One JSON object per line: {\"event\": \"fired\", \"time\", \"transition\", \"label\"} "
+        "per firing, {\"event\": \"enabled\", \"time\", \"transitions\"} after it with enabled=true, "
+        "and {\"event\": \"finished\", \"time\"} at the end. Nothing of the run is kept on the "
+        "server, so its memory does not grow with the number of firings.\n"
+    )
+)
+class SimpleSimulationStream(Resource):
+    @ns_sim.response(int(HTTPStatus.OK), "Success")
+    @ns_sim.response(int(HTTPStatus.BAD_REQUEST), "Type Error")
+    @ns_sim.expect(sim_stream_parser)
+    def post(self):
+        args = sim_stream_parser.parse_args()
+        pnml_file: FileStorage = args['pnml_model']
+        try:
+            pnml_filename = secure_filename(pnml_file.filename)
+            if not pnml_filename.rsplit('.', 1)[-1].lower() == 'pnml':
+                raise TypeError("Not a pnml file.")
+
+            # compiled here, the response starts once the net is known to be valid
+            chunks = simple_sim_stream(read_upload(pnml_file), until=args['until'], with_enabled=args['enabled'])
+            return Response(chunks, mimetype='application/x-ndjson')
+        except (TypeError, ValueError) as e:
+            return {"message": e.args}, HTTPStatus.BAD_REQUEST
+
+
+@ns_sim.route("/simple-sim/export", endpoint="simple-sim-export")
+@ns_sim.doc(
+    description=(
+        "Event log of simulation replications of a Conventional Petri Net, one case per "
+        "replication and one event per labelled firing, timestamped from 1970-01-01 UTC "
+        "at one second per simulation time unit.\n"
+        "File: Upload a Petri net in .pnml format.\n"
+        "The .xes or .parquet file is streamed while the replications run (in SIMULATION_WORKERS "
+        "processes), and can be uploaded as it is to the /process-mining endpoints.\n"
+    )
+)
+class SimpleSimulationExport(Resource):
+    @ns_sim.response(int(HTTPStatus.OK), "Success")
+    @ns_sim.response(int(HTTPStatus.BAD_REQUEST), "Type Error")
+    @ns_sim.response(int(HTTPStatus.NOT_IMPLEMENTED), "pyarrow is not installed")
+    @ns_sim.expect(sim_export_parser)
+    def post(self):
+        args = sim_export_parser.parse_args()
+        pnml_file: FileStorage = args['pnml_model']
+        try:
+            pnml_filename = secure_filename(pnml_file.filename)
+            if not pnml_filename.rsplit('.', 1)[-1].lower() == 'pnml':
+                raise TypeError("Not a pnml file.")
+
+            filename, chunks = export_replications(
+                read_upload(pnml_file), args['replications'], fmt=args['format'], seed=args['seed'],
+                until=args['until'], include_silent=args['include_silent'],
+                workers=current_app.config["SIMULATION_WORKERS"])
+            mimetype = 'application/xml' if args['format'] == 'xes' else 'application/vnd.apache.parquet'
+            return Response(chunks, mimetype=mimetype,
+                            headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+        except (TypeError, ValueError) as e:
+            return {"message": e.args}, HTTPStatus.BAD_REQUEST
+        except ImportError as e:
+            return {"message": e.args}, HTTPStatus.NOT_IMPLEMENTED
+
+
+@ns_sim.route("/net-cache", endpoint="net-cache")
+@ns_sim.doc(
+    description=(
+        "Cache of compiled nets, keyed by the SHA-256 of the uploaded PNML.\n"
+        "GET: size and hit/miss/eviction counters. DELETE: drop all cached nets.\n"
+    )
+)
+class NetCache(Resource):
+    @ns_sim.marshal_with(cache_stats_model)
+    def get(self):
+        return net_cache.stats(), HTTPStatus.OK
+
+    @ns_sim.marshal_with(cache_stats_model)
+    def delete(self):
+        net_cache.clear()
+        return net_cache.stats(), HTTPStatus.OK
+
 # @ns_sim.route("/test-get", endpoint="test-get")
 # class RecsysTest(Resource):
 #     @ns_sim.marshal_with(test_model)
@@ -1,15 +1,42 @@
-import pm4py
 # from l3s_offshore_2.api.test import ns_sim
-from l3s_offshore_2.petri_net_sim.simplepn import SimplePN, SimpleSimulator
+import json
+from datetime import datetime
 
+from l3s_offshore_2.petri_net_sim.export import iter_event_log
+from l3s_offshore_2.petri_net_sim.pnml import load_pnml
+from l3s_offshore_2.petri_net_sim.simplepn import SimpleSimulator
+from l3s_offshore_2.petri_net_sim.sinks import QueueSink
+from l3s_offshore_2.utils.cache import LRUCache, content_digest
+from l3s_offshore_2.utils.upload_io import CHUNK_SIZE
 
+# compiled nets by SHA-256 of their PNML; resized from PNML_CACHE_SIZE in create_app
+net_cache = LRUCache(maxsize=32)
 
-def simple_sim_run(pnml_path):
-    pn, im, fm = pm4py.read_pnml(file_path=pnml_path)
-            
-    simple_pn = SimplePN.convert_to_simple_pn(pn=pn, initial_marking=im)
+
+def compiled_net(pnml):
+    """
+    The compiled net of a PNML document (path or bytes), parsed at most once
+    per distinct content while it stays in `net_cache`.
+    """
+    if not isinstance(pnml, (bytes, bytearray)):
+        with open(pnml, "rb") as f:
+            pnml = f.read()
+
+    def build():
+        compiled = load_pnml(pnml)
+        # shared by all later simulations of this net
+        compiled.build_dependency_index()
+        return compiled
+
+    return net_cache.get_or_create(content_digest(pnml), build)
+
+
+def simple_sim_run(pnml):
+    """Simulate a PNML net, given as a file path or as the uploaded bytes."""
+    # compiled straight from the PNML, without the PM4Py/SimplePN object graphs
+    compiled = compiled_net(pnml)
     
-    sim = SimpleSimulator(net=simple_pn, initial_marking=im)
+    sim = SimpleSimulator(net=compiled, engine="incremental", columnar_trace=True)
     
     sim.run()
     
@@ -18,6 +45,56 @@ def simple_sim_run(pnml_path):
     
     simulation_results = {
         "firing_seq" : firing_seq_ids, # Use the new list of PNML IDs
-        "detailed_log": sim.detailed_log
+        "detailed_log": dict(sim.detailed_log)  # materialize the lazy view for the JSON body
     }
-    return simulation_results
\ No newline at end of file
+    return simulation_results
+
+
+def simple_sim_stream(pnml, until=None, with_enabled=False):
+    """
+    Simulate a PNML net as `simple_sim_run` does, as NDJSON produced while it runs.
+
+    One JSON object per line and event: {"event": "fired", "time", "transition",
+    "label"}, with `with_enabled` also {"event": "enabled", "time", "transitions"}
+    after each firing, and {"event": "finished", "time"} when no transition is
+    enabled any more. Nothing of the run is kept, lines go out in chunks of about
+    CHUNK_SIZE bytes. The net is compiled before the first chunk, so an invalid
+    PNML raises here rather than in the middle of the response.
+
+    until: stop at this simulation time (one step per time unit), None runs
+           until no transition is enabled.
+    """
+    compiled = compiled_net(pnml)
+    sink = QueueSink(with_enabled=with_enabled)
+    sim = SimpleSimulator(net=compiled, engine="incremental", sink=sink, record=False)
+
+    def chunks():
+        lines, size = [], 0
+        for _ in sim.iter_run(until=until):
+            for event in sink.drain():
+                line = json.dumps(event)
+                lines.append(line)
+                size += len(line) + 1
+            if size >= CHUNK_SIZE:
+                yield "\n".join(lines) + "\n"
+                lines, size = [], 0
+        lines.extend(json.dumps(event) for event in sink.drain())
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    return chunks()
+
+
+def export_replications(pnml, replications, fmt="xes", seed=None, until=None, include_silent=False, workers=1):
+    """
+    Event log of simulation replications of a PNML net, one case per replication.
+
+    Returns (file name, iterator over the XES or Parquet file in chunks of bytes),
+    see `petri_net_sim.export`; the net is compiled and the format checked
+    before the first chunk.
+    """
+    compiled = compiled_net(pnml)
+    chunks = iter_event_log(compiled, replications, fmt=fmt, seed=seed, until=until,
+                            include_silent=include_silent, workers=workers)
+    time_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    return f"simulation_{time_id}.{fmt}", chunks
@@ -20,6 +20,23 @@ class Config:
     SWAGGER_UI_DOC_EXPANSION = "list"
     RESTX_MASK_SWAGGER = False
     JSON_SORT_KEYS = False
+    # compiled Petri nets kept in memory, keyed by the hash of their PNML
+    PNML_CACHE_SIZE = int(os.getenv("PNML_CACHE_SIZE", "32"))
+    # parsed event logs kept in memory, by number and by total dataframe size
+    EVENT_LOG_CACHE_SIZE = int(os.getenv("EVENT_LOG_CACHE_SIZE", "16"))
+    EVENT_LOG_CACHE_BYTES = int(os.getenv("EVENT_LOG_CACHE_BYTES", str(512 * 2**20)))
+    # processes the alignment analyses run in, 1 aligns inside the request, 0 uses every CPU
+    ALIGNMENT_WORKERS = int(os.getenv("ALIGNMENT_WORKERS", "1"))
+    # processes counting the directly-follows graph of /inductive-miner with mode=dfg, 0 uses every CPU
+    DISCOVERY_WORKERS = int(os.getenv("DISCOVERY_WORKERS", "1"))
+    # processes simulating the replications of /simulation-petri-nets/simple-sim/export, 0 uses every CPU
+    SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", "1"))
+    # threads running the requests submitted with async=true, see api.jobs_srv
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    # seconds between two renewals of the unfinished jobs of a process, and without
+    # one after which a job is taken for lost (its process died) and failed
+    JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+    JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
 
 
 class TestingConfig(Config):
@@ -0,0 +1,6 @@
+"""SQLAlchemy models, created in `create_app` with `db.create_all`."""
+from l3s_offshore_2.models.alignment_cache import AlignmentCache
+from l3s_offshore_2.models.job import Job
+from l3s_offshore_2.models.dfg_store import DfgActivity, DfgCase, DfgEdge, DfgLog
+
+__all__ = ["AlignmentCache", "Job", "DfgActivity", "DfgCase", "DfgEdge", "DfgLog"]
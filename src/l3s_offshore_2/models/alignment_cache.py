@@ -0,0 +1,60 @@
+"""Class definition for the AlignmentCache model."""
+import json
+
+from l3s_offshore_2 import db
+from l3s_offshore_2.utils.cache import content_digest
+from l3s_offshore_2.utils.datetime_util import utc_now
+
+
+class AlignmentCache(db.Model):
+    """
+    Optimal alignment of one trace variant against one Petri net.
+
+    Rows are keyed by the SHA-256 of the PNML document and of the variant, so
+    a model aligned against a new log only needs the A* search for variants
+    it has not seen before.
+    """
+
+    __tablename__ = "alignment_cache"
+
+    model_digest = db.Column(db.String(64), primary_key=True)
+    variant_digest = db.Column(db.String(64), primary_key=True)
+    variant = db.Column(db.Text, nullable=False)
+    cost = db.Column(db.Integer, nullable=False)
+    fitness = db.Column(db.Float, nullable=False)
+    bwc = db.Column(db.Integer, nullable=False)
+    moves = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=utc_now)
+
+    def __repr__(self):
+        return (
+            f"<AlignmentCache model={self.model_digest[:12]}, "
+            f"variant={self.variant_digest[:12]}, cost={self.cost}>"
+        )
+
+    @staticmethod
+    def variant_key(variant):
+        """Digest of an activity sequence."""
+        return content_digest(json.dumps(list(variant), ensure_ascii=False))
+
+    @classmethod
+    def from_alignment(cls, model_digest, variant, alignment):
+        """Row for a PM4Py alignment dict (with 'alignment', 'cost', 'fitness' and 'bwc')."""
+        return cls(
+            model_digest=model_digest,
+            variant_digest=cls.variant_key(variant),
+            variant=json.dumps(list(variant), ensure_ascii=False),
+            cost=int(alignment["cost"]),
+            fitness=float(alignment["fitness"]),
+            bwc=int(alignment["bwc"]),
+            moves=json.dumps(alignment["alignment"], ensure_ascii=False),
+        )
+
+    def to_alignment(self):
+        """The alignment dict as returned by PM4Py, limited to the stored keys."""
+        return {
+            "alignment": [tuple(move) for move in json.loads(self.moves)],
+            "cost": self.cost,
+            "fitness": self.fitness,
+            "bwc": self.bwc,
+        }
@@ -0,0 +1,71 @@
+"""Class definitions for the directly-follows graph store."""
+from l3s_offshore_2 import db
+from l3s_offshore_2.utils.datetime_util import utc_now
+
+
+class DfgLog(db.Model):
+    """
+    A named event log kept as its directly-follows graph.
+
+    Batches of events are appended to the log; only the counts of the graph
+    and the last activity of every case are stored, not the events.
+    """
+
+    __tablename__ = "dfg_log"
+
+    name = db.Column(db.String(128), primary_key=True)
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    cases = db.Column(db.Integer, nullable=False, default=0)
+    events = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=utc_now)
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+
+    def __repr__(self):
+        return f"<DfgLog name={self.name}, batches={self.batches}, events={self.events}>"
+
+
+class DfgEdge(db.Model):
+    """Number of times `target` directly follows `source` in a case of the log."""
+
+    __tablename__ = "dfg_edge"
+
+    log_name = db.Column(db.String(128), db.ForeignKey("dfg_log.name", ondelete="CASCADE"), primary_key=True)
+    source = db.Column(db.Text, primary_key=True)
+    target = db.Column(db.Text, primary_key=True)
+    frequency = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DfgEdge log={self.log_name}, {self.source} -> {self.target}: {self.frequency}>"
+
+
+class DfgActivity(db.Model):
+    """Events of an activity in the log, and the cases it starts and ends."""
+
+    __tablename__ = "dfg_activity"
+
+    log_name = db.Column(db.String(128), db.ForeignKey("dfg_log.name", ondelete="CASCADE"), primary_key=True)
+    activity = db.Column(db.Text, primary_key=True)
+    frequency = db.Column(db.Integer, nullable=False, default=0)
+    starts = db.Column(db.Integer, nullable=False, default=0)
+    ends = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DfgActivity log={self.log_name}, {self.activity}: {self.frequency}>"
+
+
+class DfgCase(db.Model):
+    """
+    Last activity of a case of the log.
+
+    A case continued by a later batch is linked to it by an edge from this
+    activity, which then no longer ends the case.
+    """
+
+    __tablename__ = "dfg_case"
+
+    log_name = db.Column(db.String(128), db.ForeignKey("dfg_log.name", ondelete="CASCADE"), primary_key=True)
+    case_id = db.Column(db.String(256), primary_key=True)
+    last_activity = db.Column(db.Text, nullable=False)
+
+    def __repr__(self):
+        return f"<DfgCase log={self.log_name}, case={self.case_id}, last={self.last_activity}>"
@@ -0,0 +1,50 @@
+"""Class definition for the Job model."""
+import json
+
+from l3s_offshore_2 import db
+from l3s_offshore_2.utils.datetime_util import utc_now
+
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+SUCCESS = "SUCCESS"
+FAILURE = "FAILURE"
+
+
+class Job(db.Model):
+    """
+    A request run in the background by `api.jobs_srv`.
+
+    The row is the only state shared with the web workers: its status, and the
+    JSON result or error message once finished, can be served by any of them.
+    The process that accepted the job renews `heartbeat_at` while it is queued
+    or running; a job left without renewal belonged to a process that is gone.
+    """
+
+    __tablename__ = "job"
+
+    id = db.Column(db.String(36), primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default=PENDING, index=True)
+    message = db.Column(db.Text)
+    result_json = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=utc_now)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # server process running the job, and when it last reported the job alive
+    owner = db.Column(db.String(36), index=True)
+    heartbeat_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<Job id={self.id}, kind={self.kind}, status={self.status}>"
+
+    @property
+    def result(self):
+        return json.loads(self.result_json) if self.result_json is not None else None
+
+    @result.setter
+    def result(self, value):
+        self.result_json = json.dumps(value) if value is not None else None
+
+    @property
+    def finished(self):
+        return self.status in (SUCCESS, FAILURE)
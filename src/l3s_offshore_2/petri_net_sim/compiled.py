@@ -0,0 +1,285 @@
+"""Compiled (integer-indexed) form of a Petri net.
+
+A `CompiledPN` holds the pre/post incidence matrices of a net with places
+and transitions mapped to integer indices once, so that enablement becomes a
+single vectorized comparison of the marking vector against the pre-matrix
+and firing becomes a vector add.
+"""
+import numpy as np
+from scipy import sparse as sp
+
+
+class CompiledPN:
+    def __init__(self, place_names, transition_names, pre, post, initial_marking=None,
+                 transition_labels=None, transitions=None, use_sparse=False, name=None,
+                 transition_properties=None):
+        """
+        Build the compiled net from |T| x |P| pre/post matrices (dense or scipy sparse).
+
+        Args:
+            place_names (list): place names, position = place index.
+            transition_names (list): transition names, position = transition index.
+            pre (np.ndarray | sp.spmatrix): tokens consumed, pre[t, p].
+            post (np.ndarray | sp.spmatrix): tokens produced, post[t, p].
+            initial_marking (np.ndarray): initial token vector, defaults to zeros.
+            transition_labels (list): transition labels (None for invisible ones).
+            transitions (list): the original transition objects, if any.
+            use_sparse (bool): store the matrices as scipy CSR matrices.
+            name (str): name of the net.
+            transition_properties (list): per-transition dicts, e.g. the GSPN
+                                          definitions ('type', 'priority', ...).
+        """
+        self.name = name
+        self.place_names = tuple(place_names)
+        self.transition_names = tuple(transition_names)
+        self.transition_labels = tuple(
+            transition_names if transition_labels is None else transition_labels
+        )
+        # objects handed back by the simulator, plain names if there are none
+        self.transitions = tuple(self.transition_names if transitions is None else transitions)
+        self.transition_properties = tuple(
+            [{} for _ in self.transition_names] if transition_properties is None
+            else transition_properties
+        )
+
+        self.place_index = {p: i for i, p in enumerate(self.place_names)}
+        self.transition_index = {t: i for i, t in enumerate(self.transition_names)}
+
+        if initial_marking is None:
+            initial_marking = np.zeros(len(self.place_names), dtype=np.int64)
+        self.initial_marking = np.asarray(initial_marking, dtype=np.int64)
+        # token vector of the final marking, if the source of the net defines one
+        self.final_marking = None
+
+        shape = (len(self.transition_names), len(self.place_names))
+        self.use_sparse = use_sparse
+        if use_sparse:
+            self.pre = sp.csr_matrix(pre, shape=shape, dtype=np.int64)
+            self.post = sp.csr_matrix(post, shape=shape, dtype=np.int64)
+            self.delta = (self.post - self.pre).tocsr()
+            self.delta.eliminate_zeros()
+            # transition index of every stored pre entry
+            self._pre_rows = np.repeat(
+                np.arange(self.n_transitions), np.diff(self.pre.indptr)
+            )
+        else:
+            self.pre = pre.toarray() if sp.issparse(pre) else np.asarray(pre, dtype=np.int64)
+            self.post = post.toarray() if sp.issparse(post) else np.asarray(post, dtype=np.int64)
+            self.pre = self.pre.reshape(shape)
+            self.post = self.post.reshape(shape)
+            self.delta = self.post - self.pre
+        
+        # place -> consuming transitions, built on demand by `build_dependency_index`
+        self.consumers = None
+        self._affected = {}
+        self._input_arcs = {}
+
+    @staticmethod
+    def _incidence(rows, cols, weights, shape):
+        """CSR matrix from (transition, place, weight) triplets, summing duplicates."""
+        return sp.csr_matrix(
+            (np.asarray(weights, dtype=np.int64), (np.asarray(rows, dtype=np.int64),
+                                                   np.asarray(cols, dtype=np.int64))),
+            shape=shape,
+        )
+
+    @property
+    def n_places(self):
+        return len(self.place_names)
+
+    @property
+    def n_transitions(self):
+        return len(self.transition_names)
+
+    @classmethod
+    def from_simple_pn(cls, net, initial_marking=None, use_sparse=False) -> "CompiledPN":
+        """
+        Compile a `SimplePN` (or any PM4Py `PetriNet`).
+
+        Places and transitions are indexed in the net's iteration order, which is
+        the order the object-based simulator scans them in. Arcs are read from
+        the transitions' `in_arcs`/`out_arcs` and matched to places by name.
+        """
+        places = list(net.places)
+        transitions = list(net.transitions)
+        place_names = [p.name for p in places]
+        place_index = {p: i for i, p in enumerate(place_names)}
+
+        pre, post = ([], [], []), ([], [], [])
+        for i, t in enumerate(transitions):
+            for arc in t.in_arcs:
+                pre[0].append(i)
+                pre[1].append(place_index[arc.source.name])
+                pre[2].append(arc.weight)
+            for arc in t.out_arcs:
+                post[0].append(i)
+                post[1].append(place_index[arc.target.name])
+                post[2].append(arc.weight)
+        shape = (len(transitions), len(places))
+
+        compiled = cls(
+            place_names=place_names,
+            transition_names=[t.name for t in transitions],
+            pre=cls._incidence(*pre, shape),
+            post=cls._incidence(*post, shape),
+            transition_labels=[t.label for t in transitions],
+            transitions=transitions,
+            use_sparse=use_sparse,
+            name=net.name,
+        )
+        if initial_marking is not None:
+            compiled.initial_marking = compiled.marking_vector(initial_marking)
+        return compiled
+
+    @classmethod
+    def from_gspn(cls, places, transitions, use_sparse=False) -> "CompiledPN":
+        """
+        Compile the dict-based GSPN definition used by `GSPNSimulator`.
+
+        Args:
+            places (dict): place name -> initial token count.
+            transitions (dict): transition name -> definition with 'input'/'output'
+                                lists of place names (one token per listed place).
+        """
+        place_names = list(places)
+        place_index = {p: i for i, p in enumerate(place_names)}
+
+        pre, post = ([], []), ([], [])
+        for i, spec in enumerate(transitions.values()):
+            for p in spec.get('input', []):
+                pre[0].append(i)
+                pre[1].append(place_index[p])
+            for p in spec.get('output', []):
+                post[0].append(i)
+                post[1].append(place_index[p])
+        shape = (len(transitions), len(places))
+
+        return cls(
+            place_names=place_names,
+            transition_names=list(transitions),
+            pre=cls._incidence(*pre, np.ones(len(pre[0])), shape),
+            post=cls._incidence(*post, np.ones(len(post[0])), shape),
+            initial_marking=[places[p] for p in place_names],
+            use_sparse=use_sparse,
+            transition_properties=list(transitions.values()),
+        )
+
+    def marking_vector(self, marking) -> np.ndarray:
+        """Convert a marking (Place->int or name->int) into a token vector."""
+        vector = np.zeros(self.n_places, dtype=np.int64)
+        for place, ntokens in marking.items():
+            name = place if isinstance(place, str) else place.name
+            vector[self.place_index[name]] = ntokens
+        return vector
+
+    def marking_dict(self, marking) -> dict:
+        """Convert a token vector into a place name -> tokens dict."""
+        return dict(zip(self.place_names, marking.tolist()))
+
+    def enabled(self, marking) -> np.ndarray:
+        """
+        Return the (sorted) indices of all transitions enabled in `marking`.
+        A transition is enabled iff marking >= pre[t] component-wise.
+        """
+        if self.use_sparse:
+            short = self.pre.data > marking[self.pre.indices]
+            blocked = np.bincount(self._pre_rows[short], minlength=self.n_transitions)
+            return np.flatnonzero(blocked == 0)
+        return np.flatnonzero((self.pre <= marking).all(axis=1))
+
+    def is_enabled(self, marking, t) -> bool:
+        if self.use_sparse:
+            start, end = self.pre.indptr[t], self.pre.indptr[t + 1]
+            return bool((marking[self.pre.indices[start:end]] >= self.pre.data[start:end]).all())
+        return bool((marking >= self.pre[t]).all())
+
+    def input_arcs(self, t):
+        """Input place indices and arc weights of transition `t`."""
+        arcs = self._input_arcs.get(t)
+        if arcs is None:
+            if self.use_sparse:
+                start, end = self.pre.indptr[t], self.pre.indptr[t + 1]
+                arcs = (self.pre.indices[start:end], self.pre.data[start:end])
+            else:
+                places = np.flatnonzero(self.pre[t])
+                arcs = (places, self.pre[t, places])
+            self._input_arcs[t] = arcs
+        return arcs
+
+    def build_dependency_index(self):
+        """
+        Precompute, for each place, the transitions that consume from it.
+        """
+        pre = self.pre.tocsc() if self.use_sparse else self.pre
+        if self.use_sparse:
+            self.consumers = [
+                pre.indices[pre.indptr[p]:pre.indptr[p + 1]] for p in range(self.n_places)
+            ]
+        else:
+            self.consumers = [np.flatnonzero(pre[:, p]) for p in range(self.n_places)]
+        self._affected = {}
+        return self.consumers
+
+    def affected(self, t):
+        """
+        Transitions whose enablement may change when `t` fires, i.e. the consumers
+        of every place whose marking `t` changes, together with their pre entries
+        flattened into (transition, place, weight) arrays for re-checking.
+        """
+        cached = self._affected.get(t)
+        if cached is not None:
+            return cached
+        if self.consumers is None:
+            self.build_dependency_index()
+
+        if self.use_sparse:
+            start, end = self.delta.indptr[t], self.delta.indptr[t + 1]
+            changed = self.delta.indices[start:end][self.delta.data[start:end] != 0]
+        else:
+            changed = np.flatnonzero(self.delta[t])
+        if len(changed):
+            affected = np.unique(np.concatenate([self.consumers[p] for p in changed]))
+        else:
+            affected = np.empty(0, dtype=np.int64)
+
+        if self.use_sparse:
+            # plain CSR slices; scipy fancy row indexing is slow for the small sets here
+            arcs = [self.input_arcs(u) for u in affected.tolist()]
+            rows = np.repeat(affected, [len(places) for places, _ in arcs])
+            places = np.concatenate([places for places, _ in arcs]) if arcs else affected
+            weights = np.concatenate([weights for _, weights in arcs]) if arcs else affected
+        else:
+            pre = self.pre[affected]
+            rows, places = np.nonzero(pre)
+            weights = pre[rows, places]
+            rows = affected[rows]
+        cached = (affected.tolist(), rows, places, weights)
+        self._affected[t] = cached
+        return cached
+
+    def refresh_enabled(self, enabled, marking, t):
+        """
+        Update the set `enabled` in place after `t` has fired into `marking`,
+        re-checking only the transitions affected by `t`.
+        Returns the affected transitions.
+        """
+        affected, rows, places, weights = self.affected(t)
+        if affected:
+            blocked = set(rows[marking[places] < weights].tolist())
+            enabled.difference_update(affected)
+            enabled.update(u for u in affected if u not in blocked)
+        return affected
+
+    def update_enabled(self, enabled, marking, t):
+        """Same as `refresh_enabled`, returning the enabled transitions as a sorted list."""
+        self.refresh_enabled(enabled, marking, t)
+        return sorted(enabled)
+
+    def fire(self, marking, t):
+        """Fire transition `t` in place: marking += post[t] - pre[t]."""
+        if self.use_sparse:
+            start, end = self.delta.indptr[t], self.delta.indptr[t + 1]
+            marking[self.delta.indices[start:end]] += self.delta.data[start:end]
+        else:
+            marking += self.delta[t]
+        return marking
@@ -0,0 +1,180 @@
+"""Pre-sampled delay streams for timed transitions.
+
+A transition's delay distribution is validated and bound to a sampler once,
+when the net is set up. The sampler draws blocks of variates at a time from
+a NumPy `Generator` and hands them out one by one from a buffer, so a firing
+costs a list lookup instead of a distribution dispatch and an RNG call.
+
+Supported distributions ('distribution' key, parameters in 'params'):
+    exponential  rate (default 1.0; also read from the transition's 'rate')
+    normal       mean (1.0), std_dev (0.1); negative draws are clipped to 0
+    lognormal    mu (0.0), sigma (1.0)
+    uniform      low (0.0), high (1.0)
+    gamma        shape (1.0), scale (1.0)
+    weibull      shape (1.0), scale (1.0)
+    triangular   left (0.0), mode (0.5), right (1.0)
+    fixed        the transition's 'fixed_time' (0)
+Any other name is looked up in `scipy.stats` and called with 'params' as
+keyword arguments (e.g. {'distribution': 'erlang', 'params': {'a': 2}}).
+"""
+import numpy as np
+
+MIN_BLOCK = 16
+MAX_BLOCK = 4096
+
+
+def _exponential(rng, spec, params):
+    scale = 1.0 / params.get('rate', spec.get('rate', 1.0))
+    return lambda size: rng.exponential(scale, size)
+
+
+def _normal(rng, spec, params):
+    mean, std_dev = params.get('mean', 1.0), params.get('std_dev', 0.1)
+    return lambda size: np.maximum(rng.normal(mean, std_dev, size), 0)
+
+
+def _lognormal(rng, spec, params):
+    mu, sigma = params.get('mu', 0.0), params.get('sigma', 1.0)
+    return lambda size: rng.lognormal(mu, sigma, size)
+
+
+def _uniform(rng, spec, params):
+    low, high = params.get('low', 0.0), params.get('high', 1.0)
+    return lambda size: rng.uniform(low, high, size)
+
+
+def _gamma(rng, spec, params):
+    shape, scale = params.get('shape', 1.0), params.get('scale', 1.0)
+    return lambda size: rng.gamma(shape, scale, size)
+
+
+def _weibull(rng, spec, params):
+    shape, scale = params.get('shape', 1.0), params.get('scale', 1.0)
+    return lambda size: scale * rng.weibull(shape, size)
+
+
+def _triangular(rng, spec, params):
+    left, mode, right = params.get('left', 0.0), params.get('mode', 0.5), params.get('right', 1.0)
+    return lambda size: rng.triangular(left, mode, right, size)
+
+
+def _scipy_distribution(distribution):
+    """The `scipy.stats` distribution called `distribution`, or None."""
+    from scipy import stats
+
+    dist = getattr(stats, distribution, None)
+    if isinstance(dist, (stats.rv_continuous, stats.rv_discrete)):
+        return dist
+    return None
+
+
+def _scipy(rng, dist, params):
+    frozen = dist(**params)
+    return lambda size: np.maximum(frozen.rvs(size=size, random_state=rng), 0)
+
+
+DISTRIBUTIONS = {
+    'exponential': _exponential,
+    'normal': _normal,
+    'lognormal': _lognormal,
+    'uniform': _uniform,
+    'gamma': _gamma,
+    'weibull': _weibull,
+    'triangular': _triangular,
+}
+
+
+class DelaySampler:
+    """Buffered stream of delays drawn in blocks by `draw(size)`."""
+
+    def __init__(self, draw):
+        self.draw = draw
+        self.block_size = MIN_BLOCK
+        self._buffer = iter(())
+
+    def __call__(self):
+        """Next delay."""
+        try:
+            return next(self._buffer)
+        except StopIteration:
+            # blocks grow with use, so rarely fired transitions draw few variates
+            self._buffer = iter(self.draw(self.block_size).tolist())
+            self.block_size = min(2 * self.block_size, MAX_BLOCK)
+            return next(self._buffer)
+
+    def sample(self, size):
+        """`size` delays at once as an array, bypassing the buffer."""
+        return np.asarray(self.draw(size), dtype=float)
+
+
+class FixedDelay(DelaySampler):
+    """Constant delay, no random draws."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        super().__init__(lambda size: np.full(size, delay, dtype=float))
+
+    def __call__(self):
+        return self.delay
+
+
+def delay_sampler(spec, rng, default=None, name=None) -> DelaySampler:
+    """
+    Validate the delay definition of one transition and bind it to `rng`.
+
+    Args:
+        spec (dict): the transition definition ('distribution', 'params', 'rate', 'fixed_time').
+        rng (np.random.Generator): generator the variates are drawn from.
+        default (str): distribution used when `spec` has none; by default 'fixed'
+                       for 'fixed' transitions and 'exponential' otherwise.
+        name (str): transition name, used in error messages.
+
+    Returns:
+        DelaySampler: call it for the next delay.
+
+    Raises:
+        ValueError: unknown distribution or invalid parameters.
+    """
+    if default is None:
+        default = 'fixed' if spec.get('type') == 'fixed' else 'exponential'
+    distribution = spec.get('distribution', default)
+    params = spec.get('params', {})
+    if distribution == 'fixed':
+        delay = spec.get('fixed_time', 0)
+        if delay < 0:
+            raise ValueError(f"Negative fixed_time for transition {name}: {delay}")
+        return FixedDelay(delay)
+
+    dist = None if distribution in DISTRIBUTIONS else _scipy_distribution(distribution)
+    if distribution not in DISTRIBUTIONS and dist is None:
+        raise ValueError(f"Unsupported distribution type: {distribution}")
+    try:
+        if dist is None:
+            draw = DISTRIBUTIONS[distribution](rng, spec, params)
+        else:
+            draw = _scipy(rng, dist, params)
+        # a trial draw surfaces invalid parameters now instead of at the first firing
+        if not np.all(np.isfinite(draw(1))):
+            raise ValueError("non-finite delay")
+    except (TypeError, ValueError, ZeroDivisionError) as e:
+        raise ValueError(f"Invalid {distribution} delay for transition {name}: {e}") from e
+    return DelaySampler(draw)
+
+
+def bind_delays(transitions, rng, default=None) -> dict:
+    """
+    Delay samplers for all timed transitions of a GSPN definition.
+
+    Args:
+        transitions (dict): transition name -> definition, as for `GSPNSimulator`.
+        rng (np.random.Generator): generator shared by the samplers.
+        default (str): distribution of transitions without one, see `delay_sampler`.
+
+    Returns:
+        dict: transition name -> DelaySampler; immediate transitions are left out.
+    """
+    return {
+        name: delay_sampler(spec, rng, default=default, name=name)
+        for name, spec in transitions.items()
+        if spec.get('type') != 'immediate'
+    }
@@ -0,0 +1,241 @@
+"""Event logs of simulation replications, in XES or Parquet.
+
+Every replication of `SimpleSimulator` becomes one case: its firings are the
+events, with the transition label as activity and the simulation time as an
+offset from `start` in `time_unit`s as timestamp. Silent transitions (without
+a label) are left out unless `include_silent`, which names them by their id.
+The logs can be uploaded to the /process-mining endpoints as they are.
+
+Replications are simulated one shard at a time, with the child seeds of
+`parallel.replication_seeds` (replication i gets the same seed as in
+`run_parallel_replications`), and optionally in a process pool
+(`utils.pool.imap_shared`). The writers are generators that hand out the
+document in chunks while the cases come in, so neither the traces nor the
+file are ever held in memory as a whole:
+    - XES is written case by case with lxml's incremental writer,
+    - Parquet one row group per `cases_per_row_group` cases with pyarrow
+      (the `arrow` extra), in the column layout of `write_columnar_log`.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+from lxml import etree
+from pm4py.objects.petri_net.obj import PetriNet
+from pm4py.util import constants, xes_constants
+
+from l3s_offshore_2.petri_net_sim.compiled import CompiledPN
+from l3s_offshore_2.petri_net_sim.parallel import replication_seeds
+from l3s_offshore_2.petri_net_sim.simplepn import SimpleSimulator
+from l3s_offshore_2.petri_net_sim.sinks import BufferSink
+from l3s_offshore_2.utils.pool import imap_shared
+
+CASE_KEY = constants.CASE_CONCEPT_NAME
+ACTIVITY_KEY = xes_constants.DEFAULT_NAME_KEY
+TIMESTAMP_KEY = xes_constants.DEFAULT_TIMESTAMP_KEY
+
+EXPORT_FORMATS = ("xes", "parquet")
+# simulation time 0 of every replication
+DEFAULT_START = pd.Timestamp("1970-01-01", tz="UTC")
+# bytes per chunk handed out by the writers
+CHUNK_SIZE = 64 * 1024
+
+
+def _simulate_shard(shared, seeds):
+    """Firings of one replication per seed, as (transition indices, times) arrays."""
+    compiled, until = shared
+    traces = []
+    positions = {name: i for i, name in enumerate(compiled.transition_names)}
+    for seed in seeds:
+        sink = BufferSink()
+        # nothing is recorded but the firings in the sink
+        sim = SimpleSimulator(compiled, engine="incremental", seed=seed, sink=sink, record=False)
+        sim.run(until=until)
+        index = np.array([positions[name] for name in sink.names], dtype=np.int64)
+        traces.append((index[np.asarray(sink.transitions, dtype=np.int64)], np.asarray(sink.times)))
+    return traces
+
+
+def replication_traces(net, n, seed=None, initial_marking=None, until=None, include_silent=False,
+                       workers=1, shard_size=64):
+    """
+    Simulate `n` replications of `net` and yield them one by one, in order.
+
+    Args:
+        net (CompiledPN | PetriNet): the net; a `SimplePN`/PM4Py net is compiled first.
+        n (int): number of replications.
+        seed (int): root seed, see `parallel.replication_seeds`.
+        initial_marking (Marking): initial marking, required when `net` is not compiled yet.
+        until (float): simulation time limit per replication (guards against cyclic nets).
+        include_silent (bool): keep the firings of unlabelled transitions, named by their id.
+        workers (int): processes to simulate in, 0 or None for one per CPU.
+        shard_size (int): replications per task of the pool.
+
+    Yields:
+        tuple: (case id, activities as an object array, simulation times as a float array);
+               case ids are zero-padded, so they sort in replication order.
+    """
+    if isinstance(net, PetriNet):
+        if initial_marking is None:
+            raise ValueError("The initial marking is required for a Petri net that is not compiled")
+        net = CompiledPN.from_simple_pn(net, initial_marking)
+    if net.consumers is None:
+        net.build_dependency_index()
+    seeds = replication_seeds(seed, n)
+    shards = [seeds[i:i + shard_size] for i in range(0, n, shard_size)]
+
+    labels = np.array([label if label is not None else (name if include_silent else None)
+                       for name, label in zip(net.transition_names, net.transition_labels)], dtype=object)
+    visible = np.array([label is not None for label in labels])
+    width = len(str(max(n - 1, 0)))
+    case = 0
+    for shard in imap_shared(_simulate_shard, (net, until), shards, max_workers=workers):
+        for transitions, times in shard:
+            keep = visible[transitions]
+            yield f"{case:0{width}d}", labels[transitions[keep]], times[keep]
+            case += 1
+
+
+class _ChunkSink(io.RawIOBase):
+    """Binary file that keeps what is written until `drain` hands it out."""
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._size += len(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def __len__(self):
+        return self._size
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts, self._size = [], 0
+        return data
+
+
+def _timestamps(times, start, time_unit):
+    return start + pd.to_timedelta(np.asarray(times, dtype=float) * (time_unit / pd.Timedelta(1, "us")), unit="us")
+
+
+def iter_xes(traces, start=DEFAULT_START, time_unit=pd.Timedelta(seconds=1), chunk_size=CHUNK_SIZE):
+    """
+    XES document of the cases of `replication_traces`, as UTF-8 chunks of about `chunk_size` bytes.
+    """
+    sink = _ChunkSink()
+    sink.write(b"<?xml version='1.0' encoding='utf-8'?>\n")
+    with etree.xmlfile(sink, encoding="utf-8") as xf:
+        with xf.element("log", {"xes.version": "1849-2016", "xes.features": "nested-attributes"},
+                        nsmap={None: "http://www.xes-standard.org/"}):
+            xf.write(etree.Element("extension", name="Concept", prefix="concept",
+                                   uri="http://www.xes-standard.org/concept.xesext"))
+            xf.write(etree.Element("extension", name="Time", prefix="time",
+                                   uri="http://www.xes-standard.org/time.xesext"))
+            for case_id, activities, times in traces:
+                trace = etree.Element("trace")
+                etree.SubElement(trace, "string", key=ACTIVITY_KEY, value=case_id)
+                stamps = np.datetime_as_string(
+                    _timestamps(times, start, time_unit).tz_convert(None).to_numpy(), unit="us")
+                for activity, stamp in zip(activities.tolist(), stamps.tolist()):
+                    event = etree.SubElement(trace, "event")
+                    etree.SubElement(event, "string", key=ACTIVITY_KEY, value=str(activity))
+                    etree.SubElement(event, "date", key=TIMESTAMP_KEY, value=stamp + "+00:00")
+                xf.write(trace)
+                if len(sink) >= chunk_size:
+                    yield sink.drain()
+    if len(sink):
+        yield sink.drain()
+
+
+def iter_parquet(traces, start=DEFAULT_START, time_unit=pd.Timedelta(seconds=1), cases_per_row_group=1000):
+    """
+    Parquet file of the cases of `replication_traces`, one chunk per row group of
+    `cases_per_row_group` cases, with the columns case:concept:name,
+    concept:name and time:timestamp (UTC).
+
+    Raises:
+        ImportError: pyarrow is not installed.
+    """
+    # checked before the first chunk is asked for
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet event logs need pyarrow, install l3s_offshore_2[arrow]") from e
+    return _parquet_chunks(pa, pq, traces, start, time_unit, cases_per_row_group)
+
+
+def _parquet_chunks(pa, pq, traces, start, time_unit, cases_per_row_group):
+    schema = pa.schema([(CASE_KEY, pa.string()), (ACTIVITY_KEY, pa.string()),
+                        (TIMESTAMP_KEY, pa.timestamp("us", tz="UTC"))])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def row_group(batch):
+        case_ids, activities, times = zip(*batch)
+        sizes = [len(a) for a in activities]
+        writer.write_table(pa.table({
+            CASE_KEY: pa.array(np.repeat(np.array(case_ids, dtype=object), sizes), pa.string()),
+            ACTIVITY_KEY: pa.array(np.concatenate(activities), pa.string()),
+            TIMESTAMP_KEY: pa.array(_timestamps(np.concatenate(times), start, time_unit), schema.field(2).type),
+        }, schema=schema))
+
+    batch = []
+    for trace in traces:
+        batch.append(trace)
+        if len(batch) >= cases_per_row_group:
+            row_group(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        row_group(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def iter_event_log(net, n, fmt="xes", seed=None, initial_marking=None, until=None, include_silent=False,
+                   workers=1, start=DEFAULT_START, time_unit=pd.Timedelta(seconds=1)):
+    """
+    Event log of `n` replications of `net` in `fmt` (one of EXPORT_FORMATS), as chunks of bytes.
+
+    See `replication_traces` for the simulation arguments.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+    traces = replication_traces(net, n, seed=seed, initial_marking=initial_marking, until=until,
+                                include_silent=include_silent, workers=workers)
+    if fmt == "xes":
+        return iter_xes(traces, start=start, time_unit=time_unit)
+    return iter_parquet(traces, start=start, time_unit=time_unit)
+
+
+def export_event_log(net, n, path, fmt=None, **kwargs):
+    """
+    Write the event log of `n` replications of `net` to `path` (or a binary file object).
+
+    The format is taken from the file extension when `fmt` is not given; the
+    other arguments are those of `iter_event_log`, e.g. `initial_marking` for a
+    net that is not compiled.
+    """
+    if fmt is None:
+        fmt = str(path).rsplit(".", 1)[-1].lower()
+    chunks = iter_event_log(net, n, fmt=fmt, **kwargs)
+    if hasattr(path, "write"):
+        for chunk in chunks:
+            path.write(chunk)
+        return
+    with open(path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
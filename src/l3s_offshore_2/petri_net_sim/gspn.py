@@ -1,10 +1,13 @@
 import simpy
 import random
-from scipy.stats import norm, expon
 from collections import OrderedDict
 
+import numpy as np
+
 from pm4py.objects.petri_net.obj import PetriNet
 
+from l3s_offshore_2.petri_net_sim.delays import bind_delays
+
 
 
 # class SimpleSimulator(object):
@@ -284,7 +287,7 @@ class GeneralizedStochasticPetriNet:
 
 
 class GSPNSimulator():
-    def __init__(self, places, transitions):
+    def __init__(self, places, transitions, seed=None, sink=None):
         """
         Initialize the GSPN with user-defined places and transitions.
 
@@ -297,13 +300,23 @@ class GSPNSimulator():
                                     'priority': <priority for immediate transitions>,
                                     'fixed_time': <fixed delay for fixed transitions>,
                                     'rate': <rate for stochastic transitions>,
+                                    'distribution': <delay distribution, see `delays`>,
+                                    'params': <parameters of the distribution>,
                                     'input': [list of input place names],
                                     'output': [list of output place names]
                                 }
+            seed (int): seeds a private `random.Random` and the delay generator; without
+                        it the module-level `random` state and fresh entropy are used.
+            sink (EventSink): receives the firing events; None reports nothing.
+
+        Raises:
+            ValueError: a transition has an unknown delay distribution or invalid parameters.
         """
         
         # Set up the SimPy environment
         self.env = simpy.Environment()
+        self.rng = random if seed is None else random.Random(seed)
+        self.sink = sink
 
         # Places: Dictionary to hold token counts for each place
         self.places = places
@@ -311,6 +324,9 @@ class GSPNSimulator():
         # Transitions: Define input/output places, type, rate, and priority
         self.transitions = transitions
 
+        # Delay samplers, validated and bound once per timed transition
+        self.samplers = bind_delays(transitions, np.random.default_rng(seed))
+
         # Firing log: Dictionary where keys are transition names, and values are lists of firing times
         self.firing_log = {t: [] for t in self.transitions}
         
@@ -336,7 +352,8 @@ class GSPNSimulator():
             # Log the firing event
             self.firing_log[transition].append(self.env.now)
             self.firing_sequence.append((transition, self.env.now))  # Record in firing sequence
-            print(f"Transition {transition} fired at time {self.env.now}. Current tokens: {self.places}")
+            if self.sink is not None:
+                self.sink.fired(self.env.now, transition, transition, self.places.copy)
 
     def get_enabled_transitions(self, transition_type):
         """Get all transitions of a given type that can fire."""
@@ -356,26 +373,8 @@ class GSPNSimulator():
         Returns:
             float: The sampled delay.
         """
-        distribution = self.transitions[transition].get('distribution', 'exponential')
-        params = self.transitions[transition].get('params', {})
+        return self.samplers[transition]()
 
-        if distribution == 'exponential':
-            rate = params.get('rate', 1.0)
-            return random.expovariate(rate)
-        elif distribution == 'normal':
-            mean = params.get('mean', 1.0)
-            std_dev = params.get('std_dev', 0.1)
-            return max(0, random.gauss(mean, std_dev))  # Ensure non-negative delay
-        elif distribution == 'lognormal':
-            mu = params.get('mu', 0.0)
-            sigma = params.get('sigma', 1.0)
-            return max(0, random.lognormvariate(mu, sigma))  # Ensure non-negative delay
-        elif distribution == 'fixed':
-            return self.transitions[transition].get('fixed_time', 0)
-        else:
-            raise ValueError(f"Unsupported distribution type: {distribution}")
-        
-    
     def simulate(self):
         """Simulate the GSPN."""
         while True:
@@ -391,7 +390,7 @@ class GSPNSimulator():
             # Handle stochastic transitions
             stochastic_transitions = self.get_enabled_transitions('stochastic')
             if stochastic_transitions:
-                batch = random.sample(stochastic_transitions, min(len(stochastic_transitions), 2))  # Example: max 2
+                batch = self.rng.sample(stochastic_transitions, min(len(stochastic_transitions), 2))  # Example: max 2
                 delays = [self.sample_delay(t) for t in batch]
                 # delay = min(delays)  # Wait for the shortest delay
                 delay = max(delays)  # Wait for the longest delay
@@ -402,14 +401,15 @@ class GSPNSimulator():
             # Handle fixed-time transitions
             fixed_transitions = self.get_enabled_transitions('fixed')
             if fixed_transitions:
-                batch = random.sample(fixed_transitions, min(len(fixed_transitions), 2))  # Example: max 2
+                batch = self.rng.sample(fixed_transitions, min(len(fixed_transitions), 2))  # Example: max 2
                 delay = self.sample_delay(batch[0])
                 yield self.env.timeout(delay)
                 self.fire(batch)
                 continue
 
             # If no transitions can fire, stop the simulation
-            print("No transitions can fire. Stopping simulation.")
+            if self.sink is not None:
+                self.sink.finished(self.env.now)
             break
     
         
@@ -441,7 +441,7 @@ class GSPNSimulator():
 
     #     return ordered_log
 
-    def run(self):
+    def run(self, until=None):
         """Run the simulation using the internal environment."""
         self.env.process(self.simulate())
-        self.env.run()
\ No newline at end of file
+        self.env.run(until=until)
\ No newline at end of file
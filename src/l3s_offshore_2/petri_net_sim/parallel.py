@@ -0,0 +1,91 @@
+"""Parallel replications of `SimpleSimulator`/`GSPNSimulator` runs.
+
+Replications are sharded over the shared process pool (`utils.pool`). The
+net is pickled once per call and unpickled once per worker, and every
+replication gets its own child seed spawned from one
+`np.random.SeedSequence`, so the merged result only depends on `seed` and
+not on the number of workers or shards.
+"""
+import numpy as np
+from pm4py.objects.petri_net.obj import PetriNet
+
+from l3s_offshore_2.petri_net_sim.compiled import CompiledPN
+from l3s_offshore_2.petri_net_sim.gspn import GSPNSimulator
+from l3s_offshore_2.petri_net_sim.replications import ReplicationResult
+from l3s_offshore_2.petri_net_sim.simplepn import SimpleSimulator
+from l3s_offshore_2.utils.pool import default_workers, map_shared
+
+GSPN_TYPES = ('immediate', 'stochastic', 'fixed')
+
+
+def replication_seeds(seed, n):
+    """Spawn `n` reproducible, independent integer seeds from `seed`."""
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(n)]
+
+
+def _run_simple(compiled, seed, until):
+    sim = SimpleSimulator(compiled, engine="incremental", seed=seed)
+    sim.run(until=until)
+    return sim, not sim.get_enabled_transitions()
+
+
+def _run_gspn(net, seed, until):
+    places, transitions = net
+    # the simulator updates the token counts of `places` in place
+    sim = GSPNSimulator(dict(places), transitions, seed=seed)
+    sim.run(until=until)
+    return sim, not any(sim.get_enabled_transitions(kind) for kind in GSPN_TYPES)
+
+
+def _run_shard(shared, seeds):
+    """Run one replication per seed in a worker process."""
+    kind, net, transition_names, until = shared
+    run = _run_gspn if kind == 'gspn' else _run_simple
+    index = {t: i for i, t in enumerate(transition_names)}
+
+    makespans = np.zeros(len(seeds))
+    counts = np.zeros((len(seeds), len(transition_names)), dtype=np.int64)
+    completed = np.zeros(len(seeds), dtype=bool)
+    for i, seed in enumerate(seeds):
+        sim, completed[i] = run(net, seed, until)
+        if sim.firing_sequence:
+            makespans[i] = sim.firing_sequence[-1][1]
+        for t, times in sim.firing_log.items():
+            counts[i, index[t]] = len(times)
+    return ReplicationResult(transition_names, makespans, counts, completed)
+
+
+def run_parallel_replications(net, n, seed=None, initial_marking=None, until=None,
+                              max_workers=None, shards=None) -> ReplicationResult:
+    """
+    Run `n` simulator replications of `net` across a process pool.
+
+    Args:
+        net: a `SimplePN`/PM4Py net or `CompiledPN` (run on `SimpleSimulator`), or a
+             GSPN definition `(places, transitions)` (run on `GSPNSimulator`).
+        n (int): number of replications.
+        seed (int): root seed; replication i always gets the same child seed.
+        initial_marking (Marking): initial marking of a not yet compiled net.
+        until (float): simulation time limit per replication.
+        max_workers (int): worker processes, defaults to the number of CPUs.
+        shards (int): number of work items, defaults to 4 per worker.
+
+    Returns:
+        ReplicationResult: the merged result, in replication order.
+    """
+    if isinstance(net, tuple):
+        kind, transition_names = 'gspn', tuple(net[1])
+    else:
+        if isinstance(net, PetriNet):
+            net = CompiledPN.from_simple_pn(net, initial_marking)
+        kind, transition_names = 'simple', net.transition_names
+
+    max_workers = max_workers or default_workers()
+    shards = max(1, min(n, shards or 4 * max_workers))
+    seeds = replication_seeds(seed, n)
+    seed_shards = [chunk.tolist() for chunk in np.array_split(np.array(seeds, dtype=object), shards)]
+
+    results = map_shared(
+        _run_shard, (kind, net, transition_names, until), seed_shards, max_workers=max_workers
+    )
+    return ReplicationResult.concatenate(results)
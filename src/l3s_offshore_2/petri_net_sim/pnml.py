@@ -0,0 +1,164 @@
+"""Streaming PNML reader that builds a `CompiledPN` directly.
+
+`load_pnml` walks the document once with lxml's `iterparse`, which only
+reports the place, transition, arc and net elements, and collects them as
+plain id/weight lists. Every element is released as soon as it has been
+read; no PM4Py or `SimplePN` object graph is built.
+
+Names follow the PM4Py importer: places and transitions are named by their
+PNML id, a transition's label is its <name> text, or None if it is marked
+invisible. Without <finalmarkings> the final marking puts one token in
+every place without outgoing arcs, as `pm4py.read_pnml` guesses it.
+"""
+import io
+import os
+
+import numpy as np
+from lxml.etree import XMLSyntaxError, iterparse
+
+from l3s_offshore_2.petri_net_sim.compiled import CompiledPN
+
+
+def _local(tag):
+    """Tag without its namespace."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _text(elem, child):
+    """Text of the <text> element below the direct child `child` of `elem`, or None."""
+    for sub in elem:
+        if _local(sub.tag) == child:
+            for text in sub:
+                if _local(text.tag) == 'text' and text.text:
+                    return text.text.strip()
+    return None
+
+
+def _invisible(elem):
+    for sub in elem:
+        if _local(sub.tag) != 'toolspecific':
+            continue
+        tool = sub.get('tool', '')
+        if 'ProM' in tool and 'invisible' in sub.get('activity', ''):
+            return True
+        if 'StochasticPetriNet' in tool:
+            for prop in sub:
+                if prop.get('key') == 'invisible' and (prop.text or '').lower() == 'true':
+                    return True
+    return False
+
+
+def _read_place(elem, places, tokens, final_tokens):
+    """Add a place (id and initial tokens), or an entry of the final marking."""
+    if elem.get('idref') is not None:
+        # final marking entry: <place idref="..."><text>n</text></place>
+        count = int((elem.findtext('{*}text') or '0').strip() or 0)
+        if count > 0:
+            place = elem.get('idref')
+            final_tokens[place] = final_tokens.get(place, 0) + count
+        return
+    places.append(elem.get('id'))
+    tokens.append(int(_text(elem, 'initialMarking') or 0))
+
+
+def _read_transition(elem, transitions, labels):
+    transitions.append(elem.get('id'))
+    labels.append(None if _invisible(elem) else (_text(elem, 'name') or elem.get('id')))
+
+
+def _read_arc(elem, arcs):
+    arcs.append((elem.get('source'), elem.get('target'), int(_text(elem, 'inscription') or 1)))
+
+
+def _arc_triplets(arcs, places, transitions):
+    """(transition, place, weight) lists of the pre and post matrices."""
+    place_index = {p: i for i, p in enumerate(places)}
+    transition_index = {t: i for i, t in enumerate(transitions)}
+    pre, post = ([], [], []), ([], [], [])
+    for src, tgt, weight in arcs:
+        if src in place_index and tgt in transition_index:
+            matrix, t, p = pre, transition_index[tgt], place_index[src]
+        elif src in transition_index and tgt in place_index:
+            matrix, t, p = post, transition_index[src], place_index[tgt]
+        else:
+            raise ValueError(f"Arc {src} -> {tgt} does not connect a place and a transition")
+        matrix[0].append(t)
+        matrix[1].append(p)
+        matrix[2].append(weight)
+    return pre, post
+
+
+def load_pnml(source, use_sparse=False) -> CompiledPN:
+    """
+    Read a PNML Petri net into a `CompiledPN`.
+
+    Args:
+        source: path of the .pnml file, the document as bytes (e.g. an upload),
+                or a binary file object.
+        use_sparse (bool): store the incidence matrices as scipy CSR matrices.
+
+    Returns:
+        CompiledPN: the net with its initial marking and `final_marking`.
+
+    Raises:
+        ValueError: the document is not well-formed XML or not a Petri net (no place
+                    or transition found), or an arc refers to an unknown node.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif isinstance(source, os.PathLike):
+        source = os.fspath(source)
+
+    net_name = None
+    places, tokens = [], []
+    transitions, labels = [], []
+    arcs = []                       # (source id, target id, weight)
+    final_tokens = {}
+
+    try:
+        tags = ('{*}place', '{*}transition', '{*}arc', '{*}name')
+        for _, elem in iterparse(source, tag=tags, remove_comments=True):
+            tag = _local(elem.tag)
+            if tag == 'name':
+                # kept for the enclosing element; the net's own name is read right away
+                parent = elem.getparent()
+                if parent is not None and _local(parent.tag) == 'net':
+                    net_name = _text(parent, 'name')
+                continue
+            if tag == 'place':
+                _read_place(elem, places, tokens, final_tokens)
+            elif tag == 'transition':
+                _read_transition(elem, transitions, labels)
+            elif tag == 'arc':
+                _read_arc(elem, arcs)
+            # drop the element and the already read siblings before it
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    except XMLSyntaxError as e:
+        raise ValueError(f"Invalid PNML document: {e}") from e
+
+    if not places and not transitions:
+        raise ValueError("No Petri net found in the PNML document")
+
+    pre, post = _arc_triplets(arcs, places, transitions)
+    shape = (len(transitions), len(places))
+
+    compiled = CompiledPN(
+        place_names=places,
+        transition_names=transitions,
+        pre=CompiledPN._incidence(*pre, shape),
+        post=CompiledPN._incidence(*post, shape),
+        initial_marking=tokens,
+        transition_labels=labels,
+        use_sparse=use_sparse,
+        name=net_name,
+    )
+    if final_tokens:
+        compiled.final_marking = compiled.marking_vector(final_tokens)
+    else:
+        # places nobody consumes from
+        sinks = np.ones(len(places), dtype=bool)
+        sinks[pre[1]] = False
+        compiled.final_marking = sinks.astype(np.int64)
+    return compiled
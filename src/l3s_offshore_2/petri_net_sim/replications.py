@@ -0,0 +1,190 @@
+"""Batched Monte Carlo replications of a compiled Petri net.
+
+`run_replications` advances N independent markings together as one
+N x |P| array: enablement, the random choice of the transition to fire and
+the firing itself are vectorized over all replications still running.
+
+Nets without timing information (e.g. a `SimplePN`) follow the
+`SimpleSimulator` semantics: one uniformly chosen enabled transition fires
+per time unit. GSPN nets (`CompiledPN.from_gspn`) fire enabled immediate
+transitions of the highest priority first; otherwise the enabled timed
+transitions race with enabling memory, as in `TimedPNSimulator`: a timed
+transition samples its delay when it becomes enabled and keeps the scheduled
+completion while it stays enabled, the earliest completion fires and
+advances the clock of its replication, and the schedule of a transition is
+dropped only when it gets disabled. Concurrent activities thus overlap
+instead of being serialized. Transitions of a GSPN without a type have no
+delay and are never scheduled; a replication in which only such transitions
+are enabled is deadlocked and ends there.
+"""
+import numpy as np
+from scipy import sparse as sp
+from pm4py.objects.petri_net.obj import PetriNet
+
+from l3s_offshore_2.petri_net_sim.compiled import CompiledPN
+from l3s_offshore_2.petri_net_sim.delays import delay_sampler
+
+
+class ReplicationResult:
+    """Per-replication outcome of a batch of simulation runs."""
+
+    def __init__(self, transition_names, makespans, firing_counts, completed):
+        """
+        Args:
+            transition_names (tuple): transition names, column order of `firing_counts`.
+            makespans (np.ndarray): time of the last firing per replication.
+            firing_counts (np.ndarray): N x |T| number of firings per transition.
+            completed (np.ndarray): False where a replication hit `max_steps`.
+        """
+        self.transition_names = tuple(transition_names)
+        self.makespans = makespans
+        self.firing_counts = firing_counts
+        self.completed = completed
+
+    def __len__(self):
+        return len(self.makespans)
+
+    @property
+    def n_firings(self):
+        return self.firing_counts.sum(axis=1)
+
+    @classmethod
+    def concatenate(cls, results) -> "ReplicationResult":
+        """Merge the results of several batches of the same net."""
+        results = list(results)
+        return cls(
+            transition_names=results[0].transition_names,
+            makespans=np.concatenate([r.makespans for r in results]),
+            firing_counts=np.concatenate([r.firing_counts for r in results]),
+            completed=np.concatenate([r.completed for r in results]),
+        )
+
+    def summary(self) -> dict:
+        """Aggregate makespan statistics over all replications."""
+        makespans = self.makespans
+        p5, p50, p95 = np.percentile(makespans, [5, 50, 95]) if len(makespans) else (0, 0, 0)
+        return {
+            "replications": len(makespans),
+            "completed": int(self.completed.sum()),
+            "makespan_mean": float(makespans.mean()) if len(makespans) else 0.0,
+            "makespan_std": float(makespans.std()) if len(makespans) else 0.0,
+            "makespan_p5": float(p5),
+            "makespan_p50": float(p50),
+            "makespan_p95": float(p95),
+            "mean_firing_counts": dict(
+                zip(self.transition_names, self.firing_counts.mean(axis=0).tolist())
+            ),
+        }
+
+
+def _pick(rng, candidates):
+    """Uniformly pick one True column per row of the boolean matrix `candidates`."""
+    counts = candidates.sum(axis=1)
+    draws = (rng.random(len(candidates)) * counts).astype(np.int64)
+    return np.argmax(candidates.cumsum(axis=1) > draws[:, None], axis=1)
+
+
+def run_replications(net, n, seed=None, initial_marking=None, max_steps=10000) -> ReplicationResult:
+    """
+    Run `n` independent replications of `net` as one vectorized batch.
+
+    Args:
+        net (CompiledPN | PetriNet): the net; a `SimplePN`/PM4Py net is compiled first.
+        n (int): number of replications.
+        seed (int | np.random.SeedSequence): seed of the NumPy generator.
+        initial_marking (Marking): initial marking when `net` is not compiled yet.
+        max_steps (int): firing limit per replication (guards against cyclic nets).
+
+    Returns:
+        ReplicationResult: makespans and firing counts per replication.
+    """
+    if isinstance(net, PetriNet):
+        net = CompiledPN.from_simple_pn(net, initial_marking)
+    rng = np.random.default_rng(seed)
+
+    pre = net.pre if net.use_sparse else sp.csr_matrix(net.pre)
+    delta = net.delta.toarray() if net.use_sparse else net.delta
+    # enablement of all rows at once: an arc is short if marking < weight,
+    # a transition is blocked if any of its (contiguous, CSR-ordered) arcs is short
+    has_input = np.diff(pre.indptr) > 0
+    starts = pre.indptr[:-1][has_input]
+
+    def enabled_rows(marking):
+        enabled = np.ones((len(marking), net.n_transitions), dtype=bool)
+        if len(starts):
+            short = marking[:, pre.indices] < pre.data
+            enabled[:, has_input] = ~np.logical_or.reduceat(short, starts, axis=1)
+        return enabled
+
+    kinds = [spec.get('type') for spec in net.transition_properties]
+    timed = any(kinds)
+    immediate = np.array([k == 'immediate' for k in kinds])
+    priorities = np.array([spec.get('priority', 0) for spec in net.transition_properties], dtype=float)
+    timed_idx = np.flatnonzero([k is not None and k != 'immediate' for k in kinds])
+    samplers = [delay_sampler(net.transition_properties[i], rng, name=net.transition_names[i])
+                for i in timed_idx]
+
+    markings = np.tile(net.initial_marking, (n, 1))
+    clocks = np.zeros(n)
+    # completion time of every scheduled timed transition per replication, inf if none
+    scheduled = np.full((n, net.n_transitions), np.inf) if timed else None
+    makespans = np.zeros(n)
+    counts = np.zeros((n, net.n_transitions), dtype=np.int64)
+    running = np.arange(n)
+
+    # every running replication fires once per step, so for an untimed net
+    # the step number is also the firing time (SimpleSimulator advances 1 per firing)
+    for step in range(max_steps):
+        enabled = enabled_rows(markings[running])
+        alive = enabled.any(axis=1)
+        running, enabled = running[alive], enabled[alive]
+        if not len(running):
+            break
+
+        if not timed:
+            choice = _pick(rng, enabled)
+            fired_at = np.full(len(running), float(step))
+        else:
+            choice = np.empty(len(running), dtype=np.int64)
+            stuck = np.zeros(len(running), dtype=bool)
+            imm = enabled & immediate
+            has_imm = imm.any(axis=1)
+            if has_imm.any():
+                prio = np.where(imm[has_imm], priorities, -np.inf)
+                top = prio == prio.max(axis=1, keepdims=True)
+                choice[has_imm] = _pick(rng, top)
+            race = ~has_imm
+            # schedules of transitions that got disabled by the last firing are dropped
+            rows_scheduled = scheduled[running]
+            rows_scheduled[~enabled] = np.inf
+            if race.any():
+                rows = running[race]
+                scheduled_rows = rows_scheduled[race]
+                pending = enabled[race] & np.isinf(scheduled_rows)
+                for j, sampler in zip(timed_idx, samplers):
+                    newly = pending[:, j]
+                    if newly.any():
+                        scheduled_rows[newly, j] = clocks[rows[newly]] + sampler.sample(int(newly.sum()))
+                winner = np.argmin(scheduled_rows, axis=1)
+                times = scheduled_rows[np.arange(len(winner)), winner]
+                # nothing scheduled: argmin would name any transition, at time inf
+                dead = np.isinf(times)
+                stuck[race] = dead
+                choice[race] = winner
+                clocks[rows[~dead]] = times[~dead]
+                # the winner samples a new delay if it is still enabled after firing
+                scheduled_rows[np.arange(len(winner)), winner] = np.inf
+                rows_scheduled[race] = scheduled_rows
+            scheduled[running] = rows_scheduled
+            if stuck.any():
+                running, choice = running[~stuck], choice[~stuck]
+            fired_at = clocks[running]
+
+        markings[running] += delta[choice]
+        counts[running, choice] += 1
+        makespans[running] = fired_at
+
+    completed = np.ones(n, dtype=bool)
+    if len(running):
+        completed[running] = ~enabled_rows(markings[running]).any(axis=1)
+    return ReplicationResult(net.transition_names, makespans, counts, completed)
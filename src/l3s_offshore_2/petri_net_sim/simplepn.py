@@ -9,6 +9,10 @@ from pm4py.objects.petri_net.utils.petri_utils import add_arc_from_to
 
 from copy import deepcopy
 
+from l3s_offshore_2.petri_net_sim.compiled import CompiledPN
+from l3s_offshore_2.petri_net_sim.sinks import EventSink
+from l3s_offshore_2.petri_net_sim.trace import FiringTrace
+
 
 class SimpleMarking(Marking):
     def __init__(): super()
@@ -143,20 +147,67 @@ class SimplePN(PetriNet):
 
 
 class SimpleSimulator:
-    def __init__(self, net: SimplePN, initial_marking: SimpleMarking, env: simpy.Environment = None):
+    ENGINES = ("object", "compiled", "incremental")
+    
+    def __init__(self, net: SimplePN, initial_marking: SimpleMarking = None, env: simpy.Environment = None,
+                 engine: str = "object", use_sparse: bool = False, seed=None, sink: EventSink = None,
+                 columnar_trace: bool = False, record: bool = True):
         """
         Initialize the simulator from a PM4Py PetriNet and its initial marking.
         
+        engine:
+            "object"   - walk the transition/arc objects on every step
+            "compiled" - compile the net once into pre/post incidence matrices
+                         (see `CompiledPN`), dense or sparse (`use_sparse`)
+            "incremental" - compiled, but after a firing only the transitions
+                         consuming from places whose marking changed are re-checked
+        All engines produce the same `firing_sequence`/`detailed_log`.
+        `net` may also be an already compiled `CompiledPN` (compiled engines only),
+        which starts from its own initial marking when `initial_marking` is None;
+        any other net needs `initial_marking`.
+        
+        seed: seeds a private `random.Random`; without it the module-level
+              `random` state is used.
+        sink: receives the firing events (see `sinks`), e.g. `StreamSink()` for
+              the former console output; None skips all per-step reporting.
+        columnar_trace: record the steps in a compact `FiringTrace`; `detailed_log`,
+              `firing_sequence` and `firing_log` are then lazy views onto it.
+        record: False keeps no `detailed_log`, `firing_sequence` or `firing_log`,
+              the steps only go to the sink; memory stays flat however long the run.
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unsupported engine: {engine}")
+        if isinstance(net, CompiledPN) and engine == "object":
+            raise ValueError("A CompiledPN can only run on the compiled or incremental engine")
+        if initial_marking is None and not isinstance(net, CompiledPN):
+            raise ValueError("The initial marking is required, only a CompiledPN carries its own")
         # 1. Simulation environment
         self.env = env or simpy.Environment()  # type simpy.Environment contentReference[oaicite:5]{index=5}
+        self.rng = random if seed is None else random.Random(seed)
+        self.sink = sink
         
         self.net = net
         
+        self.engine = engine
+        self.compiled = None
+        self.marking = None
+        if isinstance(net, CompiledPN):
+            self.compiled = net
+        elif engine != "object":
+            self.compiled = CompiledPN.from_simple_pn(net, initial_marking, use_sparse=use_sparse)
+        if engine == "incremental" and self.compiled.consumers is None:
+            self.compiled.build_dependency_index()
+        
         # 2. Place‐token mapping (copy from Marking dict)
         #    Marking is a dict Place->int in PM4Py :contentReference[oaicite:6]{index=6}
         self.initial_marking = initial_marking
-        self.current_marking = {p.name: initial_marking.get(p, 0) for p in net.places}
+        if isinstance(net, CompiledPN):
+            self.initial_vector = (net.initial_marking if initial_marking is None
+                                   else net.marking_vector(initial_marking))
+            self.current_marking = net.marking_dict(self.initial_vector)
+        else:
+            self.current_marking = {p.name: initial_marking.get(p, 0) for p in net.places}
+            self.initial_vector = None if self.compiled is None else self.compiled.initial_marking
 
         # # 3. Build transition metadata: inputs, outputs, weights, type, delay, priority
         # self.transitions = {}
@@ -170,9 +221,19 @@ class SimpleSimulator:
         #     }
         
         # 4. Prepare logs
-        self.detailed_log    = dict()
-        self.firing_log      = defaultdict(list)   # per‐transition timestamps
-        self.firing_sequence = []                  # global ordered list
+        self.trace = None
+        self.record = record
+        if columnar_trace and record:
+            names = (self.compiled.transition_names if self.compiled is not None
+                     else [t.name for t in net.transitions])
+            self.trace = FiringTrace(names, time_typecode='q')
+            self.detailed_log = self.trace.detailed_log
+            self.firing_log = self.trace.firing_log
+            self.firing_sequence = self.trace.firing_sequence
+        else:
+            self.detailed_log = dict()
+            self.firing_log = defaultdict(list)   # per‐transition timestamps
+            self.firing_sequence = []             # global ordered list
 
     def __initialize_marking(self):
         for item in self.initial_marking.items():
@@ -194,9 +255,11 @@ class SimpleSimulator:
 
         # log the event
         now = self.env.now  # current sim time
-        self.firing_log[t.name].append(now)
-        self.firing_sequence.append((t.name, now))
-        print(f"[{now}] Fired PNML-ID: {t.name} (Label: {t.label}); tokens={self.current_marking}")
+        if self.trace is None and self.record:
+            self.firing_log[t.name].append(now)
+            self.firing_sequence.append((t.name, now))
+        if self.sink is not None:
+            self.sink.fired(now, t.name, t.label, self.current_marking.copy)
         
         
     def is_transition_enabled(self, transition: SimplePN.SimpleTransition) -> bool:
@@ -222,6 +285,9 @@ class SimpleSimulator:
         """
         Return all transitions that are enabled.
         """
+        if self.compiled is not None:
+            marking = self.initial_vector if self.marking is None else self.marking
+            return [self.compiled.transitions[i] for i in self.compiled.enabled(marking)]
         
         enabled_transitions = []
                 
@@ -240,6 +306,11 @@ class SimpleSimulator:
         """
         The main SimPy process: fire immediate transitions first, then timed ones.
         """
+        if self.compiled is not None:
+            return self.__simulate_compiled()
+        return self.__simulate_objects()
+    
+    def __simulate_objects(self):
         # intialize marking
         self.__initialize_marking()
             
@@ -261,25 +332,32 @@ class SimpleSimulator:
                 
                 now = self.env.now
                 enabled_transitions_names = [t.name for t in enabled_transitions]
-                transition_to_fire = random.choice(batch)
+                transition_to_fire = self.rng.choice(batch)
                 # print(transition_to_fire)
                 
-                self.detailed_log.update(
-                    {now: {
-                    "enabled_transitions" : enabled_transitions_names,
-                    "transition_to_fire" : transition_to_fire.name
-                    }}
-                )
+                if self.trace is not None:
+                    index = self.trace.index
+                    self.trace.record(now, index[transition_to_fire.name],
+                                      [index[name] for name in enabled_transitions_names])
+                elif self.record:
+                    self.detailed_log.update(
+                        {now: {
+                            "enabled_transitions" : enabled_transitions_names,
+                            "transition_to_fire" : transition_to_fire.name
+                        }}
+                    )
                 
                 # for t in batch:
                 self.__fire_transition(transition_to_fire)
                 
                 enabled_transitions = self.get_enabled_transitions()
-                print(f"Enabled Transitions: {enabled_transitions}")
+                if self.sink is not None:
+                    self.sink.enabled(now, [t.name for t in enabled_transitions])
                 
                 if enabled_transitions == []:
                     # No transitions -> end simulation
-                    print("No more enabled transitions -> simulation ends")
+                    if self.sink is not None:
+                        self.sink.finished(now)
                     break
                 
                 
@@ -287,6 +365,56 @@ class SimpleSimulator:
                 continue
 
 
+    def __simulate_compiled(self):
+        """
+        Same loop as `__simulate_objects`, on the compiled marking vector.
+        """
+        compiled = self.compiled
+        names = compiled.transition_names
+        self.marking = marking = self.initial_vector.copy()
+        incremental = self.engine == "incremental"
+        sink = self.sink
+        trace = self.trace
+        record = self.record
+        
+        # the enabled set after a firing is reused as the candidates of the next step
+        enabled = compiled.enabled(marking).tolist()
+        enabled_set = set(enabled)
+        while enabled:
+            now = self.env.now
+            # choice on a list of the same length keeps the draws of the object engine
+            t = self.rng.choice(enabled)
+            
+            compiled.fire(marking, t)
+            if trace is not None:
+                trace.record(now, t, enabled)
+            elif record:
+                self.detailed_log.update(
+                    {now: {
+                        "enabled_transitions" : [names[i] for i in enabled],
+                        "transition_to_fire" : names[t]
+                    }}
+                )
+                self.firing_log[names[t]].append(now)
+                self.firing_sequence.append((names[t], now))
+            if sink is not None:
+                sink.fired(now, names[t], compiled.transition_labels[t],
+                           lambda: compiled.marking_dict(marking))
+            
+            if incremental:
+                enabled = compiled.update_enabled(enabled_set, marking, t)
+            else:
+                enabled = compiled.enabled(marking).tolist()
+            if sink is not None:
+                sink.enabled(now, [names[i] for i in enabled])
+            
+            if enabled == []:
+                if sink is not None:
+                    sink.finished(now)
+                break
+            
+            yield self.env.timeout(1)
+
     # def _delayed_fire(self, t, delay: float):
     #     """
     #     A helper process: wait `delay`, then fire transition `t`.
@@ -302,6 +430,24 @@ class SimpleSimulator:
         self.env.process(self.simulate())
         # run the SimPy event loop
         self.env.run(until=until)  # until None ⇒ run until exhaustion :contentReference[oaicite:9]{index=9}
+        
+        if self.marking is not None:
+            self.current_marking.update(self.compiled.marking_dict(self.marking))
+
+    def iter_run(self, until=None):
+        """
+        `run` as a generator that yields the simulation time after every SimPy
+        event, so the events of a sink can be handed on while the run goes on.
+        """
+        self.env.process(self.simulate())
+        env = self.env
+        until = float("inf") if until is None else until
+        while env.peek() < until:
+            env.step()
+            yield env.now
+
+        if self.marking is not None:
+            self.current_marking.update(self.compiled.marking_dict(self.marking))
 
     
     def get_firing_sequence(self):
@@ -0,0 +1,108 @@
+"""Event sinks for the simulators.
+
+The simulators report firings to an optional sink instead of printing them.
+Without a sink (the default) nothing is formatted or written per step.
+Markings are handed over as zero-argument callables so that only sinks which
+actually use them pay for building the place -> tokens dict.
+"""
+import sys
+from array import array
+
+
+class EventSink:
+    """Base sink, ignores every event."""
+
+    def fired(self, time, transition, label, marking):
+        """A transition fired at `time`; `marking()` returns the marking afterwards."""
+
+    def enabled(self, time, transitions):
+        """The transitions (names) enabled at `time` after a firing."""
+
+    def finished(self, time):
+        """No transition is enabled any more."""
+
+
+class BufferSink(EventSink):
+    """In-memory columnar buffer of the firings."""
+
+    def __init__(self):
+        self.names = []                # interned transition names
+        self.labels = []
+        self._index = {}
+        self.times = array('d')
+        self.transitions = array('l')  # index into `names`
+        self.end_time = None
+
+    def __len__(self):
+        return len(self.times)
+
+    def fired(self, time, transition, label, marking):
+        index = self._index.get(transition)
+        if index is None:
+            index = self._index[transition] = len(self.names)
+            self.names.append(transition)
+            self.labels.append(label)
+        self.times.append(time)
+        self.transitions.append(index)
+
+    def finished(self, time):
+        self.end_time = time
+
+    def events(self):
+        """Iterate over the buffered firings as (time, transition name) tuples."""
+        names = self.names
+        return ((time, names[t]) for time, t in zip(self.times, self.transitions))
+
+    def to_dict(self):
+        """Columns as plain lists."""
+        return {
+            "time": self.times.tolist(),
+            "transition": [self.names[t] for t in self.transitions],
+            "label": [self.labels[t] for t in self.transitions],
+        }
+
+
+class QueueSink(EventSink):
+    """
+    Keep the events as dicts until `drain` hands them out, for streaming a run
+    (see `SimpleSimulator.iter_run`); memory is bounded by the events of a step.
+    """
+
+    def __init__(self, with_enabled=False):
+        self.with_enabled = with_enabled
+        self.pending = []
+
+    def fired(self, time, transition, label, marking):
+        self.pending.append({"event": "fired", "time": time, "transition": transition, "label": label})
+
+    def enabled(self, time, transitions):
+        if self.with_enabled:
+            self.pending.append({"event": "enabled", "time": time, "transitions": list(transitions)})
+
+    def finished(self, time):
+        self.pending.append({"event": "finished", "time": time})
+
+    def drain(self):
+        """The events since the last call, oldest first."""
+        pending, self.pending = self.pending, []
+        return pending
+
+
+class StreamSink(EventSink):
+    """Write one human-readable line per event to a text stream (stdout by default)."""
+
+    def __init__(self, stream=None, show_marking=True):
+        self.stream = sys.stdout if stream is None else stream
+        self.show_marking = show_marking
+
+    def fired(self, time, transition, label, marking):
+        line = f"[{time}] Fired PNML-ID: {transition} (Label: {label})"
+        if self.show_marking:
+            line += f"; tokens={marking()}"
+        self.stream.write(line + "\n")
+
+    def enabled(self, time, transitions):
+        self.stream.write(f"Enabled Transitions: {list(transitions)}\n")
+
+    def finished(self, time):
+        self.stream.write("No more enabled transitions -> simulation ends\n")
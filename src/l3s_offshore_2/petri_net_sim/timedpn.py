@@ -0,0 +1,240 @@
+"""Event-calendar simulator for timed/stochastic Petri nets.
+
+Timed transitions that become enabled get a completion event scheduled in
+a heap-based future-event list, so concurrent activities run in parallel
+instead of being serialized, and each event costs O(log n). After a firing
+only the transitions consuming from places whose marking changed are
+re-examined (see `CompiledPN.affected`), together with the consumers of
+places whose reserved tokens were released (preselection).
+
+Semantics:
+    - enabled immediate transitions fire first, in zero time; among those
+      with the highest 'priority' one is chosen at random by 'weight'
+    - policy "race": every enabled timed transition runs its own clock and
+      the earliest completion fires
+    - policy "preselection": when timed transitions compete for the same
+      tokens, the ones to start are selected by 'weight' when they become
+      enabled; the selected ones reserve their input tokens
+    - memory policy per transition ('memory' key, default from the simulator):
+        "resampling" - a new delay is drawn after every firing in the net
+        "enabling"   - the clock is kept while the transition stays enabled
+                       and discarded when it gets disabled
+        "age"        - the remaining time is kept when disabled and resumed
+                       when enabled again
+
+The net is defined with the same dicts as `GSPNSimulator`.
+"""
+import heapq
+import random
+from collections import defaultdict
+
+import numpy as np
+
+from l3s_offshore_2.petri_net_sim.compiled import CompiledPN
+from l3s_offshore_2.petri_net_sim.delays import delay_sampler
+
+
+class TimedPNSimulator:
+    POLICIES = ("race", "preselection")
+    MEMORY_POLICIES = ("resampling", "enabling", "age")
+
+    def __init__(self, places, transitions, seed=None, policy="race", memory="enabling", sink=None):
+        """
+        Args:
+            places (dict): place name -> initial token count.
+            transitions (dict): transition name -> definition, as for `GSPNSimulator`:
+                                'type' ('immediate'|'fixed'|'stochastic'), 'priority',
+                                'weight', 'distribution', 'params', 'fixed_time',
+                                'memory', 'input', 'output'.
+            seed (int): seeds a private `random.Random` and the delay generator; without
+                        it the module-level `random` state and fresh entropy are used.
+            policy (str): "race" or "preselection".
+            memory (str): default memory policy of the timed transitions.
+            sink (EventSink): receives the firing events; None reports nothing.
+
+        Raises:
+            ValueError: unknown policy, or a transition with an invalid delay definition.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unsupported policy: {policy}")
+        self.places = places
+        self.transitions = transitions
+        self.rng = random if seed is None else random.Random(seed)
+        self.policy = policy
+        self.sink = sink
+
+        # sparse: per event only the rows of the fired/affected transitions are touched
+        self.compiled = CompiledPN.from_gspn(places, transitions, use_sparse=True)
+        self.compiled.build_dependency_index()
+        specs = self.compiled.transition_properties
+        self.immediate = [spec.get('type') == 'immediate' for spec in specs]
+        self.priority = [spec.get('priority', 0) for spec in specs]
+        self.weight = [spec.get('weight', 1.0) for spec in specs]
+        self.memory = [spec.get('memory', memory) for spec in specs]
+        for policy in self.memory:
+            if policy not in self.MEMORY_POLICIES:
+                raise ValueError(f"Unsupported memory policy: {policy}")
+        delay_rng = np.random.default_rng(seed)
+        self.samplers = [
+            None if immediate else delay_sampler(spec, delay_rng, name=name)
+            for name, spec, immediate in zip(self.compiled.transition_names, specs, self.immediate)
+        ]
+        self.resampling = [t for t, policy in enumerate(self.memory)
+                           if policy == "resampling" and not self.immediate[t]]
+
+        self.now = 0
+        self.marking = self.compiled.initial_marking.copy()
+        self.reserved = np.zeros_like(self.marking)
+        self.enabled = set(self.compiled.enabled(self.marking).tolist())
+        self.enabled_immediate = {t for t in self.enabled if self.immediate[t]}
+
+        # future-event list of (time, seq, transition, version); an entry is stale
+        # once the transition's version has moved on (lazy deletion)
+        self.calendar = []
+        self._seq = 0
+        self.version = [0] * self.compiled.n_transitions
+        self.scheduled = [None] * self.compiled.n_transitions
+        self.remaining = [None] * self.compiled.n_transitions
+        # input places of released reservations (preselection), see `_update_schedule`
+        self._released = []
+
+        self.firing_log = defaultdict(list)
+        self.firing_sequence = []
+        self._update_schedule(range(self.compiled.n_transitions))
+
+    def sample_delay(self, t):
+        """Sample the delay of timed transition index `t` from its definition."""
+        return self.samplers[t]()
+
+    def _schedule(self, t, delay):
+        self.version[t] += 1
+        self.scheduled[t] = self.now + delay
+        self._seq += 1
+        heapq.heappush(self.calendar, (self.scheduled[t], self._seq, t, self.version[t]))
+        if self.policy == "preselection":
+            places, weights = self.compiled.input_arcs(t)
+            self.reserved[places] += weights
+
+    def _release(self, t):
+        """Give back the tokens reserved by `t`; their consumers are re-examined next."""
+        places, weights = self.compiled.input_arcs(t)
+        self.reserved[places] -= weights
+        self._released.extend(places.tolist())
+
+    def _cancel(self, t):
+        if self.memory[t] == "age":
+            self.remaining[t] = self.scheduled[t] - self.now
+        self.version[t] += 1
+        self.scheduled[t] = None
+        if self.policy == "preselection":
+            self._release(t)
+
+    def _update_schedule(self, candidates):
+        """Cancel disabled and schedule newly enabled timed transitions among `candidates`."""
+        pending = []
+        for t in candidates:
+            if self.immediate[t]:
+                continue
+            if self.scheduled[t] is not None:
+                if t not in self.enabled:
+                    self._cancel(t)
+            elif t in self.enabled:
+                pending.append(t)
+        if self._released:
+            # released tokens can start a competitor even where the marking did not change
+            # (e.g. a self-loop completing), so the consumers of those places get a look too
+            seen = set(pending)
+            consumers = self.compiled.consumers
+            for t in np.unique(np.concatenate([consumers[p] for p in self._released])).tolist():
+                if (t not in seen and not self.immediate[t] and self.scheduled[t] is None
+                        and t in self.enabled):
+                    pending.append(t)
+            self._released = []
+
+        if self.policy == "preselection" and len(pending) > 1:
+            # weighted random order (Efraimidis-Spirakis keys), then reserve greedily
+            pending.sort(key=lambda t: self.rng.random() ** (1.0 / self.weight[t]), reverse=True)
+        for t in pending:
+            if self.policy == "preselection":
+                places, weights = self.compiled.input_arcs(t)
+                if (self.marking[places] - self.reserved[places] < weights).any():
+                    continue
+            if self.memory[t] == "age" and self.remaining[t] is not None:
+                delay, self.remaining[t] = self.remaining[t], None
+            else:
+                delay = self.sample_delay(t)
+            self._schedule(t, delay)
+
+    def _fire(self, t):
+        name = self.compiled.transition_names[t]
+        if self.scheduled[t] is not None:
+            # completion of a scheduled transition releases its reservation
+            self.version[t] += 1
+            self.scheduled[t] = None
+            if self.policy == "preselection":
+                self._release(t)
+
+        self.compiled.fire(self.marking, t)
+        affected = self.compiled.refresh_enabled(self.enabled, self.marking, t)
+        for u in affected:
+            if self.immediate[u]:
+                if u in self.enabled:
+                    self.enabled_immediate.add(u)
+                else:
+                    self.enabled_immediate.discard(u)
+        self.firing_log[name].append(self.now)
+        self.firing_sequence.append((name, self.now))
+        if self.sink is not None:
+            self.sink.fired(self.now, name, name, lambda: self.compiled.marking_dict(self.marking))
+
+        for u in self.resampling:
+            if self.scheduled[u] is not None:
+                self._cancel(u)
+        self._update_schedule(set(affected) | {t} | set(self.resampling))
+
+    def _next_immediate(self):
+        candidates = self.enabled_immediate
+        if not candidates:
+            return None
+        top = max(self.priority[t] for t in candidates)
+        candidates = sorted(t for t in candidates if self.priority[t] == top)
+        if len(candidates) == 1:
+            return candidates[0]
+        return self.rng.choices(candidates, weights=[self.weight[t] for t in candidates])[0]
+
+    def _next_event(self):
+        """Drop stale entries and return the next valid (time, transition), or None."""
+        while self.calendar:
+            time, _, t, version = self.calendar[0]
+            if version == self.version[t]:
+                return time, t
+            heapq.heappop(self.calendar)
+        return None
+
+    def step(self, until=None):
+        """Fire the next transition. Returns False when nothing (more) can fire."""
+        t = self._next_immediate()
+        if t is None:
+            event = self._next_event()
+            if event is None or (until is not None and event[0] > until):
+                return False
+            heapq.heappop(self.calendar)
+            self.now, t = event
+        self._fire(t)
+        return True
+
+    def run(self, until=None):
+        """Run until no transition can fire any more (or until time `until`)."""
+        while self.step(until):
+            pass
+        if until is not None and self._next_event() is not None:
+            self.now = until
+        elif self.sink is not None:
+            self.sink.finished(self.now)
+
+    def get_marking(self):
+        return self.compiled.marking_dict(self.marking)
+
+    def get_makespan(self):
+        """Time of the last firing."""
+        return self.firing_sequence[-1][1] if self.firing_sequence else 0
@@ -0,0 +1,146 @@
+"""Columnar storage of a simulation's firing trace.
+
+`FiringTrace` keeps one row per step in flat `array` columns (transition
+index, time) plus a packed bitmap of the enabled transitions, with the
+transition names interned once. The `firing_sequence`, `detailed_log` and
+`firing_log` views rebuild the list/dict shapes of `SimpleSimulator` lazily,
+entry by entry, when they are read.
+"""
+from array import array
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+
+class FiringTrace:
+    def __init__(self, transition_names, time_typecode='d'):
+        """
+        transition_names: names of all transitions, position = transition index.
+        time_typecode: `array` typecode of the time column, 'q' for integer steps.
+        """
+        self.names = tuple(transition_names)
+        self.index = {t: i for i, t in enumerate(self.names)}
+        self.transitions = array('q')
+        self.times = array(time_typecode)
+        self._row_bytes = (len(self.names) + 7) // 8
+        self._empty_row = bytes(self._row_bytes)
+        self._enabled = bytearray()
+
+        self.firing_sequence = FiringSequenceView(self)
+        self.detailed_log = DetailedLogView(self)
+        self.firing_log = FiringLogView(self)
+
+    def __len__(self):
+        return len(self.times)
+
+    def record(self, time, transition, enabled):
+        """Append one step: fired transition index and the enabled transition indices."""
+        # set the bits of the enabled transitions only, O(enabled) instead of O(|T|)
+        start = len(self._enabled)
+        self._enabled += self._empty_row
+        rows = self._enabled
+        for i in enabled:
+            rows[start + (i >> 3)] |= 0x80 >> (i & 7)
+        self.transitions.append(transition)
+        self.times.append(time)
+
+    def enabled_at(self, row):
+        """Indices of the transitions enabled at step `row`."""
+        start = row * self._row_bytes
+        bits = np.unpackbits(np.frombuffer(self._enabled, np.uint8, self._row_bytes, start))
+        return np.flatnonzero(bits[:len(self.names)])
+
+    def nbytes(self):
+        return (self.transitions.itemsize * len(self.transitions)
+                + self.times.itemsize * len(self.times) + len(self._enabled))
+
+
+class FiringSequenceView(Sequence):
+    """List of (transition name, time) tuples."""
+
+    def __init__(self, trace):
+        self._trace = trace
+
+    def __len__(self):
+        return len(self._trace)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        trace = self._trace
+        return trace.names[trace.transitions[i]], trace.times[i]
+
+
+class DetailedLogView(Mapping):
+    """Dict time -> {"enabled_transitions": [...], "transition_to_fire": name}."""
+
+    def __init__(self, trace):
+        self._trace = trace
+        self._rows = {}
+        self._size = 0
+
+    def _index(self):
+        # a later step at the same time overwrites an earlier one, as dict.update does
+        times = self._trace.times
+        if self._size != len(times):
+            self._rows = {time: row for row, time in enumerate(times)}
+            self._size = len(times)
+        return self._rows
+
+    def __len__(self):
+        return len(self._index())
+
+    def __iter__(self):
+        return iter(self._index())
+
+    def __getitem__(self, time):
+        row = self._index()[time]
+        trace = self._trace
+        return {
+            "enabled_transitions": [trace.names[i] for i in trace.enabled_at(row)],
+            "transition_to_fire": trace.names[trace.transitions[row]],
+        }
+
+
+class FiringLogView(Mapping):
+    """
+    Dict transition name -> list of firing times.
+
+    Like the `defaultdict(list)` it stands in for, a transition of the net that
+    never fired reads as an empty list, but is not a key.
+    """
+
+    def __init__(self, trace):
+        self._trace = trace
+        self._groups = {}
+        self._size = 0
+
+    def _index(self):
+        trace = self._trace
+        if self._size != len(trace) or not self._groups:
+            transitions = np.asarray(trace.transitions)
+            order = np.argsort(transitions, kind='stable')
+            fired, starts = np.unique(transitions[order], return_index=True)
+            self._groups = {
+                trace.names[t]: rows
+                for t, rows in zip(fired.tolist(), np.split(order, starts[1:]))
+            }
+            self._size = len(trace)
+        return self._groups
+
+    def __len__(self):
+        return len(self._index())
+
+    def __iter__(self):
+        return iter(self._index())
+
+    def __contains__(self, name):
+        return name in self._index()
+
+    def __getitem__(self, name):
+        rows = self._index().get(name)
+        if rows is None:
+            if name in self._trace.index:
+                return []
+            raise KeyError(name)
+        return np.asarray(self._trace.times)[rows].tolist()
@@ -0,0 +1,129 @@
+"""Thread-safe in-process caches."""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def content_digest(data) -> str:
+    """SHA-256 hex digest of `data` (bytes, or str encoded as UTF-8)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class LRUCache:
+    """
+    Least-recently-used cache bounded by its number of entries and, given a
+    `sizeof` function, by the total size of the entries.
+
+    All operations take a lock, so one instance can be shared by the request
+    threads of the app. Hits, misses and evictions are counted for `stats`.
+    """
+
+    def __init__(self, maxsize=32, max_bytes=None, sizeof=None):
+        """
+        Args:
+            maxsize (int): maximum number of entries; 0 disables caching.
+            max_bytes (int): maximum total size of the entries, None for no limit.
+            sizeof (callable): size of an entry in bytes, needed for `max_bytes`.
+        """
+        if max_bytes is not None and sizeof is None:
+            raise ValueError("max_bytes needs a sizeof function")
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def get(self, key, default=None):
+        """Return the entry for `key` and mark it as most recently used."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Insert or replace an entry, evicting the least recently used ones.
+        An entry larger than `max_bytes` on its own is not kept.
+        """
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        with self._lock:
+            self.nbytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def get_or_create(self, key, factory):
+        """
+        Return the entry for `key`, creating it with `factory()` on a miss.
+
+        `factory` runs outside the lock, so a slow build does not block other
+        keys; concurrent misses of the same key may build it more than once.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = factory()
+        self.put(key, value)
+        return value
+
+    def resize(self, maxsize=None, max_bytes=None):
+        """Change the capacity (arguments left at None are kept), evicting entries if it shrinks."""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if max_bytes is not None:
+                if self.sizeof is None:
+                    raise ValueError("max_bytes needs a sizeof function")
+                self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """Drop all entries; the counters are kept."""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _evict(self):
+        while self._data and (
+            len(self._data) > self.maxsize
+            or (self.max_bytes is not None and self.nbytes > self.max_bytes)
+        ):
+            key, _ = self._data.popitem(last=False)
+            self.nbytes -= self._sizes.pop(key)
+            self.evictions += 1
@@ -0,0 +1,174 @@
+"""Process pool helpers for fanning work out over a shared, read-only object.
+
+All calls share one process pool, created on first use and shut down at
+exit, instead of starting and tearing down a pool per call inside a web
+worker. Its processes are started with the "forkserver" method ("spawn"
+where there is none), never forked from the caller, which may be a
+multithreaded server or a job thread (`api.jobs_srv`). As with "spawn",
+a script using the pool must guard its entry point with
+`if __name__ == "__main__":`.
+
+The shared object of a call is pickled once into a block of shared memory,
+which the workers read it from: the tasks only carry the name of the block,
+and each worker unpickles the object once per call and keeps the last few of
+them. (Initializer arguments would only reach the workers the pool starts
+with, not the calls made while it runs.)
+"""
+import atexit
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import count, islice
+from multiprocessing import shared_memory
+
+# shared objects unpickled in this (worker) process, call token -> object
+_SHARED = OrderedDict()
+_SHARED_SIZE = 4
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+_tokens = count()
+
+
+def _attach(name):
+    if sys.version_info >= (3, 13):
+        # the calling process owns the block and unlinks it
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _shared_object(token, name, size):
+    shared = _SHARED.get(token)
+    if shared is not None:
+        _SHARED.move_to_end(token)
+        return shared
+    block = _attach(name)
+    try:
+        data = block.buf[:size]
+        shared = _SHARED[token] = pickle.loads(data)
+        data.release()
+    finally:
+        block.close()
+    while len(_SHARED) > _SHARED_SIZE:
+        _SHARED.popitem(last=False)
+    return shared
+
+
+def _call(token, name, size, func, item):
+    return func(_shared_object(token, name, size), item)
+
+
+def default_workers():
+    """Number of worker processes to use when none is configured."""
+    return os.cpu_count() or 1
+
+
+def _start_method():
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+def process_pool(max_workers=None) -> ProcessPoolExecutor:
+    """
+    The process-wide pool, created on first use.
+
+    It gets `max_workers` processes, at least one per CPU; a call asking for
+    more workers than the pool has later on is served by the ones there are.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = max(max_workers or 0, default_workers())
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_workers,
+                mp_context=multiprocessing.get_context(_start_method()),
+            )
+    return _pool
+
+
+def shutdown_pool(wait=True):
+    """Shut the process pool down; the next call starts a new one."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+atexit.register(shutdown_pool)
+
+
+def _discard_broken(pool):
+    """Drop `pool` after one of its processes died, so the next call starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def _imap(func, shared, items, max_workers):
+    """func(shared, item) in order, with at most `max_workers` items in the pool at a time."""
+    pool = process_pool(max_workers)
+    payload = pickle.dumps(shared, protocol=pickle.HIGHEST_PROTOCOL)
+    block = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+    block.buf[:len(payload)] = payload
+    # a task is the shared object's token and block, and its item
+    shared = (next(_tokens), block.name, len(payload))
+    del payload
+    items = iter(items)
+    pending = deque()
+    try:
+        for item in islice(items, max_workers):
+            pending.append(pool.submit(_call, *shared, func, item))
+        while pending:
+            result = pending.popleft().result()
+            for item in islice(items, 1):
+                pending.append(pool.submit(_call, *shared, func, item))
+            yield result
+    except BrokenProcessPool:
+        _discard_broken(pool)
+        raise
+    finally:
+        # a consumer that stops early leaves nothing running for it; the
+        # tasks already running finish before their block goes away
+        for future in pending:
+            future.cancel()
+        wait(pending)
+        block.close()
+        block.unlink()
+
+
+def map_shared(func, shared, items, max_workers=None):
+    """
+    Return [func(shared, item) for item in items], computed in the process pool.
+
+    `func` must be a module-level (picklable) function. Results come back in
+    the order of `items`; at most `max_workers` items are computed at a time.
+    """
+    items = list(items)
+    max_workers = min(max_workers or default_workers(), len(items) or 1)
+    if max_workers <= 1:
+        return [func(shared, item) for item in items]
+    return list(_imap(func, shared, items, max_workers))
+
+
+def imap_shared(func, shared, items, max_workers=None):
+    """
+    Iterate over func(shared, item) for item in items, computed in the process pool.
+
+    Like `map_shared`, but results are yielded in order as they come, and
+    only `max_workers` items are submitted ahead of the one being consumed,
+    so a slow consumer does not pile results up in memory.
+    """
+    max_workers = max_workers or default_workers()
+    if max_workers <= 1:
+        for item in items:
+            yield func(shared, item)
+        return
+    yield from _imap(func, shared, items, max_workers)
@@ -0,0 +1,80 @@
+"""In-memory I/O for uploaded and generated process models.
+
+Uploads are parsed straight from the request stream and generated PNML is
+serialized to a string, or to chunks for a streamed download, so no
+temporary files are written to disk. Event logs are read by
+`api.process_mining_srv.ingest`.
+"""
+import io
+
+from lxml import etree
+from pm4py.objects.petri_net.exporter import exporter as pnml_exporter
+from pm4py.objects.petri_net.exporter.variants.pnml import export_petri_tree
+from pm4py.objects.petri_net.importer import importer as pnml_importer
+
+# bytes per chunk of a streamed download
+CHUNK_SIZE = 64 * 1024
+# <pnml>, <net> and <page> are opened and closed around their children, deeper
+# elements (places, transitions, arcs) are written whole
+_PNML_OPEN_DEPTH = 3
+
+
+def read_upload(uploaded_file) -> bytes:
+    """Content of an uploaded `FileStorage` (or any binary file object) as bytes."""
+    stream = getattr(uploaded_file, "stream", uploaded_file)
+    if hasattr(stream, "seek"):
+        stream.seek(0)
+    return stream.read()
+
+
+def read_pnml(data):
+    """
+    Parse a PNML document held in memory into PM4Py objects.
+
+    Args:
+        data (bytes | str | FileStorage): the PNML document or the upload carrying it.
+
+    Returns:
+        tuple: (PetriNet, initial Marking, final Marking), as `pm4py.read_pnml`.
+    """
+    if not isinstance(data, (bytes, str)):
+        data = read_upload(data)
+    return pnml_importer.deserialize(data)
+
+
+def pnml_to_string(net, initial_marking, final_marking=None) -> str:
+    """Serialize a Petri net to a PNML string, as `pm4py.write_pnml` would write it."""
+    return pnml_exporter.serialize(net, initial_marking, final_marking=final_marking).decode("utf-8")
+
+
+def _write_pnml_element(xf, element, depth, buffer, chunk_size):
+    if depth >= _PNML_OPEN_DEPTH or not len(element):
+        xf.write(element)
+    else:
+        with xf.element(element.tag, element.attrib):
+            if element.text:
+                xf.write(element.text)
+            for child in element:
+                yield from _write_pnml_element(xf, child, depth + 1, buffer, chunk_size)
+        if element.tail:
+            xf.write(element.tail)
+    if buffer.tell() >= chunk_size:
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def iter_pnml(net, initial_marking, final_marking=None, chunk_size=CHUNK_SIZE):
+    """
+    The document of `pnml_to_string` as UTF-8 chunks of about `chunk_size` bytes.
+
+    The XML tree is serialized element by element, so the document never
+    exists as one string; for streamed downloads.
+    """
+    root = export_petri_tree(net, initial_marking, final_marking=final_marking).getroot()
+    buffer = io.BytesIO()
+    buffer.write(b"<?xml version='1.0' encoding='utf-8'?>\n")
+    with etree.xmlfile(buffer, encoding="utf-8") as xf:
+        yield from _write_pnml_element(xf, root, 0, buffer, chunk_size)
+    if buffer.tell():
+        yield buffer.getvalue()
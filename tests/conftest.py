@@ -0,0 +1,29 @@
+"""Fixtures: the Process Discovery Contest 2023 models and logs in datasets/, and the app."""
+from pathlib import Path
+
+import pytest
+
+PDC = Path(__file__).parents[1] / "datasets" / "Process Discovery Contest 2023_1_all"
+
+
+@pytest.fixture(scope="session")
+def pdc_model():
+    """Path of the PNML of a PDC model, e.g. pdc_model("pdc2023_000000")."""
+    return lambda name: PDC / "Models" / f"{name}.pnml"
+
+
+@pytest.fixture(scope="session")
+def pdc_log():
+    """Path of the base log of a PDC model."""
+    return lambda name: PDC / "Base Logs" / f"{name}.xes"
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app on a database of its own, with an app context pushed."""
+    from l3s_offshore_2 import config, create_app
+
+    monkeypatch.setattr(config.TestingConfig, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'test.db'}")
+    app = create_app("testing")
+    with app.app_context():
+        yield app
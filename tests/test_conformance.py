@@ -0,0 +1,56 @@
+"""Variant-based alignments against pm4py.fitness_alignments."""
+import pandas as pd
+import pm4py
+import pytest
+
+from l3s_offshore_2.api.process_mining_srv import conformance
+from l3s_offshore_2.api.process_mining_srv.ingest import read_xes_log
+from l3s_offshore_2.models import AlignmentCache
+from l3s_offshore_2.utils.cache import content_digest
+
+
+@pytest.fixture(scope="module")
+def model_and_log(pdc_model, pdc_log):
+    """
+    pdc2023_000101 (hidden transitions, duplicate labels) and the first 60 cases
+    of its log, 20 of them twice: the PDC logs have a variant per case.
+    """
+    path = pdc_model("pdc2023_000101")
+    net, im, fm = pm4py.read_pnml(str(path))
+    log = read_xes_log(pdc_log("pdc2023_000101"))
+    cases = log["case:concept:name"].unique()[:60]
+    log = log[log["case:concept:name"].isin(cases)]
+    copies = log[log["case:concept:name"].isin(cases[:20])].astype({"case:concept:name": str})
+    copies["case:concept:name"] = "copy of " + copies["case:concept:name"]
+    log = pd.concat([log.astype({"case:concept:name": str}), copies], ignore_index=True)
+    # pm4py asks for a timestamp column, the PDC logs have none
+    log["time:timestamp"] = pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(log.index, unit="s")
+    reference = pm4py.fitness_alignments(log, net, im, fm)
+    return (net, im, fm), log, content_digest(path.read_bytes()), reference
+
+
+def assert_same_fitness(result, reference):
+    assert result.keys() >= reference.keys()
+    for key, value in reference.items():
+        assert result[key] == pytest.approx(value), key
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_matches_pm4py(model_and_log, workers):
+    (net, im, fm), log, _, reference = model_and_log
+    variants = conformance.log_variants(log)
+    assert len(variants) < len(log["case:concept:name"].unique())
+
+    assert_same_fitness(conformance.fitness_alignments(log, net, im, fm, workers=workers), reference)
+
+
+def test_cached_matches_pm4py(app, model_and_log):
+    (net, im, fm), log, digest, reference = model_and_log
+    variants = conformance.log_variants(log)
+
+    assert_same_fitness(conformance.fitness_alignments(log, net, im, fm, model_digest=digest), reference)
+    assert AlignmentCache.query.filter_by(model_digest=digest).count() == len(variants)
+    # served from the table this time
+    assert_same_fitness(conformance.fitness_alignments(log, net, im, fm, model_digest=digest, workers=2),
+                        reference)
+    assert conformance.alignment_cache_stats() == {"size": len(variants), "models": 1}
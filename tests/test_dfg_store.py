@@ -0,0 +1,47 @@
+"""Directly-follows graphs stored batch by batch against pm4py's graph of the whole log."""
+import numpy as np
+import pandas as pd
+import pm4py
+import pytest
+
+from l3s_offshore_2.api.process_mining_srv import dfg_store
+from l3s_offshore_2.api.process_mining_srv.ingest import read_xes_log
+
+
+@pytest.fixture(scope="module")
+def timed_log(pdc_log):
+    """The pdc2023_000101 log, its events a second apart in log order."""
+    log = read_xes_log(pdc_log("pdc2023_000101"))
+    log["time:timestamp"] = pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(log.index, unit="s")
+    return log
+
+
+@pytest.mark.parametrize("batches", [1, 4])
+def test_batches_match_pm4py(app, timed_log, batches):
+    # time-ordered batches, cut in the middle of cases
+    for rows in np.array_split(np.arange(len(timed_log)), batches):
+        summary = dfg_store.append_batch("pdc", timed_log.iloc[rows])
+    reference = pm4py.discover_dfg_typed(timed_log)
+    dfg = dfg_store.stored_dfg("pdc")
+
+    assert dict(dfg.graph) == dict(reference.graph)
+    assert dict(dfg.start_activities) == dict(reference.start_activities)
+    assert dict(dfg.end_activities) == dict(reference.end_activities)
+    assert summary["batches"] == batches
+    assert summary["cases"] == timed_log["case:concept:name"].nunique()
+    assert summary["events"] == len(timed_log)
+
+
+def test_delete(app, timed_log):
+    dfg_store.append_batch("pdc", timed_log)
+
+    assert dfg_store.delete_dfg_log("pdc")
+    assert dfg_store.stored_dfg("pdc") is None
+    assert not dfg_store.delete_dfg_log("pdc")
+
+
+def test_invalid_batches(app, timed_log):
+    with pytest.raises(ValueError):
+        dfg_store.append_batch("", timed_log)
+    with pytest.raises(ValueError):
+        dfg_store.append_batch("pdc", timed_log.iloc[:0])
@@ -0,0 +1,39 @@
+"""Directly-follows graphs counted in shards against pm4py."""
+import pandas as pd
+import pm4py
+import pytest
+
+from l3s_offshore_2.api.process_mining_srv import discovery
+from l3s_offshore_2.api.process_mining_srv.conformance import log_variants
+from l3s_offshore_2.api.process_mining_srv.ingest import read_xes_log
+
+
+@pytest.fixture(scope="module")
+def log_and_reference(pdc_log):
+    """The pdc2023_000101 log with timestamps and its rows shuffled, and pm4py's DFG of the ordered log.
+
+    PM4Py counts the start and end activities in row order, so its DFG is taken before the shuffle.
+    """
+    log = read_xes_log(pdc_log("pdc2023_000101"))
+    log["time:timestamp"] = pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(log.index, unit="s")
+    reference = pm4py.discover_dfg_typed(log)
+    return log.sample(frac=1, random_state=2).reset_index(drop=True), reference
+
+
+def assert_same_dfg(dfg, reference):
+    assert dict(dfg.graph) == dict(reference.graph)
+    assert dict(dfg.start_activities) == dict(reference.start_activities)
+    assert dict(dfg.end_activities) == dict(reference.end_activities)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_sharded_dfg_matches_pm4py(log_and_reference, workers):
+    log, reference = log_and_reference
+
+    assert_same_dfg(discovery.dfg_from_frame(log, workers=workers), reference)
+
+
+def test_variant_dfg_matches_pm4py(log_and_reference):
+    log, reference = log_and_reference
+
+    assert_same_dfg(discovery.dfg_from_variants(log_variants(log.sort_values("time:timestamp"))), reference)
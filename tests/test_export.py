@@ -0,0 +1,56 @@
+"""Simulated event logs exported as XES and Parquet."""
+import io
+
+import numpy as np
+import pm4py
+import pytest
+
+from l3s_offshore_2.api.process_mining_srv.ingest import read_columnar_log, read_xes_log
+from l3s_offshore_2.petri_net_sim.export import (
+    ACTIVITY_KEY, CASE_KEY, TIMESTAMP_KEY, export_event_log, iter_event_log, replication_traces,
+)
+
+COLUMNS = [CASE_KEY, ACTIVITY_KEY, TIMESTAMP_KEY]
+
+
+@pytest.fixture(scope="module")
+def model(pdc_model):
+    net, im, _ = pm4py.read_pnml(str(pdc_model("pdc2023_000111")))
+    return net, im
+
+
+def exported(net, im, path, **kwargs):
+    export_event_log(net, 30, path, seed=4, initial_marking=im, until=200, **kwargs)
+    return read_xes_log(path) if path.suffix == ".xes" else read_columnar_log(path)
+
+
+def events(log):
+    return log[COLUMNS].astype(str).values.tolist()
+
+
+def test_formats_hold_the_same_events(model, tmp_path):
+    xes = exported(*model, tmp_path / "log.xes")
+    parquet = exported(*model, tmp_path / "log.parquet", workers=2)
+
+    assert xes[CASE_KEY].nunique() == 30
+    assert events(xes) == events(parquet)
+    assert events(xes) == events(pm4py.read_xes(str(tmp_path / "log.xes")))
+
+
+def test_traces_do_not_depend_on_the_worker_count(model):
+    net, im = model
+    serial = list(replication_traces(net, 20, seed=8, initial_marking=im, until=200))
+    parallel = list(replication_traces(net, 20, seed=8, initial_marking=im, until=200, workers=2, shard_size=3))
+
+    assert [case for case, _, _ in serial] == [case for case, _, _ in parallel]
+    for (_, activities, times), (_, expected_activities, expected_times) in zip(parallel, serial):
+        assert activities.tolist() == expected_activities.tolist()
+        np.testing.assert_array_equal(times, expected_times)
+
+
+def test_a_petri_net_needs_its_initial_marking(model):
+    net, _ = model
+    with pytest.raises(ValueError):
+        export_event_log(net, 3, io.BytesIO(), fmt="xes")
+    with pytest.raises(ValueError):
+        iter_event_log(net, 3, fmt="csv")
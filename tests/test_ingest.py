@@ -0,0 +1,67 @@
+"""Event log readers against pm4py."""
+import pandas as pd
+import pm4py
+import pytest
+
+from l3s_offshore_2.api.process_mining_srv.ingest import read_xes_log
+
+TYPED_XES = b"""<?xml version="1.0" encoding="UTF-8" ?>
+<log xes.version="1.0" xmlns="http://www.xes-standard.org/">
+  <string key="concept:name" value="typed"/>
+  <trace>
+    <string key="concept:name" value="c1"/>
+    <int key="priority" value="2"/>
+    <event>
+      <string key="concept:name" value="register"/>
+      <string key="org:resource" value="ann"/>
+      <date key="time:timestamp" value="2024-03-01T08:00:00.000+01:00"/>
+      <float key="cost" value="12.5"/>
+      <boolean key="urgent" value="true"/>
+    </event>
+    <event>
+      <string key="concept:name" value="check"/>
+      <string key="org:resource" value="bob"/>
+      <date key="time:timestamp" value="2024-03-01T09:30:00.000+01:00"/>
+      <float key="cost" value="3.0"/>
+      <boolean key="urgent" value="false"/>
+    </event>
+  </trace>
+  <trace>
+    <string key="concept:name" value="c2"/>
+    <int key="priority" value="1"/>
+    <event>
+      <string key="concept:name" value="register"/>
+      <string key="org:resource" value="bob"/>
+      <date key="time:timestamp" value="2024-03-01T08:15:00.000+01:00"/>
+      <float key="cost" value="7.25"/>
+      <boolean key="urgent" value="false"/>
+    </event>
+  </trace>
+</log>
+"""
+
+
+def assert_same_log(df, reference):
+    assert sorted(df.columns) == sorted(reference.columns)
+    pd.testing.assert_frame_equal(df[reference.columns].reset_index(drop=True), reference.reset_index(drop=True))
+
+
+@pytest.mark.parametrize("model", ["pdc2023_000000", "pdc2023_121111"])
+def test_pdc_log_matches_pm4py(pdc_log, model):
+    path = pdc_log(model)
+    reference = pm4py.read_xes(str(path))
+
+    assert_same_log(read_xes_log(path), reference)
+    assert_same_log(read_xes_log(path.read_bytes()), reference)
+
+
+def test_typed_attributes_match_pm4py(tmp_path):
+    path = tmp_path / "typed.xes"
+    path.write_bytes(TYPED_XES)
+
+    assert_same_log(read_xes_log(TYPED_XES), pm4py.read_xes(str(path)))
+
+
+def test_invalid_document():
+    with pytest.raises(ValueError, match="Invalid XES"):
+        read_xes_log(b"<log><trace>")
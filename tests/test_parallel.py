@@ -0,0 +1,43 @@
+"""Replications spread over the process pool."""
+import numpy as np
+import pm4py
+
+from l3s_offshore_2.petri_net_sim.compiled import CompiledPN
+from l3s_offshore_2.petri_net_sim.parallel import run_parallel_replications
+
+
+def assert_same_replications(a, b):
+    assert a.transition_names == b.transition_names
+    np.testing.assert_array_equal(a.makespans, b.makespans)
+    np.testing.assert_array_equal(a.firing_counts, b.firing_counts)
+    np.testing.assert_array_equal(a.completed, b.completed)
+
+
+def test_simple_net_does_not_depend_on_workers(pdc_model):
+    net, im, _ = pm4py.read_pnml(str(pdc_model("pdc2023_000101")))
+    compiled = CompiledPN.from_simple_pn(net, im)
+    reference = run_parallel_replications(compiled, 40, seed=11, until=200, max_workers=1)
+    assert reference.n_firings.sum() > 0
+
+    for workers, shards in [(2, None), (3, 7), (4, 40)]:
+        result = run_parallel_replications(compiled, 40, seed=11, until=200, max_workers=workers,
+                                           shards=shards)
+        assert_same_replications(result, reference)
+    # a PM4Py net is compiled first, with the same outcome
+    assert_same_replications(run_parallel_replications(net, 40, seed=11, initial_marking=im, until=200,
+                                                       max_workers=2), reference)
+
+
+def test_gspn_does_not_depend_on_workers():
+    places = {"start": 1, "pa": 0, "pb": 0, "end": 0}
+    transitions = {
+        "split": {"type": "immediate", "priority": 1, "input": ["start"], "output": ["pa", "pb"]},
+        "A": {"type": "stochastic", "distribution": "exponential", "params": {"rate": 0.5},
+              "input": ["pa"], "output": ["end"]},
+        "B": {"type": "fixed", "fixed_time": 2, "input": ["pb"], "output": ["end"]},
+    }
+    reference = run_parallel_replications((places, transitions), 30, seed=4, max_workers=1)
+    result = run_parallel_replications((places, transitions), 30, seed=4, max_workers=3)
+
+    assert_same_replications(result, reference)
+    assert len(set(reference.makespans.tolist())) > 1
@@ -0,0 +1,49 @@
+"""PNML reader against pm4py.read_pnml."""
+import pm4py
+import pytest
+
+from l3s_offshore_2.petri_net_sim.compiled import CompiledPN
+from l3s_offshore_2.petri_net_sim.pnml import load_pnml
+
+
+def by_name(compiled, marking=None):
+    """The net as name-keyed dicts, independent of the index order."""
+    places, transitions = compiled.place_names, compiled.transition_names
+    pre = compiled.pre.toarray() if compiled.use_sparse else compiled.pre
+    post = compiled.post.toarray() if compiled.use_sparse else compiled.post
+
+    def arcs(matrix):
+        return {(transitions[t], places[p]): int(matrix[t, p]) for t, p in zip(*matrix.nonzero())}
+
+    def tokens(vector):
+        return {places[p]: int(vector[p]) for p in vector.nonzero()[0]}
+
+    return {
+        "labels": dict(zip(transitions, compiled.transition_labels)),
+        "places": set(places),
+        "pre": arcs(pre),
+        "post": arcs(post),
+        "initial": tokens(compiled.initial_marking),
+        "final": tokens(compiled.final_marking if marking is None else marking),
+    }
+
+
+@pytest.mark.parametrize("model", ["pdc2023_000000", "pdc2023_000101", "pdc2023_001001", "pdc2023_121111"])
+@pytest.mark.parametrize("use_sparse", [False, True])
+def test_matches_pm4py(pdc_model, model, use_sparse):
+    path = pdc_model(model)
+    net, im, fm = pm4py.read_pnml(str(path))
+    reference = CompiledPN.from_simple_pn(net, im)
+
+    compiled = load_pnml(path, use_sparse=use_sparse)
+
+    assert by_name(compiled) == by_name(reference, reference.marking_vector(fm))
+    # the document as bytes, as uploaded
+    assert by_name(load_pnml(path.read_bytes())) == by_name(compiled)
+
+
+def test_invalid_document():
+    with pytest.raises(ValueError, match="Invalid PNML"):
+        load_pnml(b"<pnml><net>")
+    with pytest.raises(ValueError, match="No Petri net"):
+        load_pnml(b"<pnml/>")
@@ -0,0 +1,71 @@
+"""Batched replications against the event-calendar simulator."""
+import numpy as np
+import pytest
+
+from l3s_offshore_2.petri_net_sim.compiled import CompiledPN
+from l3s_offshore_2.petri_net_sim.replications import run_replications
+from l3s_offshore_2.petri_net_sim.timedpn import TimedPNSimulator
+
+
+def parallel_activities(a_delay):
+    """start -> split -> A || B (fixed 5) -> join -> end."""
+    places = {"start": 1, "pa": 0, "pb": 0, "qa": 0, "qb": 0, "end": 0}
+    transitions = {
+        "split": {"type": "immediate", "input": ["start"], "output": ["pa", "pb"]},
+        "A": dict(a_delay, input=["pa"], output=["qa"]),
+        "B": {"type": "fixed", "fixed_time": 5, "input": ["pb"], "output": ["qb"]},
+        "join": {"type": "immediate", "input": ["qa", "qb"], "output": ["end"]},
+    }
+    return places, transitions
+
+
+def timed_makespans(places, transitions, n):
+    makespans = []
+    for seed in range(n):
+        sim = TimedPNSimulator(places, transitions, seed=seed)
+        sim.run()
+        makespans.append(sim.get_makespan())
+    return np.array(makespans)
+
+
+def test_concurrent_fixed_delays_overlap():
+    places, transitions = parallel_activities({"type": "fixed", "fixed_time": 5})
+    result = run_replications(CompiledPN.from_gspn(places, transitions), 100, seed=1)
+
+    assert result.completed.all()
+    np.testing.assert_array_equal(result.makespans, 5.0)
+    np.testing.assert_array_equal(timed_makespans(places, transitions, 10), 5.0)
+
+
+@pytest.mark.parametrize(
+    "a_delay",
+    [
+        {"type": "stochastic", "distribution": "normal", "params": {"mean": 5, "std_dev": 1}},
+        {"type": "stochastic", "distribution": "exponential", "params": {"rate": 0.2}},
+    ],
+)
+def test_makespan_matches_timed_simulator(a_delay):
+    places, transitions = parallel_activities(a_delay)
+    result = run_replications(CompiledPN.from_gspn(places, transitions), 4000, seed=7)
+    reference = timed_makespans(places, transitions, 2000)
+
+    assert result.completed.all()
+    # E[max(A, 5)]: 5.40 for normal(5, 1), 6.84 for exponential with mean 5
+    assert result.makespans.mean() == pytest.approx(reference.mean(), rel=0.03)
+    assert np.percentile(result.makespans, 90) == pytest.approx(
+        np.percentile(reference, 90), rel=0.05
+    )
+
+
+def test_only_untyped_transitions_enabled_is_a_deadlock():
+    # A has no type, so no delay; once B has fired nothing can complete any more
+    places = {"q": 1, "start": 1, "end": 0}
+    transitions = {
+        "B": {"type": "fixed", "fixed_time": 2, "input": ["q"], "output": []},
+        "A": {"input": ["start"], "output": ["end"]},
+    }
+    result = run_replications(CompiledPN.from_gspn(places, transitions), 20, seed=3)
+
+    assert result.completed.all()
+    np.testing.assert_array_equal(result.makespans, 2.0)
+    np.testing.assert_array_equal(result.firing_counts, [[1, 0]] * 20)
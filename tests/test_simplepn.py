@@ -0,0 +1,41 @@
+"""The engines of SimpleSimulator."""
+import pm4py
+import pytest
+
+from l3s_offshore_2.petri_net_sim.compiled import CompiledPN
+from l3s_offshore_2.petri_net_sim.simplepn import SimpleSimulator
+
+
+def simulate(net, im, engine, **kwargs):
+    sim = SimpleSimulator(net, im, engine=engine, seed=5, **kwargs)
+    sim.run(until=60)
+    return sim
+
+
+@pytest.mark.parametrize("model", ["pdc2023_000000", "pdc2023_000101"])
+def test_engines_fire_the_same_transitions(pdc_model, model):
+    net, im, _ = pm4py.read_pnml(str(pdc_model(model)))
+    reference = simulate(net, im, "object")
+    assert len(reference.firing_sequence) > 10
+
+    for engine, kwargs in [("compiled", {}), ("compiled", {"use_sparse": True}), ("incremental", {}),
+                           ("incremental", {"columnar_trace": True})]:
+        sim = simulate(net, im, engine, **kwargs)
+        assert list(sim.firing_sequence) == list(reference.firing_sequence), (engine, kwargs)
+        assert dict(sim.detailed_log) == dict(reference.detailed_log), (engine, kwargs)
+        assert {t: list(times) for t, times in sim.firing_log.items()} == dict(reference.firing_log)
+        assert sim.current_marking == reference.current_marking
+
+
+def test_compiled_net_runs_from_its_own_marking(pdc_model):
+    net, im, _ = pm4py.read_pnml(str(pdc_model("pdc2023_000000")))
+    sim = SimpleSimulator(CompiledPN.from_simple_pn(net, im), engine="incremental", seed=5)
+    sim.run(until=60)
+
+    assert list(sim.firing_sequence) == list(simulate(net, im, "object").firing_sequence)
+
+
+def test_net_without_marking_is_rejected(pdc_model):
+    net, _, _ = pm4py.read_pnml(str(pdc_model("pdc2023_000000")))
+    with pytest.raises(ValueError, match="initial marking"):
+        SimpleSimulator(net)
@@ -0,0 +1,19 @@
+"""Event-calendar simulator."""
+from l3s_offshore_2.petri_net_sim.timedpn import TimedPNSimulator
+
+
+def test_preselection_released_self_loop_lets_competitor_start():
+    # L puts its token back into p, so its completion leaves p's marking unchanged;
+    # releasing its reservation must still give M a chance at the token
+    places = {"p": 1, "x": 0, "y": 0}
+    transitions = {
+        "L": {"type": "stochastic", "distribution": "exponential", "input": ["p"],
+              "output": ["p", "x"]},
+        "M": {"type": "stochastic", "distribution": "exponential", "input": ["p"],
+              "output": ["y"]},
+    }
+    for seed in range(200):
+        sim = TimedPNSimulator(places, transitions, seed=seed, policy="preselection")
+        sim.run(until=50)
+        assert sim.firing_log["M"], f"M never fired with seed {seed}"
+        assert sim.get_marking()["y"] == 1